@@ -0,0 +1,69 @@
+"""
+Compares the number of documents hydrated per second by the former
+per-document class creation with the model hydrator modes.
+
+    python benchmarks/hydration.py
+"""
+
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from py_linq_mongo.model import attributes  # noqa: E402
+from py_linq_mongo.model.hydrator import Hydrator  # noqa: E402
+
+
+class SaleModel(object):
+    __collection_name__ = "sales"
+
+    id = attributes.ObjectId()
+    item = attributes.String("item")
+    price = attributes.Integer("price")
+    quantity = attributes.Integer("quantity")
+    date = attributes.DateTime("date")
+
+
+DOCUMENTS = [
+    {
+        "_id": i,
+        "item": "item{0}".format(i % 100),
+        "price": i % 50,
+        "quantity": i % 7,
+        "date": datetime.datetime(2014, 1, 1) + datetime.timedelta(hours=i),
+    }
+    for i in range(10000)
+]
+
+
+def dynamic_class(document):
+    return type(SaleModel.__class__.__name__, (object,), document)
+
+
+def rate(hydrate):
+    def run():
+        for document in DOCUMENTS:
+            hydrate(document)
+
+    best = min(timeit.repeat(run, number=1, repeat=5))
+    return len(DOCUMENTS) / best
+
+
+def main():
+    baseline = rate(dynamic_class)
+    print("{0:<16}{1:>14}{2:>10}".format("mode", "documents/s", "speedup"))
+    print("{0:<16}{1:>14,.0f}{2:>9.1f}x".format("type()", baseline, 1.0))
+    for mode in Hydrator.MODES:
+        hydrate = Hydrator(SaleModel, mode).hydrate
+        documents = rate(hydrate)
+        print(
+            "{0:<16}{1:>14,.0f}{2:>9.1f}x".format(
+                mode, documents, documents / baseline
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
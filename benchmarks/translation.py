@@ -0,0 +1,61 @@
+"""
+Compares the number of lambda translations per second of the two-pass
+decompiler and ast translator with the single-pass bytecode compiler.
+
+    python benchmarks/translation.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from py_linq_mongo.decompile import BytecodeCompiler  # noqa: E402
+from py_linq_mongo.expressions import LambdaExpression  # noqa: E402
+
+LAMBDAS = {
+    "compare": lambda x: x.gpa >= 10,
+    "and": lambda x: x.gpa >= 10 and x.gpa <= 50,
+    "or_of_ands": lambda x: (x.gpa >= 10 and x.gpa <= 50)
+    or x.last_name == "Fenske",
+    "not": lambda x: not (x.gpa > 10 and x.gpa < 50),
+    "in": lambda x: x.item in ["abc", "jkl"],
+    "select": lambda x: [x.first_name, x.last_name, x.gpa],
+}
+
+
+def two_pass(code):
+    return LambdaExpression.translate(code).body.mongo
+
+
+def single_pass(code):
+    return BytecodeCompiler().compile(code)
+
+
+def rate(func, code, number):
+    best = min(timeit.repeat(lambda: func(code), number=number, repeat=5))
+    return number / best
+
+
+def main(number=2000):
+    print(
+        "{0:<12}{1:>14}{2:>14}{3:>10}".format(
+            "lambda", "two-pass/s", "compiler/s", "speedup"
+        )
+    )
+    for name, func in LAMBDAS.items():
+        code = func.__code__
+        if two_pass(code) != single_pass(code):
+            raise AssertionError("Translations of {0} differ".format(name))
+        old = rate(two_pass, code, number)
+        new = rate(single_pass, code, number)
+        print(
+            "{0:<12}{1:>14,.0f}{2:>14,.0f}{3:>9.1f}x".format(
+                name, old, new, new / old
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import os
+import threading
+from pymongo import monitoring
+
+
+class PoolStatistics(monitoring.ConnectionPoolListener):
+    """
+    Counts the connection pool events of a MongoClient. An instance is given
+    to the client in its event_listeners
+    """
+
+    def __init__(self):
+        """
+        Default constructor
+        """
+        self._lock = threading.Lock()
+        self._counts = {
+            "created": 0,
+            "closed": 0,
+            "checked_out": 0,
+            "checked_in": 0,
+            "check_out_failed": 0,
+            "cleared": 0,
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def snapshot(self):
+        """
+        Returns the counts of the events received so far
+        :returns: dictionary of counts keyed by event name, along with the
+            number of connections open and in use
+        """
+        with self._lock:
+            counts = dict(self._counts)
+        counts["open"] = counts["created"] - counts["closed"]
+        counts["in_use"] = counts["checked_out"] - counts["checked_in"]
+        return counts
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._count("cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._count("created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._count("closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._count("check_out_failed")
+
+    def connection_checked_out(self, event):
+        self._count("checked_out")
+
+    def connection_checked_in(self, event):
+        self._count("checked_in")
+
+
+class ClientRegistry(object):
+    """
+    Shares MongoDb clients, and so their connection pools, between the
+    providers connecting to the same server with the same settings. Clients
+    are thread safe. They are not fork safe: a process forked from the one
+    that created a client creates its own clients
+    """
+
+    def __init__(self):
+        """
+        Default constructor
+        """
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _forked(self):
+        # the lock may have been held by another thread of the parent process
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._pid = os.getpid()
+
+    def get(self, factory, uri, **kwargs):
+        """
+        Returns the client created by a factory for a URI and settings,
+        creating it on first use
+        :param factory: function receiving the URI and the keyword arguments
+            and returning a client
+        :param uri: url of the MongoDb instance
+        :param kwargs: settings of the client, including credentials
+        :returns: a tuple of the client and the PoolStatistics of its pool
+        """
+        key = (factory, uri, repr(sorted(kwargs.items())))
+        if self._pid != os.getpid():
+            self._forked()
+        entry = self._clients.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._clients.get(key)
+                if entry is None:
+                    statistics = PoolStatistics()
+                    listeners = [*kwargs.pop("event_listeners", []), statistics]
+                    client = factory(uri, event_listeners=listeners, **kwargs)
+                    entry = self._clients[key] = (client, statistics)
+        return entry
+
+    def __len__(self):
+        return len(self._clients)
+
+    def clear(self):
+        """
+        Closes and forgets every client
+        """
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client, _ in clients.values():
+            client.close()
+
+
+# registry of the clients created by MongoProvider.connect
+clients = ClientRegistry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=clients._forked)
@@ -1,5 +1,4 @@
 from collections import deque
-import copy
 
 
 class Stack(object):
@@ -7,11 +6,17 @@ class Stack(object):
     Encapsulates logic of a stack
     """
 
+    __slots__ = ("items",)
+
     def __init__(self, items=None):
+        """
+        Default constructor
+        :param items: optional list of items ordered from bottom to top
+        """
         if items is not None:
-            if not isinstance(items, deque):
-                raise AttributeError("items is not a deque instance")
-        self.items = deque() if items is None else items
+            if not isinstance(items, list):
+                raise AttributeError("items is not a list instance")
+        self.items = [] if items is None else items
 
     def __len__(self):
         return len(self.items)
@@ -20,25 +25,19 @@ class Stack(object):
         """
         Peeks at the item at top of stack without removing it
         """
-        if len(self.items) == 0:
-            return None
-        item = self.pop()
-        self.push(item)
-        return item
+        return self.items[-1] if self.items else None
 
     def pop(self):
         """
         Removes top of the stack
         """
-        if len(self.items) == 0:
-            return None
-        return self.items.popleft()
+        return self.items.pop() if self.items else None
 
     def push(self, item):
         """
         Pushes item onto top of stack
         """
-        self.items.appendleft(item)
+        self.items.append(item)
 
     def clear(self):
         """
@@ -48,15 +47,9 @@ class Stack(object):
 
     def copy(self):
         """
-        Deep copies stack into a new stack
+        Copies stack into a new stack. Items are shared, not copied
         """
-        stack = Queue()
-        for i in self.items:
-            if i is None:
-                continue
-            cpy = copy.deepcopy(i)
-            stack.push(cpy)
-        return Stack(items=stack.items)
+        return Stack(items=[i for i in self.items if i is not None])
 
     def reverse(self):
         """
@@ -65,24 +58,34 @@ class Stack(object):
         self.items.reverse()
 
 
-class Queue(Stack):
+class Queue(object):
     """
     Encapsulates logic of a queue using Stack API
     """
 
-    def __init__(self):
+    __slots__ = ("items",)
+
+    def __init__(self, items=None):
         """
         Default constructor
+        :param items: optional iterable of items ordered from first to last
+        """
+        self.items = deque() if items is None else deque(items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def top(self):
+        """
+        Peeks at the next item in the queue without removing it
         """
-        super(Queue, self).__init__()
+        return self.items[0] if self.items else None
 
     def pop(self):
         """
         Removes the next item from the queue
         """
-        if len(self.items) == 0:
-            return None
-        return self.items.pop()
+        return self.items.popleft() if self.items else None
 
     def push(self, item):
         """
@@ -90,13 +93,51 @@ class Queue(Stack):
         """
         self.items.append(item)
 
+    def clear(self):
+        """
+        Removes all items from the queue
+        """
+        self.items.clear()
+
     def copy(self):
         """
-        Performs a deep copy of the queue
+        Copies the queue into a new queue. Items are shared, not copied
+        """
+        return Queue(i for i in self.items if i is not None)
+
+
+class Cursor(object):
+    """
+    Reads the items of a sequence one at a time by moving an index, without
+    copying or removing anything from the sequence
+    """
+
+    __slots__ = ("items", "index")
+
+    def __init__(self, items, index=0):
+        """
+        Default constructor
+        :param items: a sequence supporting len and indexing
+        :param index: position of the next item to read
+        """
+        self.items = items
+        self.index = index
+
+    def __len__(self):
+        return len(self.items) - self.index
+
+    def top(self):
+        """
+        Peeks at the next item without moving the cursor
         """
-        queue = Queue()
-        for i in self.items:
-            if i is None:
-                continue
-            queue.push(i)
-        return queue
+        return self.items[self.index] if self.index < len(self.items) else None
+
+    def pop(self):
+        """
+        Returns the next item and moves the cursor past it
+        """
+        if self.index >= len(self.items):
+            return None
+        item = self.items[self.index]
+        self.index += 1
+        return item
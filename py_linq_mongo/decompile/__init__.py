@@ -2,6 +2,9 @@ import abc
 import dis
 import ast
 from .visitor import InstructionVisitor
+from .compiler import BytecodeCompiler
+
+__all__ = ["BytecodeCompiler", "Decompiler", "LambdaDecompiler"]
 
 
 class Decompiler(object):
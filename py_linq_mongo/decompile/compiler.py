@@ -0,0 +1,540 @@
+import dis
+from bisect import bisect_left
+from ..parameters import Parameter
+
+
+class _Argument(object):
+    """
+    The lambda argument, i.e. the document being queried
+    """
+
+    __slots__ = ()
+
+
+class _Field(object):
+    """
+    A field of the document being queried
+    """
+
+    __slots__ = ("path",)
+
+    def __init__(self, path):
+        self.path = path
+
+
+class _Free(object):
+    """
+    A free variable of the lambda, optionally followed by attributes
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+
+class _Filter(object):
+    """
+    A Mongo query document
+    """
+
+    __slots__ = ("doc",)
+
+    def __init__(self, doc):
+        self.doc = doc
+
+
+class _Expression(object):
+    """
+    A Mongo aggregation expression
+    """
+
+    __slots__ = ("doc",)
+
+    def __init__(self, doc):
+        self.doc = doc
+
+
+class _Sequence(object):
+    """
+    A list or tuple built by the lambda
+    """
+
+    __slots__ = ("items",)
+
+    def __init__(self, items):
+        self.items = items
+
+
+class _Jump(object):
+    """
+    A short-circuit jump taken when the value of an atom equals sense
+    """
+
+    __slots__ = ("filter", "sense", "target", "offset", "depth")
+
+    def __init__(self, filter, sense, target, offset, depth=0):
+        self.filter = filter
+        self.sense = sense
+        self.target = target
+        self.offset = offset
+        self.depth = depth
+
+
+_END = -1
+
+_COMPARE = {
+    ">=": "$gte",
+    "<=": "$lte",
+    ">": "$gt",
+    "<": "$lt",
+    "==": "$eq",
+    "!=": "$ne",
+    "in": "$in",
+    "not in": "$nin",
+    "is": "$eq",
+    "is not": "$ne",
+}
+
+_REVERSED = {"$gte": "$lte", "$lte": "$gte", "$gt": "$lt", "$lt": "$gt"}
+
+_BINARY = {
+    "BINARY_ADD": "$add",
+    "BINARY_SUBTRACT": "$subtract",
+    "BINARY_MULTIPLY": "$multiply",
+    "BINARY_TRUE_DIVIDE": "$divide",
+    "BINARY_MODULO": "$mod",
+    "+": "$add",
+    "-": "$subtract",
+    "*": "$multiply",
+    "/": "$divide",
+    "%": "$mod",
+}
+
+_JUMP_IF_TRUE = {
+    "POP_JUMP_IF_TRUE": True,
+    "POP_JUMP_FORWARD_IF_TRUE": True,
+    "JUMP_IF_TRUE_OR_POP": True,
+    "POP_JUMP_IF_FALSE": False,
+    "POP_JUMP_FORWARD_IF_FALSE": False,
+    "JUMP_IF_FALSE_OR_POP": False,
+}
+
+_RETURNS = ("RETURN_VALUE", "RETURN_CONST")
+
+_IGNORED = (
+    "NOP",
+    "RESUME",
+    "CACHE",
+    "PRECALL",
+    "PUSH_NULL",
+    "COPY_FREE_VARS",
+    "MAKE_CELL",
+    "EXTENDED_ARG",
+)
+
+
+def _negate(doc):
+    """
+    Negates a Mongo query document
+    """
+    if len(doc) == 1:
+        ((key, value),) = doc.items()
+        if (
+            not key.startswith("$")
+            and isinstance(value, dict)
+            and len(value) == 1
+        ):
+            return {key: {"$not": value}}
+    return {"$nor": [doc]}
+
+
+def _combine(op, left, right):
+    """
+    Combines two query documents with $and or $or, flattening operands that
+    already use the same operator
+    """
+    predicates = []
+    for doc in (left, right):
+        if len(doc) == 1 and op in doc:
+            predicates.extend(doc[op])
+        else:
+            predicates.append(doc)
+    return {op: predicates}
+
+
+class BytecodeCompiler(object):
+    """
+    Compiles the bytecode of a lambda expression straight into a Mongo query
+    document in a single pass over its instructions, without building a Python
+    abstract syntax tree
+    """
+
+    _dispatch = {}
+
+    def __init__(self):
+        """
+        Default constructor
+        """
+        self.parameters = set()
+
+    def compile(self, code):
+        """
+        Compiles a code object into a Mongo fragment
+        :param code: the code object of a lambda expression
+        :returns: a query document for predicates, a field path for simple
+            selectors, a $project stage for list, tuple and dict selectors or
+            an aggregation expression for arithmetic
+        """
+        self.parameters = set()
+        self._arguments = code.co_varnames[: code.co_argcount]
+        self._instructions = list(dis.get_instructions(code))
+        self._offsets = {
+            instruction.offset: idx
+            for idx, instruction in enumerate(self._instructions)
+        }
+        self._stack = []
+        self._jumps = []
+        self._targets = set()
+        dispatch = self._dispatch
+        for instruction in self._instructions:
+            opname = instruction.opname
+            offset = instruction.offset
+            if (
+                offset in self._targets
+                and self._jumps
+                and len(self._stack) > self._jumps[-1].depth
+            ):
+                self._join(offset)
+            if opname in _RETURNS:
+                if opname == "RETURN_CONST":
+                    self._stack.append(instruction.argval)
+                if self._jumps:
+                    self._join(offset, 0)
+                break
+            handler = dispatch.get(opname)
+            if handler is None:
+                raise NotImplementedError(
+                    "Cannot compile instruction {0}".format(opname)
+                )
+            handler(self, instruction)
+        return self._output(self._stack.pop())
+
+    # Values
+
+    def _value(self, value):
+        """
+        Converts a stack value into a value usable inside a Mongo document
+        """
+        if isinstance(value, _Field):
+            return "${0}".format(value.path)
+        if isinstance(value, _Free):
+            self.parameters.add(value.name.split(".")[0])
+            return Parameter(value.name)
+        if isinstance(value, (_Filter, _Expression)):
+            return value.doc
+        if isinstance(value, _Sequence):
+            return [self._value(v) for v in value.items]
+        if isinstance(value, tuple):
+            return [self._value(v) for v in value]
+        if isinstance(value, _Argument):
+            raise TypeError("Cannot use the lambda argument as a value")
+        return value
+
+    def _constant(self, value):
+        """
+        Converts a stack value compared against a field
+        """
+        if isinstance(value, _Field):
+            raise TypeError("Expected a value")
+        return self._value(value)
+
+    def _filter(self, value):
+        if not isinstance(value, _Filter):
+            raise TypeError("Cannot use {0} as a predicate".format(value))
+        return value.doc
+
+    def _output(self, value):
+        if isinstance(value, _Field):
+            return value.path
+        if isinstance(value, _Sequence) and all(
+            isinstance(v, _Field) for v in value.items
+        ):
+            return {
+                "$project": {v.path: "${0}".format(v.path) for v in value.items}
+            }
+        return self._value(value)
+
+    # Boolean structure
+
+    def _join(self, offset, start=None):
+        """
+        Folds the short-circuit jumps that end at offset, together with the
+        value on top of the stack, into a single query document
+        :param offset: the offset where the boolean expression ends
+        :param start: index of the first jump of the expression. By default
+            the trailing jumps whose target is not after offset
+        """
+        if start is None:
+            start = len(self._jumps)
+            while start > 0 and self._jumps[start - 1].target <= offset:
+                start -= 1
+        group = self._jumps[start:]
+        if not group:
+            return
+        del self._jumps[start:]
+        jump_offsets = [jump.offset for jump in group]
+        atoms = [self._resolve(jump, jump_offsets, offset) for jump in group]
+        atoms.append(_Jump(self._filter(self._stack.pop()), None, None, None))
+        self._stack.append(_Filter(self._fold(atoms, 0, len(atoms), {})))
+
+    def _resolve(self, jump, jump_offsets, end):
+        """
+        Resolves the target of a short-circuit jump to the index of the atom it
+        continues at, following jumps that land on the test of another atom
+        :param jump: a _Jump whose target is a bytecode offset
+        :param jump_offsets: the offsets of the jumps being folded
+        :param end: the offset where the boolean expression ends
+        """
+        target = jump.target
+        while True:
+            idx = self._offsets[target]
+            # jumps past offset 255 land on the EXTENDED_ARG of their test
+            while self._instructions[idx].opname in _IGNORED:
+                idx += 1
+            instruction = self._instructions[idx]
+            if target == end or instruction.opname in _RETURNS:
+                jump.target = _END
+                return jump
+            if instruction.opname == "COPY" and instruction.arg == 1:
+                test = self._instructions[idx + 1]
+            elif instruction.opname in _JUMP_IF_TRUE:
+                test = instruction
+            else:
+                jump.target = bisect_left(jump_offsets, target)
+                return jump
+            if test.opname not in _JUMP_IF_TRUE:
+                raise NotImplementedError("Unsupported boolean expression")
+            if _JUMP_IF_TRUE[test.opname] == jump.sense:
+                target = test.argval
+            else:
+                jump.target = bisect_left(jump_offsets, test.offset + 1)
+                return jump
+
+    def _meaning(self, jump, exits):
+        if jump.target == _END:
+            return jump.sense
+        if jump.target not in exits:
+            raise NotImplementedError("Unsupported boolean expression")
+        return exits[jump.target]
+
+    def _fold(self, atoms, lo, hi, exits):
+        """
+        Rebuilds the $and/$or structure of atoms lo to hi from their jumps
+        :param atoms: list of _Jump
+        :param exits: truth value of the expression when jumping to an atom
+            index outside lo to hi
+        """
+        if hi - lo == 1:
+            return atoms[lo].filter
+        first = atoms[lo]
+        if first.target == _END or first.target >= hi:
+            meaning = self._meaning(first, exits)
+            left = first.filter
+            if first.sense != meaning:
+                left = _negate(left)
+            op = "$or" if meaning else "$and"
+            return _combine(op, left, self._fold(atoms, lo + 1, hi, exits))
+        split = first.target
+        k = lo
+        while k < split:
+            target = atoms[k].target
+            if target != _END and split < target < hi:
+                split = target
+            k += 1
+        meaning = self._meaning(atoms[split - 1], exits)
+        op = "$or" if meaning else "$and"
+        inner = dict(exits)
+        inner[split] = not meaning
+        return _combine(
+            op,
+            self._fold(atoms, lo, split, inner),
+            self._fold(atoms, split, hi, exits),
+        )
+
+
+def _handles(*opnames):
+    def register(func):
+        for opname in opnames:
+            BytecodeCompiler._dispatch[opname] = func
+        return func
+
+    return register
+
+
+@_handles(*_IGNORED)
+def _ignore(self, i):
+    pass
+
+
+@_handles("LOAD_FAST", "LOAD_FAST_CHECK")
+def _load_fast(self, i):
+    if i.argval not in self._arguments:
+        raise NotImplementedError(
+            "Cannot compile local variable {0}".format(i.argval)
+        )
+    self._stack.append(_Argument())
+
+
+@_handles("LOAD_DEREF", "LOAD_CLASSDEREF", "LOAD_GLOBAL", "LOAD_NAME")
+def _load_free(self, i):
+    self._stack.append(_Free(i.argval))
+
+
+@_handles("LOAD_CONST")
+def _load_const(self, i):
+    self._stack.append(i.argval)
+
+
+@_handles("LOAD_ATTR")
+def _load_attr(self, i):
+    owner = self._stack.pop()
+    if isinstance(owner, _Argument):
+        self._stack.append(_Field(i.argval))
+    elif isinstance(owner, _Field):
+        self._stack.append(_Field("{0}.{1}".format(owner.path, i.argval)))
+    elif isinstance(owner, _Free):
+        self._stack.append(_Free("{0}.{1}".format(owner.name, i.argval)))
+    else:
+        self._stack.append(getattr(owner, i.argval))
+
+
+def _compare(self, operator):
+    right = self._stack.pop()
+    left = self._stack.pop()
+    if isinstance(left, _Field) and isinstance(right, _Field):
+        if operator in ("$in", "$nin"):
+            raise NotImplementedError("Cannot compare two fields with in")
+        doc = {"$expr": {operator: [self._value(left), self._value(right)]}}
+    elif isinstance(left, _Field):
+        doc = {left.path: {operator: self._constant(right)}}
+    elif isinstance(right, _Field):
+        if operator in ("$in", "$nin"):
+            operator = "$eq" if operator == "$in" else "$ne"
+        doc = {
+            right.path: {
+                _REVERSED.get(operator, operator): self._constant(left)
+            }
+        }
+    else:
+        raise NotImplementedError("Comparison does not involve a field")
+    self._stack.append(_Filter(doc))
+
+
+@_handles("COMPARE_OP")
+def _compare_op(self, i):
+    _compare(self, _COMPARE[i.argval])
+
+
+@_handles("CONTAINS_OP")
+def _contains_op(self, i):
+    _compare(self, "$nin" if i.arg else "$in")
+
+
+@_handles("IS_OP")
+def _is_op(self, i):
+    _compare(self, "$ne" if i.arg else "$eq")
+
+
+@_handles(
+    "BINARY_ADD",
+    "BINARY_SUBTRACT",
+    "BINARY_MULTIPLY",
+    "BINARY_TRUE_DIVIDE",
+    "BINARY_MODULO",
+    "BINARY_OP",
+)
+def _binary(self, i):
+    key = i.argrepr if i.opname == "BINARY_OP" else i.opname
+    if key not in _BINARY:
+        raise NotImplementedError("Cannot compile operator {0}".format(key))
+    right = self._value(self._stack.pop())
+    left = self._value(self._stack.pop())
+    self._stack.append(_Expression({_BINARY[key]: [left, right]}))
+
+
+@_handles("UNARY_NOT")
+def _unary_not(self, i):
+    self._stack.append(_Filter(_negate(self._filter(self._stack.pop()))))
+
+
+@_handles("BUILD_TUPLE", "BUILD_LIST")
+def _build_sequence(self, i):
+    items = self._stack[len(self._stack) - i.arg :]
+    del self._stack[len(self._stack) - i.arg :]
+    self._stack.append(_Sequence(items))
+
+
+@_handles("LIST_EXTEND")
+def _list_extend(self, i):
+    values = self._stack.pop()
+    self._stack[-i.arg].items.extend(
+        values.items if isinstance(values, _Sequence) else values
+    )
+
+
+@_handles("LIST_TO_TUPLE")
+def _list_to_tuple(self, i):
+    pass
+
+
+@_handles("BUILD_CONST_KEY_MAP")
+def _build_const_key_map(self, i):
+    keys = self._stack.pop()
+    values = self._stack[len(self._stack) - i.arg :]
+    del self._stack[len(self._stack) - i.arg :]
+    self._stack.append(
+        _Expression(
+            {"$project": {k: self._value(v) for k, v in zip(keys, values)}}
+        )
+    )
+
+
+@_handles("BUILD_MAP")
+def _build_map(self, i):
+    items = self._stack[len(self._stack) - 2 * i.arg :]
+    del self._stack[len(self._stack) - 2 * i.arg :]
+    self._stack.append(
+        _Expression(
+            {
+                "$project": {
+                    items[k]: self._value(items[k + 1])
+                    for k in range(0, len(items), 2)
+                }
+            }
+        )
+    )
+
+
+@_handles("COPY")
+def _copy(self, i):
+    self._stack.append(self._stack[-i.arg])
+
+
+@_handles("POP_TOP")
+def _pop_top(self, i):
+    self._stack.pop()
+
+
+@_handles(*_JUMP_IF_TRUE)
+def _conditional_jump(self, i):
+    value = self._filter(self._stack.pop())
+    depth = len(self._stack)
+    previous = self._instructions[self._offsets[i.offset] - 1]
+    if previous.opname == "COPY" and previous.arg == 1:
+        # Python 3.12 keeps the tested value as the result of the jump
+        depth -= 1
+    self._targets.add(i.argval)
+    self._jumps.append(
+        _Jump(value, _JUMP_IF_TRUE[i.opname], i.argval, i.offset, depth)
+    )
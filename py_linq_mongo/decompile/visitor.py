@@ -1,97 +1,102 @@
 import dis
 import ast
-from ..data_structures import Stack
+from ..data_structures import Cursor
+
+_COMPARE_OPS = {
+    ">=": ast.GtE,
+    "<=": ast.LtE,
+    ">": ast.Gt,
+    "<": ast.Lt,
+    "==": ast.Eq,
+    "!=": ast.NotEq,
+    "in": ast.In,
+    "not in": ast.NotIn,
+    "is": ast.Is,
+    "is not": ast.IsNot,
+}
+
+_JUMP_IF_FALSE = ("JUMP_IF_FALSE_OR_POP", "POP_JUMP_IF_FALSE")
+
+_JUMP_IF_TRUE = ("JUMP_IF_TRUE_OR_POP", "POP_JUMP_IF_TRUE")
+
+# dis already folds the argument of EXTENDED_ARG into the next instruction
+_SKIPPED = ("RETURN_VALUE", "EXTENDED_ARG")
 
 
 class InstructionVisitor(object):
     """
-    Performs operations on a set of instructions
+    Performs operations on a set of instructions. Instructions are read from
+    the last one to the first one through a cursor, so each instruction is
+    visited exactly once
     """
 
+    _dispatch = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = _dispatch_table(cls)
+
     def __init__(self, instructions=[], stack=None):
         """
         Default constructor
         :param instructions: an iterable of instruction objects
+        :param stack: optional Stack of instructions whose top is the last
+            instruction, used in place of instructions
         """
         if stack is not None:
-            self.stack = stack
+            instructions = stack.items
         else:
-            self.stack = Stack()
             instructions = list(instructions)
-            idx = 0
-            while idx < len(instructions):
-                i = instructions[idx]
-                if not isinstance(i, dis.Instruction):
-                    raise TypeError(
-                        "instruction is not an instance of dis.Instruction"
-                    )
-                if i.opname == "RETURN_VALUE":
-                    idx += 1
-                    continue
-                self.stack.push(i)
-                idx += 1
+        for i in instructions:
+            if not isinstance(i, dis.Instruction):
+                raise TypeError(
+                    "instruction is not an instance of dis.Instruction"
+                )
+        self.cursor = Cursor(
+            [i for i in reversed(instructions) if i.opname not in _SKIPPED]
+        )
 
     def visit(self, i=None):
         """
-        Pops the first Instruction on the stack and performs visit as given by the op_name
+        Reads the next instruction from the cursor and performs visit as given
+        by the op_name
         """
-        self.stack = Stack(self.stack.items)
-        instruction = self.stack.pop() if i is None else i
+        instruction = self.cursor.pop() if i is None else i
         if instruction is None:
             return None
-        visit_method = getattr(
-            self, "visit_{0}".format(instruction.opname), None
-        )
+        visit_method = self._dispatch.get(instruction.opname)
         if visit_method is None:
             raise AttributeError(
                 "Cannot find method visit_{0}".format(instruction.opname)
             )
-        return visit_method(instruction)
+        return visit_method(self, instruction)
 
     def visit_COMPARE_OP(self, i):
         """
         Performs visit operation on a COMPARE_OP instruction
         param i: an instance of an instruction
         """
-        op_map = {
-            ">=": ast.GtE,
-            "<=": ast.LtE,
-            ">": ast.Gt,
-            "<": ast.Lt,
-            "==": ast.Eq,
-            "!=": ast.NotEq,
-            "in": ast.In,
-            "not in": ast.NotIn,
-            "is": ast.Is,
-            "is not": ast.IsNot,
-        }
-        right = self.stack.pop()
-        left = self.stack.pop()
+        right = self.visit()
+        left = self.visit()
         compare = ast.Compare(
-            left=self.visit(left),
-            ops=[op_map[i.argval]()],
-            comparators=[self.visit(right)],
+            left=left,
+            ops=[_COMPARE_OPS[i.argval]()],
+            comparators=[right],
             lineno=i.starts_line,
             col_offset=i.offset,
         )
-        next_instruction = self.stack.top()
+        next_instruction = self.cursor.top()
         if next_instruction is None:
             return compare
-        if next_instruction.opname in [
-            "JUMP_IF_FALSE_OR_POP",
-            "POP_JUMP_IF_FALSE",
-        ]:
-            self.stack.pop()
+        if next_instruction.opname in _JUMP_IF_FALSE:
+            self.cursor.pop()
             return ast.BoolOp(
-                op=ast.And(), values=[self.visit(self.stack.pop()), compare]
+                op=ast.And(), values=[self.visit(self.cursor.pop()), compare]
             )
-        elif next_instruction.opname in [
-            "JUMP_IF_TRUE_OR_POP",
-            "POP_JUMP_IF_TRUE",
-        ]:
-            self.stack.pop()
+        elif next_instruction.opname in _JUMP_IF_TRUE:
+            self.cursor.pop()
             return ast.BoolOp(
-                op=ast.Or(), values=[self.visit(self.stack.pop()), compare]
+                op=ast.Or(), values=[self.visit(self.cursor.pop()), compare]
             )
         else:
             return compare
@@ -141,7 +146,9 @@ class InstructionVisitor(object):
                 col_offset=i.offset,
                 is_jump_target=False,
             )
-        return i.argval
+        return ast.Constant(
+            value=i.argval, lineno=i.starts_line, col_offset=i.offset
+        )
 
     def visit_LOAD_FAST(self, i):
         """
@@ -160,7 +167,7 @@ class InstructionVisitor(object):
         Performs visit operation on LOAD_ATTR instruction
         :param i: an Instruction instance
         """
-        name_instruction = self.stack.pop()
+        name_instruction = self.cursor.pop()
         return ast.Attribute(
             value=self.visit(name_instruction),
             attr=i.argval,
@@ -177,28 +184,32 @@ class InstructionVisitor(object):
             col_offset=i.offset,
         )
 
+    def visit_LOAD_DEREF(self, i):
+        return ast.Name(
+            id=i.argval,
+            ctx=ast.Load(),
+            lineno=i.starts_line,
+            col_offset=i.offset,
+        )
+
     def visit_BUILD_TUPLE(self, i):
-        nodes = []
-        while self.stack.top() is not None:
-            node = self.stack.pop()
-            nodes.append(self.visit(node))
-        return ast.Tuple(elts=list(reversed(nodes)), ctx=ast.Load())
+        nodes = [self.visit() for _ in range(i.arg)]
+        nodes.reverse()
+        return ast.Tuple(elts=nodes, ctx=ast.Load())
 
     def visit_BUILD_LIST(self, i):
-        nodes = []
-        while self.stack.top() is not None:
-            node = self.stack.pop()
-            nodes.append(self.visit(node))
-        return ast.List(elts=list(reversed(nodes)), ctx=ast.Load())
+        nodes = [self.visit() for _ in range(i.arg)]
+        nodes.reverse()
+        return ast.List(elts=nodes, ctx=ast.Load())
 
     def visit_BUILD_CONST_KEY_MAP(self, i):
-        keys = self.stack.pop()
+        keys = self.cursor.pop()
         num_keys = len(keys.argval)
         keys_attr = self.visit(keys)
         nodes = []
         j = 0
         while j < num_keys:
-            node = self.stack.pop()
+            node = self.cursor.pop()
             nodes.append(self.visit(node))
             j += 1
         return ast.Dict(
@@ -206,35 +217,49 @@ class InstructionVisitor(object):
         )
 
     def visit_BINARY_ADD(self, i):
-        right = self.visit(self.stack.pop())
-        left = self.visit(self.stack.pop())
+        right = self.visit(self.cursor.pop())
+        left = self.visit(self.cursor.pop())
         return ast.BinOp(left=left, op=ast.Add(), right=right)
 
     def visit_BINARY_TRUE_DIVIDE(self, i):
-        right = self.visit(self.stack.pop())
-        left = self.visit(self.stack.pop())
+        right = self.visit(self.cursor.pop())
+        left = self.visit(self.cursor.pop())
         return ast.BinOp(left=left, op=ast.Div(), right=right)
 
     def visit_BINARY_SUBTRACT(self, i):
-        right = self.visit(self.stack.pop())
-        left = self.visit(self.stack.pop())
+        right = self.visit(self.cursor.pop())
+        left = self.visit(self.cursor.pop())
         return ast.BinOp(left=left, op=ast.Sub(), right=right)
 
     def visit_BINARY_MODULO(self, i):
-        right = self.visit(self.stack.pop())
-        left = self.visit(self.stack.pop())
+        right = self.visit(self.cursor.pop())
+        left = self.visit(self.cursor.pop())
         return ast.BinOp(left=left, op=ast.Mod(), right=right)
 
     def visit_BINARY_MULTIPLY(self, i):
-        right = self.visit(self.stack.pop())
-        left = self.visit(self.stack.pop())
+        right = self.visit(self.cursor.pop())
+        left = self.visit(self.cursor.pop())
         return ast.BinOp(left=left, op=ast.Mult(), right=right)
 
     def visit_UNARY_NOT(self, i):
-        expr = self.visit(self.stack.pop())
+        expr = self.visit(self.cursor.pop())
         return ast.UnaryOp(
             op=ast.Not(),
             operand=expr,
             lineno=i.starts_line,
             col_offset=i.offset,
         )
+
+
+def _dispatch_table(cls):
+    """
+    Maps opcode names to the visit methods of a visitor class
+    """
+    return {
+        name[len("visit_") :]: getattr(cls, name)
+        for name in dir(cls)
+        if name.startswith("visit_")
+    }
+
+
+InstructionVisitor._dispatch = _dispatch_table(InstructionVisitor)
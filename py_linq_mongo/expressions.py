@@ -1,6 +1,138 @@
 import ast
-import json
+import threading
+from collections import OrderedDict, namedtuple
 from .decompile import LambdaDecompiler
+from .parameters import Parameter, bind
+
+
+CacheInfo = namedtuple(
+    "CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"]
+)
+
+
+def _const_key(value):
+    """
+    Builds a hashable key for a code object constant. The type is part of the
+    key so that constants comparing equal (1, 1.0 and True) do not collide
+    :param value: an item of co_consts
+    :returns: a hashable key
+    """
+    if isinstance(value, (tuple, frozenset)):
+        return (type(value), tuple(_const_key(v) for v in value))
+    return (type(value), value)
+
+
+def _code_key(code):
+    """
+    Builds the cache key of a code object from the parts that determine its
+    translation
+    :param code: a code object
+    :returns: a hashable key
+    """
+    return (
+        code.co_code,
+        _const_key(code.co_consts),
+        code.co_names,
+        code.co_varnames,
+        code.co_freevars,
+    )
+
+
+class TranslationCache(object):
+    """
+    Bounded LRU cache of translated lambda expressions keyed on their code
+    object. Cached trees are shared between callers and must not be mutated
+    """
+
+    def __init__(self, maxsize=256):
+        """
+        Default constructor
+        :param maxsize: the maximum number of translations held. 0 disables
+            caching
+        """
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._maxsize = self._validate(maxsize)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _validate(maxsize):
+        if not isinstance(maxsize, int) or maxsize < 0:
+            raise ValueError("maxsize must be a non-negative integer")
+        return maxsize
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    def get(self, code, translate):
+        """
+        Returns the cached translation of a code object, translating and
+        storing it on a miss
+        :param code: a code object
+        :param translate: function called with the code object on a miss
+        :returns: the translated tree
+        """
+        key = _code_key(code)
+        with self._lock:
+            tree = self._entries.get(key)
+            if tree is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return tree
+            self.misses += 1
+        tree = translate(code)
+        with self._lock:
+            if self._maxsize > 0:
+                self._entries[key] = tree
+                self._entries.move_to_end(key)
+                self._evict()
+        return tree
+
+    def _evict(self):
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, maxsize):
+        """
+        Changes the maximum number of translations held, evicting the least
+        recently used entries if needed
+        :param maxsize: the new maximum size
+        """
+        maxsize = self._validate(maxsize)
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """
+        Removes every translation and resets the counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def info(self):
+        """
+        Returns the cache statistics
+        :returns: CacheInfo instance
+        """
+        with self._lock:
+            return CacheInfo(
+                self.hits,
+                self.misses,
+                self.evictions,
+                self._maxsize,
+                len(self._entries),
+            )
 
 
 class LambdaExpression(object):
@@ -10,26 +142,62 @@ class LambdaExpression(object):
     appropriate Mongo syntax
     """
 
+    cache = TranslationCache()
+
     @staticmethod
     def parse(func):
+        return LambdaExpression.cache.get(
+            func.__code__, LambdaExpression.translate
+        )
+
+    @staticmethod
+    def translate(code):
+        """
+        Decompiles and translates a code object without going through the cache
+        :param code: a code object
+        :returns: the translated abstract syntax tree
+        """
         decompiler = LambdaDecompiler()
-        tree = decompiler.decompile(func.__code__)
-        translator = CollectionLambdaTranslator()
+        tree = decompiler.decompile(code)
+        translator = CollectionLambdaTranslator(
+            [arg.id for arg in tree.args.args]
+        )
         translator.generic_visit(tree)
+        tree.body.parameters = tuple(sorted(translator.parameters))
         return tree
 
+    @staticmethod
+    def bind(node, func):
+        """
+        Returns the Mongo fragment of a translated node with the free variables
+        of func filled in
+        :param node: a translated node
+        :param func: the lambda function the node was translated from
+        :returns: the bound Mongo fragment
+        """
+        if func is None or not getattr(node, "parameters", ()):
+            return node.mongo
+        return bind(node.mongo, func)
+
 
 class CollectionLambdaTranslator(ast.NodeVisitor):
     """
     Visitor for converting lambda expressions into Mongo query
     """
 
-    def __init__(self):
+    def __init__(self, arguments=()):
         """
         Default constructor
-        :param collection_type: The Model type
+        :param arguments: the argument names of the lambda expression. Any other
+            name is translated to a Parameter
         """
         super(CollectionLambdaTranslator, self).__init__()
+        self.arguments = set(arguments)
+        self.parameters = set()
+
+    def _parameter(self, name):
+        self.parameters.add(name)
+        return Parameter(name)
 
     def visit_Return(self, node):
         self.generic_visit(node)
@@ -93,35 +261,46 @@ class CollectionLambdaTranslator(ast.NodeVisitor):
         node.mongo = "$ne"
 
     def visit_Attribute(self, node):
+        path = [node.attr]
+        root = node.value
+        while isinstance(root, ast.Attribute):
+            path.insert(0, root.attr)
+            root = root.value
+        if isinstance(root, ast.Name) and root.id not in self.arguments:
+            node.mongo = self._parameter(".".join([root.id, *path]))
+            return
         node.mongo = node.attr
 
+    def visit_Name(self, node):
+        if node.id == "None":
+            node.mongo = None
+        elif node.id not in self.arguments:
+            node.mongo = self._parameter(node.id)
+
+    def visit_Constant(self, node):
+        node.mongo = node.value
+
     def visit_Compare(self, node):
         self.generic_visit(node)
-        v = {}
-        v[node.left.mongo] = {}
-        v[node.left.mongo][node.ops[0].mongo] = node.comparators[0].mongo
-        node.mongo = json.dumps(v)
+        node.mongo = {
+            node.left.mongo: {node.ops[0].mongo: node.comparators[0].mongo}
+        }
 
     def visit_BoolOp(self, node):
         self.generic_visit(node)
-        v = {}
-        v[node.op.mongo] = []
+        op = node.op.mongo
+        predicates = []
         for predicate in node.values:
             if isinstance(predicate, ast.Name):
                 continue
-            if isinstance(predicate, ast.BoolOp):
-                self.generic_visit(predicate)
-                if node.op.mongo == predicate.op.mongo:
-                    v[node.op.mongo].extend(
-                        list(map(lambda p: p.mongo, predicate.values))
-                    )
-                    continue
-            v[node.op.mongo].append(predicate.mongo)
-        node.mongo = json.dumps(v)
+            if isinstance(predicate, ast.BoolOp) and predicate.op.mongo == op:
+                predicates.extend(predicate.mongo[op])
+                continue
+            predicates.append(predicate.mongo)
+        node.mongo = {op: predicates}
 
     def visit_BinOp(self, node):
         self.generic_visit(node)
-        v = {}
         left = (
             "${0}".format(node.left.mongo)
             if isinstance(node.left, ast.Attribute)
@@ -132,32 +311,38 @@ class CollectionLambdaTranslator(ast.NodeVisitor):
             if isinstance(node.right, ast.Attribute)
             else node.right.mongo
         )
-        v[node.op.mongo] = [left, right]
-        node.mongo = json.dumps(v)
+        node.mongo = {node.op.mongo: [left, right]}
 
     def visit_UnaryOp(self, node):
         self.generic_visit(node)
-        v = {}
-        v[node.operand.left.attr] = {}
-        v[node.operand.left.attr][node.op.mongo] = {}
-        v[node.operand.left.attr][node.op.mongo][
-            node.operand.ops[0].mongo
-        ] = node.operand.comparators[0].mongo
-        node.mongo = json.dumps(v)
+        operand = node.operand
+        if not isinstance(operand, ast.Compare):
+            node.mongo = {"$nor": [operand.mongo]}
+            return
+        node.mongo = {
+            operand.left.attr: {
+                node.op.mongo: {
+                    operand.ops[0].mongo: operand.comparators[0].mongo
+                }
+            }
+        }
 
     def visit_List(self, node):
-        v = {"$project": {}}
-        for e in node.elts:
-            v["$project"][e.attr] = "${0}".format(e.attr)
-        node.mongo = json.dumps(v)
+        self.generic_visit(node)
+        if not all(isinstance(e, ast.Attribute) for e in node.elts):
+            node.mongo = [e.mongo for e in node.elts]
+            return
+        node.mongo = {
+            "$project": {e.attr: "${0}".format(e.attr) for e in node.elts}
+        }
 
     def visit_Tuple(self, node):
         self.visit_List(node)
 
     def visit_Dict(self, node):
-        v = {"$project": {}}
-        for i in range(len(node.keys)):
-            key = node.keys[i].s
-            value = "${0}".format(node.values[i].attr)
-            v["$project"][key] = value
-        node.mongo = json.dumps(v)
+        node.mongo = {
+            "$project": {
+                key.s: "${0}".format(value.attr)
+                for key, value in zip(node.keys, node.values)
+            }
+        }
@@ -3,52 +3,76 @@ from datetime import datetime
 
 
 class ModelAttribute(object):
-    def __init__(self, attribute_type, name):
+    def __init__(
+        self,
+        attribute_type,
+        name,
+        index=None,
+        unique=False,
+        sparse=False,
+        expire_after_seconds=None,
+    ):
         """
         Default Constructor
         :param attribute type: The object type of the attribute
         :param name: The name of the attribute in the Mongo DB document
+        :param index: direction of a single field index on the attribute, 1 or
+            -1, or an index type such as "hashed". None for no index
+        :param unique: if True, the attribute has a unique index
+        :param sparse: if True, the index skips documents without the attribute
+        :param expire_after_seconds: if set, documents are deleted this number
+            of seconds after the date held by the attribute
         """
         self.attribute_type = attribute_type
         if not type(name) is str:
             raise TypeError("name argument must be a string")
         self.name = name
+        if index is None and (
+            unique or sparse or expire_after_seconds is not None
+        ):
+            index = 1
+        self.index = index
+        self.unique = unique
+        self.sparse = sparse
+        self.expire_after_seconds = expire_after_seconds
 
 
 class ObjectId(ModelAttribute):
-    def __init__(self, name="_id"):
+    def __init__(self, name="_id", **options):
         """
         Attribute used to model the ObjectId attribute of a document
         :param name: The name of the ObjectId attribute
         """
-        super(ObjectId, self).__init__(pymongo.collection.ObjectId, name)
+        super(ObjectId, self).__init__(
+            pymongo.collection.ObjectId, name, **options
+        )
 
 
 class String(ModelAttribute):
-    def __init__(self, name):
+    def __init__(self, name, **options):
         """
         Attribute used to model a string attribute type of a document
         :param name: The name of the string attribute in the MongoDB document
         """
-        super(String, self).__init__(str, name)
+        super(String, self).__init__(str, name, **options)
 
 
 class Integer(ModelAttribute):
-    def __init__(self, name):
+    def __init__(self, name, **options):
         """
         Attribute used to model an integer attribute type of a document
         :param name: The name of the integer attribute in the MongoDB document
         """
-        super(Integer, self).__init__(int, name)
+        super(Integer, self).__init__(int, name, **options)
 
 
 class DateTime(ModelAttribute):
-    def __init__(self, name):
+    def __init__(self, name, **options):
         """
         Attribute used to model a date attribute type of a document
         :param name -> The name of the date attribute in the MongoDB document
         """
-        super(DateTime, self).__init__(datetime, name)
+        super(DateTime, self).__init__(datetime, name, **options)
 
 
 class Array(ModelAttribute):
@@ -57,5 +81,5 @@ class Array(ModelAttribute):
     :param name -> the name of the array attribute in the MongoDB document
     """
 
-    def __init__(self, name):
-        super(Array, self).__init__(list, name)
+    def __init__(self, name, **options):
+        super(Array, self).__init__(list, name, **options)
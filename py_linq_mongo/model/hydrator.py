@@ -0,0 +1,281 @@
+import keyword
+import struct
+import threading
+from collections import namedtuple
+import bson
+from .attributes import ModelAttribute
+
+# size of the value of fixed size BSON elements, keyed by type byte
+_FIXED_SIZES = {
+    0x01: 8,
+    0x06: 0,
+    0x07: 12,
+    0x08: 1,
+    0x09: 8,
+    0x0A: 0,
+    0x10: 4,
+    0x11: 8,
+    0x12: 8,
+    0x13: 16,
+    0x7F: 0,
+    0xFF: 0,
+}
+
+_INT32 = struct.Struct("<i")
+
+
+def model_attributes(model):
+    """
+    Finds the attributes declared on a model class and its bases
+    :param model: a model class
+    :returns: dictionary of ModelAttribute instances keyed by Python
+        attribute name, in declaration order
+    """
+    attributes = {}
+    for cls in reversed(getattr(model, "__mro__", (model,))):
+        for name, value in vars(cls).items():
+            if isinstance(value, ModelAttribute):
+                attributes[name] = value
+    return attributes
+
+
+class Document(object):
+    """
+    Base class of the objects returned for the documents of a model. Declared
+    attributes are stored in slots. Any other field of the document is read
+    from the document itself
+    """
+
+    __slots__ = ("_document",)
+
+    def __getattr__(self, name):
+        if name == "_document":
+            raise AttributeError(name)
+        try:
+            return self._document[name]
+        except KeyError:
+            raise AttributeError(
+                "'{0}' object has no attribute '{1}'".format(
+                    self.__class__.__name__, name
+                )
+            )
+
+    def __repr__(self):
+        return "{0}({1!r})".format(self.__class__.__name__, self._document)
+
+
+def _value_end(raw, type_byte, start):
+    """
+    Finds the end of the value of a BSON element
+    :param raw: the bytes of a BSON document
+    :param type_byte: the type of the element
+    :param start: offset of the value
+    :returns: offset of the byte following the value
+    """
+    size = _FIXED_SIZES.get(type_byte)
+    if size is not None:
+        return start + size
+    if type_byte in (0x02, 0x0D, 0x0E):
+        return start + 4 + _INT32.unpack_from(raw, start)[0]
+    if type_byte in (0x03, 0x04, 0x0F):
+        return start + _INT32.unpack_from(raw, start)[0]
+    if type_byte == 0x05:
+        return start + 5 + _INT32.unpack_from(raw, start)[0]
+    if type_byte == 0x0B:
+        return raw.index(b"\x00", raw.index(b"\x00", start) + 1) + 1
+    if type_byte == 0x0C:
+        return start + 16 + _INT32.unpack_from(raw, start)[0]
+    raise bson.errors.InvalidBSON(
+        "unknown element type 0x{0:02x}".format(type_byte)
+    )
+
+
+def decode_field(raw, key):
+    """
+    Decodes a single top level field of a BSON document without decoding the
+    other fields
+    :param raw: the bytes of a BSON document. Elements are sliced through a
+        memoryview so that only the decoded field is copied
+    :param key: name of the field
+    :returns: the decoded value
+    :raises KeyError: if the document has no such field
+    """
+    name = key.encode("utf-8")
+    view = memoryview(raw)
+    end = len(raw) - 1
+    position = 4
+    while position < end:
+        type_byte = raw[position]
+        key_end = raw.index(b"\x00", position + 1)
+        value_end = _value_end(raw, type_byte, key_end + 1)
+        if view[position + 1 : key_end] == name:
+            element = view[position:value_end]
+            document = b"".join(
+                (_INT32.pack(len(element) + 5), element, b"\x00")
+            )
+            return bson.decode(document)[key]
+        position = value_end
+    raise KeyError(key)
+
+
+class LazyDocument(object):
+    """
+    Base class of the objects returned for raw BSON documents. Fields are
+    decoded on first access and the decoded value is kept
+    """
+
+    __slots__ = ("_raw", "_values")
+
+    # Python attribute name to document field of the declared attributes
+    _fields = {}
+
+    def __getattr__(self, name):
+        if name in LazyDocument.__slots__:
+            raise AttributeError(name)
+        key = self._fields.get(name, name)
+        values = self._values
+        if key in values:
+            return values[key]
+        if self._raw is not None:
+            try:
+                value = values[key] = decode_field(self._raw, key)
+                return value
+            except KeyError:
+                pass
+        if name in self._fields:
+            return None
+        raise AttributeError(
+            "'{0}' object has no attribute '{1}'".format(
+                self.__class__.__name__, name
+            )
+        )
+
+    def __repr__(self):
+        return "{0}({1} bytes)".format(
+            self.__class__.__name__,
+            len(self._raw) if self._raw is not None else len(self._values),
+        )
+
+
+class Hydrator(object):
+    """
+    Converts the documents returned by MongoDb into result objects for a model.
+    The conversion function is generated once per model and mode
+    """
+
+    MODES = ("object", "tuple", "dict", "lazy")
+
+    _cache = {}
+    _lock = threading.Lock()
+
+    def __init__(self, model, mode="object"):
+        """
+        Default constructor
+        :param model: the model class
+        :param mode: object for Document instances with slots for the declared
+            attributes, tuple for named tuples of the declared attributes or
+            dict for the documents as returned by pymongo. lazy expects
+            RawBSONDocument instances and decodes each field on first access
+        """
+        if mode not in self.MODES:
+            raise ValueError(
+                "mode must be one of {0}".format(", ".join(self.MODES))
+            )
+        self.model = model
+        self.mode = mode
+        self.raw = mode == "lazy"
+        self.fields = {
+            name: attribute.name
+            for name, attribute in model_attributes(model).items()
+            if name.isidentifier() and not keyword.iskeyword(name)
+        }
+        if mode == "object":
+            self.type = type(
+                getattr(model, "__name__", "Document"),
+                (Document,),
+                {"__slots__": tuple(self.fields), "__module__": __name__},
+            )
+            self.hydrate = self._compile()
+        elif mode == "tuple":
+            self.type = namedtuple(
+                getattr(model, "__name__", "Document"),
+                list(self.fields),
+                rename=True,
+            )
+            keys = tuple(self.fields.values())
+            make = self.type._make
+
+            def hydrate(document):
+                get = document.get
+                return make([get(k) for k in keys])
+
+            self.hydrate = hydrate
+        elif mode == "lazy":
+            self.type = type(
+                getattr(model, "__name__", "Document"),
+                (LazyDocument,),
+                {
+                    "__slots__": (),
+                    "_fields": self.fields,
+                    "__module__": __name__,
+                },
+            )
+            new = object.__new__
+            cls = self.type
+
+            def hydrate(document):
+                obj = new(cls)
+                raw = getattr(document, "raw", None)
+                if raw is None:
+                    obj._raw = None
+                    obj._values = document
+                else:
+                    obj._raw = raw
+                    obj._values = {}
+                return obj
+
+            self.hydrate = hydrate
+        else:
+            self.type = dict
+            self.hydrate = _identity
+
+    @classmethod
+    def for_model(cls, model, mode="object"):
+        """
+        Returns the shared hydrator of a model
+        :param model: the model class
+        :param mode: one of MODES
+        """
+        key = (model, mode)
+        hydrator = cls._cache.get(key)
+        if hydrator is None:
+            with cls._lock:
+                hydrator = cls._cache.get(key)
+                if hydrator is None:
+                    hydrator = cls._cache[key] = cls(model, mode)
+        return hydrator
+
+    def __call__(self, document):
+        return self.hydrate(document)
+
+    def _compile(self):
+        """
+        Generates a function that creates an instance of the model type and
+        fills its slots from a document
+        """
+        lines = [
+            "def hydrate(document):",
+            "    obj = new(cls)",
+            "    obj._document = document",
+            "    get = document.get",
+        ]
+        for name, key in self.fields.items():
+            lines.append("    obj.{0} = get({1!r})".format(name, key))
+        lines.append("    return obj")
+        namespace = {"new": object.__new__, "cls": self.type}
+        exec("\n".join(lines), namespace)
+        return namespace["hydrate"]
+
+
+def _identity(document):
+    return document
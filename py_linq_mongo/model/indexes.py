@@ -0,0 +1,188 @@
+import pymongo
+from ..expressions import LambdaExpression
+from .hydrator import model_attributes
+
+# options of a listed index compared with the options of a declared one
+_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+class Index(object):
+    """
+    Index of the collection of a model, declared in the __indexes__ attribute
+    of the model class
+    """
+
+    def __init__(
+        self,
+        *keys,
+        name=None,
+        unique=False,
+        sparse=False,
+        expire_after_seconds=None,
+        partial_filter=None
+    ):
+        """
+        Default constructor
+        :param keys: field names for ascending keys, or (field, direction)
+            tuples where direction is 1, -1 or an index type such as "hashed".
+            Fields can be given by the name of the model attribute
+        :param name: name of the index. Defaults to the name MongoDb gives it
+        :param unique: if True, two documents cannot have the same keys
+        :param sparse: if True, documents without the fields are not indexed
+        :param expire_after_seconds: if set, documents are deleted this number
+            of seconds after the date held by the field of a single field index
+        :param partial_filter: query document, or lambda such as given to
+            where(), selecting the documents indexed
+        """
+        if not keys:
+            raise ValueError("an index needs at least one key")
+        self.keys = [(k, 1) if isinstance(k, str) else tuple(k) for k in keys]
+        if expire_after_seconds is not None and len(self.keys) > 1:
+            raise ValueError("expire_after_seconds needs a single field index")
+        self._name = name
+        self.unique = unique
+        self.sparse = sparse
+        self.expire_after_seconds = expire_after_seconds
+        self.partial_filter = partial_filter
+
+    @property
+    def name(self):
+        if self._name is not None:
+            return self._name
+        return "_".join("{0}_{1}".format(*key) for key in self.keys)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Index)
+            and self.keys == other.keys
+            and self.name == other.name
+            and self.options == other.options
+        )
+
+    def __repr__(self):
+        return "Index({0}, name={1!r}, options={2!r})".format(
+            ", ".join(repr(key) for key in self.keys), self.name, self.options
+        )
+
+    @property
+    def options(self):
+        """
+        Dictionary of the options of the index that are set, as MongoDb names
+        them
+        """
+        options = {}
+        if self.unique:
+            options["unique"] = True
+        if self.sparse:
+            options["sparse"] = True
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        if callable(self.partial_filter):
+            t = LambdaExpression.parse(self.partial_filter)
+            options["partialFilterExpression"] = LambdaExpression.bind(
+                t.body, self.partial_filter
+            )
+        elif self.partial_filter is not None:
+            options["partialFilterExpression"] = self.partial_filter
+        return options
+
+    def resolve(self, fields):
+        """
+        Returns a copy of this index keyed by document field names
+        :param fields: dictionary of document field names keyed by model
+            attribute name
+        :returns: Index object
+        """
+        index = Index(
+            *[(fields.get(field, field), d) for field, d in self.keys],
+            unique=self.unique,
+            sparse=self.sparse,
+            expire_after_seconds=self.expire_after_seconds,
+            partial_filter=self.partial_filter
+        )
+        index._name = self._name
+        return index
+
+    def matches(self, document):
+        """
+        Tells whether an index listed by list_indexes() is this index
+        :param document: a document returned by list_indexes()
+        """
+        listed = {
+            k: document[k]
+            for k in _OPTIONS
+            if k in document and document[k] is not False
+        }
+        return (
+            list(document["key"].items()) == self.keys
+            and listed == self.options
+        )
+
+    def model(self, background=True):
+        """
+        Returns the IndexModel given to create_indexes()
+        :param background: if True, the index is built without blocking the
+            collection on the servers that support it
+        """
+        return pymongo.IndexModel(
+            self.keys, name=self.name, background=background, **self.options
+        )
+
+
+def model_indexes(model):
+    """
+    Finds the indexes declared on a model class, through the index options of
+    its attributes and its __indexes__ attribute
+    :param model: a model class
+    :returns: list of Index objects keyed by document field names
+    """
+    attributes = model_attributes(model)
+    indexes = [
+        Index(
+            (attribute.name, attribute.index),
+            unique=attribute.unique,
+            sparse=attribute.sparse,
+            expire_after_seconds=attribute.expire_after_seconds,
+        )
+        for attribute in attributes.values()
+        if attribute.index is not None
+    ]
+    fields = {name: attribute.name for name, attribute in attributes.items()}
+    for index in getattr(model, "__indexes__", ()):
+        if isinstance(index, str):
+            index = Index(index)
+        indexes.append(index.resolve(fields))
+    return indexes
+
+
+def missing_indexes(model, existing):
+    """
+    Compares the indexes declared on a model with the indexes of its
+    collection
+    :param model: a model class
+    :param existing: the documents returned by list_indexes()
+    :returns: list of the declared Index objects the collection does not have
+    :raises ValueError: if an index of the collection has the keys or the
+        name of a declared index but other keys or options
+    """
+    existing = list(existing)
+    missing = []
+    conflicts = []
+    for index in model_indexes(model):
+        same = [
+            document
+            for document in existing
+            if document["name"] == index.name
+            or list(document["key"].items()) == index.keys
+        ]
+        if not same:
+            missing.append(index)
+        elif not any(index.matches(document) for document in same):
+            conflicts.append(index.name)
+    if conflicts:
+        raise ValueError(
+            "Indexes {0} of {1} differ from the existing indexes".format(
+                ", ".join(conflicts), model.__name__
+            )
+        )
+    return missing
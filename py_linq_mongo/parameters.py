@@ -0,0 +1,126 @@
+import builtins
+
+
+class Parameter(object):
+    """
+    Placeholder for a value that is not known when a lambda expression is
+    translated. Parameters are replaced by their values before a query is sent
+    to MongoDb
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        """
+        Default constructor
+        :param name: the name of the free variable, optionally followed by a
+            dotted attribute path
+        """
+        if not isinstance(name, str):
+            raise TypeError("name argument must be a string")
+        self.name = name
+
+    def __eq__(self, other):
+        return isinstance(other, Parameter) and self.name == other.name
+
+    def __hash__(self):
+        return hash((Parameter, self.name))
+
+    def __repr__(self):
+        return "Parameter({0!r})".format(self.name)
+
+
+def _follow(value, path):
+    """
+    Follows a dotted attribute path from a resolved root value
+    :param value: the value of the root name
+    :param path: list of attribute names
+    :returns: the value at the end of the path
+    """
+    if isinstance(value, Parameter):
+        return Parameter(".".join([value.name, *path]))
+    for attr in path:
+        value = getattr(value, attr)
+    return value
+
+
+def resolve(name, func):
+    """
+    Resolves a free variable of a lambda function from its closure, globals or
+    builtins
+    :param name: the parameter name
+    :param func: the lambda function that refers to the variable
+    :returns: the current value of the variable
+    """
+    root, *path = name.split(".")
+    code = func.__code__
+    if root in code.co_freevars:
+        cell = func.__closure__[code.co_freevars.index(root)]
+        try:
+            value = cell.cell_contents
+        except ValueError:
+            raise NameError(
+                "free variable '{0}' referenced before assignment".format(root)
+            )
+    elif root in func.__globals__:
+        value = func.__globals__[root]
+    elif hasattr(builtins, root):
+        value = getattr(builtins, root)
+    else:
+        raise NameError("name '{0}' is not defined".format(root))
+    return _follow(value, path)
+
+
+def substitute(value, lookup):
+    """
+    Replaces every Parameter in a Mongo query fragment. Containers without
+    parameters are returned as is so that cached fragments are shared
+    :param value: a query fragment made of dicts, lists and scalars
+    :param lookup: function returning the value of a Parameter
+    :returns: the fragment with its parameters replaced
+    """
+    if isinstance(value, Parameter):
+        return lookup(value)
+    if isinstance(value, dict):
+        result = {}
+        changed = False
+        for k, v in value.items():
+            result[k] = substitute(v, lookup)
+            changed = changed or result[k] is not v
+        return result if changed else value
+    if isinstance(value, list):
+        result = [substitute(v, lookup) for v in value]
+        if any(r is not v for r, v in zip(result, value)):
+            return result
+        return value
+    return value
+
+
+def bind(value, func):
+    """
+    Replaces the parameters of a query fragment with the current values of the
+    free variables of the lambda function it was translated from
+    :param value: a query fragment
+    :param func: the lambda function
+    :returns: the bound fragment
+    """
+    return substitute(value, lambda p: resolve(p.name, func))
+
+
+def bind_values(value, values):
+    """
+    Replaces the parameters of a query fragment with the given values
+    :param value: a query fragment
+    :param values: dictionary of parameter values keyed by name
+    :returns: the bound fragment
+    """
+
+    def lookup(parameter):
+        root, *path = parameter.name.split(".")
+        if root not in values:
+            raise KeyError(
+                "no value given for parameter '{0}'".format(parameter.name)
+            )
+        return _follow(values[root], path)
+
+    return substitute(value, lookup)
@@ -1,10 +1,19 @@
 import pymongo
+from .clients import PoolStatistics, clients
+from .model.indexes import missing_indexes
 from .query import Queryable
+from .query.advisor import IndexAdvisor
+from .query.asynchronous import AsyncQueryable
+from .query.cache import ResultCache
+from .query.cursors import CursorRegistry
 
 
 class MongoProvider(object):
     __connection = None
     _database = None
+    _pool_statistics = None
+    _cache = None
+    _advisor = None
 
     def __init__(self, mongo_client: pymongo.MongoClient, db_name: str) -> None:
         """
@@ -12,6 +21,7 @@ class MongoProvider(object):
         """
         self._connection = mongo_client
         self._database = self._connection[db_name]
+        self._cursors = CursorRegistry()
 
     @classmethod
     def connect(
@@ -21,6 +31,12 @@ class MongoProvider(object):
         username: str = None,
         password: str = None,
         authentication_db: str = "admin",
+        max_pool_size: int = 100,
+        min_pool_size: int = 0,
+        wait_queue_timeout_ms: int = None,
+        compressors: str = None,
+        shared: bool = True,
+        **options
     ):
         """
         MongoProvider constructor
@@ -30,16 +46,43 @@ class MongoProvider(object):
         :param password: if authentication is required, the password to authenticate to MongoDb with
         :param authentication_db: if authentication is required, the database where username and
             password credentials are stored
+        :param max_pool_size: maximum number of connections of the pool
+        :param min_pool_size: number of connections the pool keeps open
+        :param wait_queue_timeout_ms: how long a query waits for a connection
+            when all of them are in use. Waits forever if None
+        :param compressors: comma separated wire compressors such as zstd,zlib
+        :param shared: if True, the client is shared with the other providers
+            connecting with the same arguments in this process
+        :param options: other keyword arguments of the client
         """
-        cls(
-            pymongo.MongoClient(
-                uri,
-                username=username,
-                password=password,
-                authSource=authentication_db,
-            ),
-            db_name=db_name,
+        kwargs = dict(
+            username=username,
+            password=password,
+            authSource=authentication_db,
+            maxPoolSize=max_pool_size,
+            minPoolSize=min_pool_size,
+            **options
         )
+        if wait_queue_timeout_ms is not None:
+            kwargs["waitQueueTimeoutMS"] = wait_queue_timeout_ms
+        if compressors is not None:
+            kwargs["compressors"] = compressors
+        if shared:
+            client, statistics = clients.get(cls._client, uri, **kwargs)
+        else:
+            statistics = PoolStatistics()
+            listeners = [*kwargs.pop("event_listeners", []), statistics]
+            client = cls._client(uri, event_listeners=listeners, **kwargs)
+        provider = cls(client, db_name=db_name)
+        provider._pool_statistics = statistics
+        return provider
+
+    @staticmethod
+    def _client(uri, **kwargs):
+        """
+        Creates the client used by connect
+        """
+        return pymongo.MongoClient(uri, **kwargs)
 
     @property
     def connection(self):
@@ -49,11 +92,65 @@ class MongoProvider(object):
     def database(self):
         return self._database
 
-    def query(self, collection_type) -> Queryable:
+    @property
+    def pool_statistics(self) -> dict:
         """
-        Creates a Queryable instance used to query an underlying collection
-        :param collection: a collection class
-        :returns Queryable instance
+        Counts of the connection pool events of the client of this provider,
+        or None if the client was not created by connect
+        """
+        if self._pool_statistics is None:
+            return None
+        return self._pool_statistics.snapshot()
+
+    @property
+    def cache(self) -> ResultCache:
+        """
+        The cache of the query results, or None if caching is not enabled
+        """
+        return self._cache
+
+    def enable_cache(
+        self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 60
+    ) -> ResultCache:
+        """
+        Caches the results of to_list, first, single, count and the scalar
+        aggregates of the queries created by this provider afterwards
+        :param max_bytes: maximum total size of the cached results in bytes.
+            The least recently used results are evicted first
+        :param ttl: number of seconds a result is kept. Models can override it
+            with a __cache_ttl__ attribute, 0 disabling caching for the model
+        :returns: the ResultCache
+        """
+        self._cache = ResultCache(max_bytes=max_bytes, ttl=ttl)
+        return self._cache
+
+    @property
+    def advisor(self) -> IndexAdvisor:
+        """
+        The IndexAdvisor recording the queries, or None if it is not enabled
+        """
+        return self._advisor
+
+    def enable_advisor(self) -> IndexAdvisor:
+        """
+        Records the shapes of the queries created by this provider afterwards,
+        to propose the indexes serving them
+        :returns: the IndexAdvisor
+        """
+        self._advisor = IndexAdvisor()
+        return self._advisor
+
+    @property
+    def open_cursors(self) -> int:
+        """
+        Number of cursors opened by the queries of this provider that are not
+        closed yet
+        """
+        return len(self._cursors)
+
+    def _collection(self, collection_type):
+        """
+        Returns the collection of a model class
         """
         if not hasattr(collection_type, "__collection_name__"):
             raise AttributeError(
@@ -64,6 +161,94 @@ class MongoProvider(object):
             or len(collection_type.__collection_name__) == 0
         ):
             raise AttributeError("__collection_name__ must be set")
-        return Queryable(
-            self.database[collection_type.__collection_name__], collection_type
+        return self.database[collection_type.__collection_name__]
+
+    def query(self, collection_type) -> Queryable:
+        """
+        Creates a Queryable instance used to query an underlying collection
+        :param collection: a collection class
+        :returns Queryable instance
+        """
+        queryable = Queryable(
+            self._collection(collection_type), collection_type
+        )
+        queryable._cursors = self._cursors
+        queryable._cache = self._cache
+        queryable._advisor = self._advisor
+        return queryable
+
+    def ensure_indexes(self, models, background: bool = True) -> dict:
+        """
+        Creates the indexes declared on model classes that their collections
+        do not have yet. Existing indexes are never modified or dropped
+        :param models: model classes
+        :param background: if True, indexes are built without blocking their
+            collection on servers older than 4.2. Later servers ignore it
+        :returns: dictionary of the names of the created indexes keyed by
+            collection name
+        :raises ValueError: if an existing index has the keys or the name of a
+            declared index but other keys or options. No index is created
+        """
+        plans = []
+        for model in models:
+            collection = self._collection(model)
+            plans.append(
+                (collection, missing_indexes(model, collection.list_indexes()))
+            )
+        created = {}
+        for collection, missing in plans:
+            if missing:
+                collection.create_indexes(
+                    [index.model(background) for index in missing]
+                )
+            names = created.setdefault(collection.name, [])
+            names.extend(index.name for index in missing)
+        return created
+
+
+class AsyncMongoProvider(MongoProvider):
+    """
+    MongoProvider creating AsyncQueryable instances from an asyncio client
+    such as motor's AsyncIOMotorClient
+    """
+
+    @staticmethod
+    def _client(uri, **kwargs):
+        try:
+            from motor.motor_asyncio import AsyncIOMotorClient
+        except ImportError:
+            raise ImportError(
+                "AsyncMongoProvider.connect requires motor to be installed"
+            )
+        return AsyncIOMotorClient(uri, **kwargs)
+
+    def query(self, collection_type) -> AsyncQueryable:
+        """
+        Creates an AsyncQueryable instance used to query an underlying
+        collection
+        :param collection: a collection class
+        :returns AsyncQueryable instance
+        """
+        return AsyncQueryable.wrap(
+            super(AsyncMongoProvider, self).query(collection_type)
         )
+
+    async def ensure_indexes(self, models, background: bool = True) -> dict:
+        """
+        Creates the indexes declared on model classes that their collections
+        do not have yet, as MongoProvider.ensure_indexes does
+        """
+        plans = []
+        for model in models:
+            collection = self._collection(model)
+            existing = await collection.list_indexes().to_list(None)
+            plans.append((collection, missing_indexes(model, existing)))
+        created = {}
+        for collection, missing in plans:
+            if missing:
+                await collection.create_indexes(
+                    [index.model(background) for index in missing]
+                )
+            names = created.setdefault(collection.name, [])
+            names.extend(index.name for index in missing)
+        return created
@@ -1,18 +1,113 @@
-import json
 import ast
+import datetime
+import bson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 from ..expressions import LambdaExpression
+from ..parameters import bind_values
+from ..model.hydrator import Hydrator, model_attributes
+from ..model.indexes import Index
+from .columns import read_arrays, read_columns, structured
+from .prepared import PreparedQuery
+from .optimizer import PipelineOptimizer, _passes_through, _stage
+from .cursors import MergingCursor, PrefetchingCursor
+from .explain import explain_command, lambda_source, summarize
+from . import planner
 import abc
+import copy
 import py_linq
 from py_linq import exceptions
 from py_linq import core
 from collections import deque
 
+# types of the _id values that Python orders as the server does, so that a
+# collection can be split into ranges of them
+_ORDERED_ID_TYPES = (bson.ObjectId, str, int, float, datetime.datetime)
+
+# execution options accepted by each collection method, with the name of the
+# argument passing them
+_OPTION_ARGUMENTS = {
+    "find": {
+        "hint": "hint",
+        "maxTimeMS": "max_time_ms",
+        "allowDiskUse": "allow_disk_use",
+        "collation": "collation",
+        "comment": "comment",
+    },
+    "aggregate": {
+        "hint": "hint",
+        "maxTimeMS": "maxTimeMS",
+        "allowDiskUse": "allowDiskUse",
+        "collation": "collation",
+        "comment": "comment",
+    },
+    "count_documents": {
+        "hint": "hint",
+        "maxTimeMS": "maxTimeMS",
+        "collation": "collation",
+        "comment": "comment",
+    },
+    "estimated_document_count": {
+        "maxTimeMS": "maxTimeMS",
+        "comment": "comment",
+    },
+}
+
 
 class Queryable(object):
     """
     Class that encapsulates different methods to query a MongoDb collection
     """
 
+    optimizer = PipelineOptimizer()
+
+    # settings copied to the Queryables derived from this one
+    _carried = (
+        "_hydrator",
+        "auto_project",
+        "_batch_size",
+        "_cursors",
+        "_prefetch",
+        "_partitions",
+        "_ordered",
+        "_cache",
+        "_advisor",
+        "_options",
+    )
+    _hydrator = None
+    _batch_size = None
+
+    # execution options given to the server with each command, keyed by
+    # their name in the aggregate command
+    _options = {}
+
+    # number of batches read ahead by a background thread, if any
+    _prefetch = None
+
+    # number of cursors reading the results concurrently, if any, and whether
+    # the results of sorted queries are merged in order
+    _partitions = None
+    _ordered = True
+
+    # CursorRegistry tracking the cursors opened by this Queryable
+    _cursors = None
+
+    # ResultCache serving the results of the terminal methods, if any
+    _cache = None
+
+    # IndexAdvisor recording the shapes of the queries run, if any
+    _advisor = None
+
+    # lambdas the query was built from, shown by explain()
+    _lambdas = ()
+
+    # cursor opened by next() and the function converting its documents
+    _cursor = None
+    _convert = None
+
+    # fetch only the attributes declared on the model
+    auto_project = True
+
     def __init__(self, collection, model):
         """
         Queryable constructor
@@ -29,24 +124,598 @@ class Queryable(object):
         If so, yield a new instance of the model with results from the query.
         Otherwise, just returns none
         """
-        for item in self.collection.aggregate(self.pipeline):
-            yield type(self.model.__class__.__name__, (object,), item)
+        convert = self._converter()
+        cursor = self._open(self._query())
+        try:
+            for item in cursor:
+                yield convert(item)
+        finally:
+            # runs when the loop ends, raises or the generator is closed or
+            # garbage collected before the end of the results
+            self._release(cursor)
 
     def next(self):
-        item = next(self.collection.aggregate(self.pipeline))
-        return type(self.model.__class__.__name__, (object, ), item)
+        """
+        Returns the next result. The query runs once, on the first call, and
+        its cursor is reused by the following calls until close() is called
+        """
+        if self._cursor is None:
+            self._convert = self._converter()
+            self._cursor = self._open(self._query())
+        try:
+            return self._convert(next(self._cursor))
+        except StopIteration:
+            self._release(self._cursor)
+            raise
 
     def __next__(self):
         return self.next()
 
-    def count(self):
+    def close(self):
+        """
+        Closes the cursor opened by next(). A later call to next() runs the
+        query again
+        """
+        cursor, self._cursor = self._cursor, None
+        if cursor is not None:
+            self._release(cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def _open(self, pipeline):
+        """
+        Runs a pipeline and registers its cursor
+        pipeline -> list of stages
+        return -> a cursor over the results
+        """
+        cursor = None
+        if self._partitions is not None:
+            cursor = self._open_partitions(pipeline)
+        if cursor is None:
+            cursor = self._execute(pipeline)
+            if self._prefetch is not None:
+                cursor = PrefetchingCursor(
+                    [cursor], self._prefetch, self._batch_size or 100
+                )
+        if self._cursors is not None:
+            self._cursors.add(cursor)
+        return cursor
+
+    def _open_partitions(self, pipeline):
+        """
+        Runs a pipeline as several queries over ranges of _id values, read
+        concurrently. Sorted results are merged in order unless ordered is off
+        pipeline -> list of stages
+        return -> a cursor over the results, or None if the pipeline has stages
+            other than $match, $sort and $project, if it is sorted with a
+            collation or if the collection cannot be split
+        """
+        pipeline = self.optimizer.optimize(pipeline)
+        sort = None
+        for stage in pipeline:
+            op, argument = _stage(stage)
+            if op == "$sort" and self._ordered:
+                sort = list(argument.items())
+            elif op == "$project" and sort is not None:
+                # the results are merged on the fields of the sort
+                if not all(_passes_through(argument, f) for f, _ in sort):
+                    return None
+            elif op not in ("$match", "$sort", "$project"):
+                return None
+        if sort is not None and "collation" in self._options:
+            # the partitions are sorted by the collation, which the merge of
+            # their results cannot follow
+            return None
+        ranges = self._partition_ranges(self._partitions)
+        if len(ranges) < 2:
+            return None
+        self._advise(pipeline)
+        cursors = [
+            self._execute([{"$match": {"_id": r}}, *pipeline], advise=False)
+            for r in ranges
+        ]
+        depth = self._prefetch or 2
+        batch_size = self._batch_size or 100
+        if sort is not None:
+            return MergingCursor(cursors, sort, depth, batch_size)
+        return PrefetchingCursor(cursors, depth, batch_size)
+
+    def _partition_ranges(self, partitions):
+        """
+        Splits the _id values of the collection into ranges holding about the
+        same number of documents. The split points are read from a random
+        sample of the collection
+        partitions -> maximum number of ranges
+        return -> list of query documents on _id covering every document
+        """
+        sample = self.collection.aggregate(
+            [
+                {"$sample": {"size": 20 * partitions}},
+                {"$project": {"_id": 1}},
+            ]
+        )
+        ids = [document["_id"] for document in sample]
+        types = {type(i) for i in ids}
+        if len(types) != 1:
+            # range queries only match values of the type of their bound
+            return []
+        (id_type,) = types
+        if not issubclass(id_type, _ORDERED_ID_TYPES) or id_type is bool:
+            return []
+        ids.sort()
+        points = []
+        for i in range(1, partitions):
+            point = ids[len(ids) * i // partitions]
+            if not points or points[-1] < point:
+                points.append(point)
+        if not points:
+            return []
+        # the first range matches the _id values of any other type as well
+        ranges = [{"$not": {"$gte": points[0]}}]
+        for low, high in zip(points, points[1:]):
+            ranges.append({"$gte": low, "$lt": high})
+        ranges.append({"$gte": points[-1]})
+        return ranges
+
+    def _documents(self, pipeline):
+        """
+        Runs a pipeline and reads all of its documents
+        pipeline -> list of stages
+        return -> list of documents
+        """
+        cursor = self._open(pipeline)
+        try:
+            return list(cursor)
+        finally:
+            self._release(cursor)
+
+    def _release(self, cursor):
+        """
+        Closes a cursor returned by _open so that the server frees it
+        cursor -> a cursor over the results
+        """
+        try:
+            cursor.close()
+        finally:
+            if self._cursors is not None:
+                self._cursors.discard(cursor)
+
+    def _query(self):
+        """
+        Returns the pipeline run to iterate this Queryable
+        """
+        return self._projected(self.pipeline)
+
+    def _converter(self):
+        """
+        Returns the function that converts each document of the results
+        """
+        return self.hydrator.hydrate
+
+    def _clone(self):
+        """
+        Copies this Queryable with its own pipeline list and without the cursor
+        opened by next()
+        """
+        queryable = copy.copy(self)
+        # stages held as attributes (filter_dict, sort_dict...) are modified in
+        # place by later calls and must not be shared with this Queryable
+        owned = {
+            id(value): name
+            for name, value in vars(self).items()
+            if isinstance(value, dict)
+        }
+        queryable.pipeline = []
+        for stage in self.pipeline:
+            if id(stage) in owned:
+                name = owned[id(stage)]
+                stage = copy.deepcopy(stage)
+                setattr(queryable, name, stage)
+            queryable.pipeline.append(stage)
+        queryable._cursor = None
+        return queryable
+
+    @property
+    def hydrator(self):
+        """
+        The Hydrator that converts documents into results
+        """
+        if self._hydrator is None:
+            return Hydrator.for_model(self.model)
+        return self._hydrator
+
+    def hydrate(self, mode="object"):
+        """
+        Changes the type of the results
+        mode -> object for instances with slots for the attributes declared on
+            the model, tuple for named tuples of the declared attributes, dict
+            for the documents as returned by pymongo or lazy for instances
+            decoding raw BSON documents field by field
+        return -> Queryable object
+        """
+        queryable = self._clone()
+        queryable._hydrator = Hydrator.for_model(self.model, mode)
+        return queryable
+
+    def all_fields(self):
+        """
+        Fetches every field of the documents instead of the attributes declared
+        on the model
+        return -> Queryable object
+        """
+        queryable = self._clone()
+        queryable.auto_project = False
+        return queryable
+
+    def _projected(self, pipeline, *extra):
+        """
+        Appends a $project stage keeping the attributes declared on the model to
+        a pipeline, unless auto_project is off or the model declares none
+        pipeline -> list of stages
+        extra -> names of other fields to keep
+        return -> list of stages
+        """
+        if not self.auto_project:
+            return pipeline
+        fields = sorted({*self.hydrator.fields.values(), *extra})
+        if not fields:
+            return pipeline
+        projection = {"_id": 1}
+        for field in fields:
+            # a field cannot be projected together with one of its parents
+            if not any(field.startswith(p + ".") for p in projection):
+                projection[field] = 1
+        return [*pipeline, {"$project": projection}]
+
+    def batch_size(self, size):
+        """
+        Sets the number of documents fetched by each round trip of the cursors
+        size -> positive integer
+        return -> Queryable object
+        """
+        if not isinstance(size, int) or size < 1:
+            raise ValueError("batch size must be a positive integer")
+        queryable = self._clone()
+        queryable._batch_size = size
+        return queryable
+
+    def with_hint(self, index):
+        """
+        Forces the server to use an index
+        index -> index name, list of (field, direction) tuples or Index object
+        return -> Queryable object
+        """
+        if isinstance(index, Index):
+            index = index.keys
+        elif not isinstance(index, str):
+            index = [tuple(key) for key in index]
+        return self._with_option("hint", index)
+
+    def max_time(self, milliseconds):
+        """
+        Bounds the time the server spends running each command of the query
+        milliseconds -> positive integer
+        return -> Queryable object
+        """
+        if (
+            not isinstance(milliseconds, int)
+            or isinstance(milliseconds, bool)
+            or milliseconds < 1
+        ):
+            raise ValueError("max time must be a positive integer")
+        return self._with_option("maxTimeMS", milliseconds)
+
+    def allow_disk_use(self, allow=True):
+        """
+        Lets the server write temporary files for sorts and groups exceeding
+        its memory limit
+        allow -> boolean
+        return -> Queryable object
+        """
+        return self._with_option("allowDiskUse", bool(allow))
+
+    def collation(self, collation):
+        """
+        Sets the language rules used to compare strings
+        collation -> pymongo Collation object or collation document such as
+            {"locale": "fr", "strength": 2}
+        return -> Queryable object
+        """
+        return self._with_option(
+            "collation", dict(getattr(collation, "document", collation))
+        )
+
+    def comment(self, comment):
+        """
+        Tags the commands of the query, as shown by the profiler and the logs
+        of the server
+        comment -> any value that can be encoded in BSON
+        return -> Queryable object
+        """
+        return self._with_option("comment", comment)
+
+    def _with_option(self, name, value):
+        queryable = self._clone()
+        queryable._options = {**self._options, name: value}
+        return queryable
+
+    def _arguments(self, method, **kwargs):
+        """
+        Builds the keyword arguments passing the execution options of this
+        Queryable to a collection method
+        method -> name of the collection method
+        kwargs -> other arguments, taking precedence over the options
+        return -> dictionary of keyword arguments
+        """
+        names = _OPTION_ARGUMENTS[method]
+        arguments = {
+            names[name]: value
+            for name, value in self._options.items()
+            if name in names
+        }
+        arguments.update(kwargs)
+        return arguments
+
+    def prefetch(self, depth=2):
+        """
+        Reads the results in a background thread that fetches the next batches
+        of documents while the current one is processed
+        depth -> maximum number of batches read ahead
+        return -> Queryable object
+        """
+        if not isinstance(depth, int) or depth < 1:
+            raise ValueError("depth must be a positive integer")
+        queryable = self._clone()
+        queryable._prefetch = depth
+        return queryable
+
+    def parallel(self, partitions, ordered=True):
+        """
+        Reads the results with several cursors, each over a range of _id
+        values, read concurrently by background threads. Queries with stages
+        other than where, order_by and select use a single cursor
+        partitions -> number of cursors
+        ordered -> if True, the results of a sorted query are merged in order.
+            Otherwise they are returned as they are read
+        return -> Queryable object
+        """
+        if not isinstance(partitions, int) or partitions < 1:
+            raise ValueError("partitions must be a positive integer")
+        queryable = self._clone()
+        queryable._partitions = partitions
+        queryable._ordered = ordered
+        return queryable
+
+    def raw(self):
         """
-        Returns the number of documents in the collection
+        Returns the results as model instances that keep the raw BSON of their
+        document and decode each field on first access
+        return -> Queryable object
+        """
+        return self.hydrate("lazy")
+
+    def _derive(self, queryable, func):
+        """
+        Copies the settings of this Queryable that the Queryable built from it
+        carries
+        queryable -> the derived Queryable object
+        func -> the lambda the derived Queryable was built from
+        return -> the derived Queryable object
+        """
+        for name in queryable._carried:
+            if name in vars(self):
+                setattr(queryable, name, getattr(self, name))
+        queryable._lambdas = (*self._lambdas, func)
+        return queryable
+
+    def _execute(self, pipeline=None, advise=True):
+        """
+        Optimizes a pipeline and runs it against the collection. Pipelines made
+        of $match, $sort, $skip, $limit and $project stages are run with find()
+        instead of aggregate()
+        pipeline -> list of stages. Defaults to the pipeline of this Queryable
+        advise -> if False, the query is not recorded by the IndexAdvisor
+        return -> a cursor over the results
+        """
+        if pipeline is None:
+            pipeline = self.pipeline
+        pipeline = self.optimizer.optimize(pipeline)
+        if advise:
+            self._advise(pipeline)
+        collection = self.collection
+        if self._hydrator is not None and self._hydrator.raw:
+            collection = collection.with_options(
+                codec_options=CodecOptions(document_class=RawBSONDocument)
+            )
+        find = planner.plan(pipeline)
+        if find is not None:
+            kwargs = self._arguments("find")
+            if self._batch_size is not None:
+                kwargs["batch_size"] = self._batch_size
+            return find.execute(collection, **kwargs)
+        kwargs = self._arguments("aggregate")
+        if self._batch_size is not None:
+            kwargs["batchSize"] = self._batch_size
+        return collection.aggregate(pipeline, **kwargs)
+
+    def explain(self, verbosity="executionStats"):
+        """
+        Runs the explain command on the query, as find() or aggregate() would
+        run it
+        verbosity -> "queryPlanner", "executionStats" or "allPlansExecution"
+        return -> dictionary summarizing the plan (see explain.summarize),
+            along with the command run, the optimized pipeline, the source
+            of the lambdas the query was built from and the full output of
+            the explain command
+        """
+        pipeline = self.optimizer.optimize(self._query())
+        command = explain_command(
+            self.collection.name, pipeline, verbosity, self._options
+        )
+        explanation = self.collection.database.command(command)
+        result = summarize(explanation)
+        result["command"] = next(iter(command["explain"]))
+        result["pipeline"] = pipeline
+        result["lambdas"] = [lambda_source(func) for func in self._lambdas]
+        result["explain"] = explanation
+        return result
+
+    def _advise(self, pipeline):
+        """
+        Records the shape of a query with the IndexAdvisor of this Queryable,
+        if any
+        pipeline -> an optimized list of stages
+        """
+        if self._advisor is not None:
+            self._advisor.record(self.collection, pipeline)
+
+    def count(self, approximate=False, hint=None, sample_size=1000):
+        """
+        Returns the number of documents in the collection. Unfiltered
+        collections are counted from the collection metadata, filtered ones with
+        count_documents and any other pipeline with a $count stage
+        approximate -> if True, filtered collections are counted on a random
+            sample of documents instead of being scanned
+        hint -> index name or specification used by count_documents
+        sample_size -> number of documents sampled when approximate is True
         return -> integer object
         """
-        self.pipeline.append({"$count": "total"})
-        query = list(self.collection.aggregate(self.pipeline))
-        return query[0]["total"]
+        pipeline = self.optimizer.optimize(self.pipeline)
+        return self._cached(
+            "count",
+            [pipeline, approximate, hint, sample_size],
+            lambda: self._count(pipeline, approximate, hint, sample_size),
+        )
+
+    def _count(self, pipeline, approximate, hint, sample_size):
+        return self._perform(
+            self._counting(pipeline, approximate, hint, sample_size)
+        )
+
+    def _perform(self, steps):
+        """
+        Runs the collection calls of a generator such as _counting, sending
+        it the result of each call. The documents of aggregate() are sent as
+        a list
+        steps -> generator yielding (method name, args, kwargs) tuples
+        return -> the value the generator returns
+        """
+        result = None
+        while True:
+            try:
+                method, args, kwargs = steps.send(result)
+            except StopIteration as stop:
+                return stop.value
+            result = getattr(self.collection, method)(*args, **kwargs)
+            if method == "aggregate":
+                result = list(result)
+
+    def _counting(self, pipeline, approximate, hint, sample_size):
+        """
+        Counts the documents returned by a pipeline. Unfiltered collections
+        are counted from the collection metadata, filtered ones with
+        count_documents and any other pipeline with a $count stage. The
+        collection calls are yielded so that Queryable and AsyncQueryable run
+        them with their own driver
+        pipeline -> an optimized list of stages
+        approximate, hint, sample_size -> the arguments of count()
+        return -> generator yielding (method name, args, kwargs) tuples,
+            receiving their results and returning the count
+        """
+        find = planner.plan(pipeline)
+        if find is None:
+            counted = [*pipeline, {"$count": "total"}]
+            self._advise(counted)
+            documents = (
+                yield "aggregate",
+                (counted,),
+                self._arguments("aggregate"),
+            )
+            return documents[0]["total"] if documents else 0
+        if not find.filter and not find.skip and not find.limit:
+            return (
+                yield "estimated_document_count",
+                (),
+                self._arguments("estimated_document_count"),
+            )
+        if approximate:
+            return (yield from self._estimating(find, sample_size))
+        kwargs = self._arguments("count_documents")
+        if find.skip:
+            kwargs["skip"] = find.skip
+        if find.limit:
+            kwargs["limit"] = find.limit
+        if hint is not None:
+            kwargs["hint"] = hint
+        self._advise(pipeline)
+        return (yield "count_documents", (find.filter,), kwargs)
+
+    def _cached(self, kind, arguments, compute):
+        """
+        Serves a result from the cache of this Queryable, if any
+        kind -> name of the terminal method computing the result
+        arguments -> list of the pipeline and other arguments of the result
+        compute -> function computing the result when it is not cached
+        return -> the result
+        """
+        cache = self._cache
+        if cache is None:
+            return compute()
+        ttl = cache.ttl_for(self.model)
+        if not ttl:
+            return compute()
+        if "collation" in self._options:
+            # the collation changes which strings match and their order
+            arguments = [*arguments, self._options["collation"]]
+        try:
+            key = cache.fingerprint(self.collection.full_name, kind, arguments)
+        except bson.errors.InvalidDocument:
+            return compute()
+        return cache.fetch(key, ttl, compute)
+
+    def _estimating(self, find, sample_size):
+        """
+        Estimates the number of documents matching a find plan by counting the
+        matches in a random sample and scaling them to the size of the
+        collection. Collection calls are yielded as by _counting
+        find -> FindPlan object
+        sample_size -> number of documents to sample
+        return -> generator returning an integer object
+        """
+        if sample_size < 1:
+            raise ValueError("sample_size must be at least 1")
+        total = (
+            yield "estimated_document_count",
+            (),
+            self._arguments("estimated_document_count"),
+        )
+        if total <= sample_size:
+            matched = (
+                yield "count_documents",
+                (find.filter,),
+                self._arguments("count_documents"),
+            )
+        else:
+            # the sample is not read through an index
+            kwargs = self._arguments("aggregate")
+            kwargs.pop("hint", None)
+            sample = [
+                {"$sample": {"size": sample_size}},
+                {"$match": find.filter},
+                {"$count": "total"},
+            ]
+            documents = yield "aggregate", (sample,), kwargs
+            matched = documents[0]["total"] if documents else 0
+            matched = int(round(matched * total / sample_size))
+        matched = max(matched - find.skip, 0)
+        return min(matched, find.limit) if find.limit else matched
 
     def select(self, func, include_id=False):
         """
@@ -56,17 +725,17 @@ class Queryable(object):
         """
         t = LambdaExpression.parse(func)
         if isinstance(t.body.value, ast.Name):
-            return SimpleSelectQueryable(
+            queryable = SimpleSelectQueryable(
                 self.collection, self.pipeline, t.body, include_id
             )
-        if isinstance(t.body.value, ast.Tuple) or isinstance(
+        elif isinstance(t.body.value, ast.Tuple) or isinstance(
             t.body.value, ast.List
         ):
-            return CollectionSelectQueryable(
+            queryable = CollectionSelectQueryable(
                 self.collection, self.pipeline, t.body, include_id
             )
-        if isinstance(t.body.value, ast.Dict):
-            return DictSelectQueryable(
+        elif isinstance(t.body.value, ast.Dict):
+            queryable = DictSelectQueryable(
                 self.collection, self.pipeline, t.body, include_id
             )
         else:
@@ -75,6 +744,8 @@ class Queryable(object):
                     t.body.value.__class__.__name__
                 )
             )
+        queryable.model = self.model
+        return self._derive(queryable, func)
 
     def take(self, limit):
         self.pipeline.append({"$limit": limit})
@@ -93,10 +764,45 @@ class Queryable(object):
         return -> Queryable object that only contains elements that satisfy the given predicate
         """
         t = LambdaExpression.parse(func)
-        return WhereQueryable(
-            self.collection, self.model, self.pipeline, t.body
+        return self._derive(
+            WhereQueryable(
+                self.collection, self.model, self.pipeline, t.body, func
+            ),
+            func,
         )
 
+    def prepare(self, func):
+        """
+        Builds a query once and returns a PreparedQuery that can be executed with
+        different parameter values without translating its lambdas again
+        func -> function that receives this Queryable followed by the query
+            parameters and returns the Queryable to execute
+        return -> PreparedQuery object
+        """
+        return PreparedQuery(self, func)
+
+    def _bind(self, values):
+        """
+        Returns a copy of this Queryable with the parameters of its pipeline
+        replaced by the given values
+        values -> dictionary of parameter values keyed by name
+        return -> Queryable object
+        """
+        queryable = self._clone()
+        owned = {
+            id(value): name
+            for name, value in vars(queryable).items()
+            if isinstance(value, dict)
+        }
+        pipeline = []
+        for stage in queryable.pipeline:
+            bound = bind_values(stage, values)
+            if id(stage) in owned:
+                setattr(queryable, owned[id(stage)], bound)
+            pipeline.append(bound)
+        queryable.pipeline = pipeline
+        return queryable
+
     def max(self, func=None):
         """
         Finds the maximum value. If a lambda function is given, then will find the maximum value for the
@@ -104,9 +810,7 @@ class Queryable(object):
         func -> selector for the field want to determine the maximum of as a lambda function
         return -> the maximum value as a scalar value
         """
-        return ScalarSelectQueryable(
-            self.collection, self.pipeline, "$max", func
-        ).scalar
+        return self._scalar("$max", func)
 
     def min(self, func=None):
         """
@@ -115,9 +819,7 @@ class Queryable(object):
         func -> selector for the field to determine the minimum of as a lambda function
         return -> the minimum value as a scalar value
         """
-        return ScalarSelectQueryable(
-            self.collection, self.pipeline, "$min", func
-        ).scalar
+        return self._scalar("$min", func)
 
     def sum(self, func=None):
         """
@@ -126,9 +828,7 @@ class Queryable(object):
         func -> selector for the field to sum as a lambda function. Optional.
         return -> the sum of the values
         """
-        return ScalarSelectQueryable(
-            self.collection, self.pipeline, "$sum", func
-        ).scalar
+        return self._scalar("$sum", func)
 
     def average(self, func=None):
         """
@@ -137,9 +837,50 @@ class Queryable(object):
         func -> selector for the field to average as a lambda function. Optional
         return -> the average of the values
         """
-        return ScalarSelectQueryable(
-            self.collection, self.pipeline, "$avg", func
-        ).scalar
+        return self._scalar("$avg", func)
+
+    def aggregates(self, **accumulators):
+        """
+        Computes several statistics over a collection in a single round trip
+        accumulators -> (operator, func) tuples keyed by the name of the
+            result, where operator is one of min, max, sum, average,
+            std_dev, std_dev_sample or count and func is a lambda function
+            selecting a field. count takes no func and can be given as a string
+        return -> dictionary of the results keyed by name
+        """
+        query = AccumulatorSelectQueryable(
+            self.collection,
+            self.pipeline,
+            accumulators,
+            self._arguments("aggregate"),
+        )
+
+        def compute():
+            self._advise(self.optimizer.optimize(query.pipeline))
+            return query.values
+
+        return self._cached("aggregates", [query.pipeline], compute)
+
+    def _scalar(self, operator, func):
+        """
+        Computes a scalar operator over a collection
+        operator -> the Mongo scalar operator $min, $max, etc
+        func -> lambda function as a selector
+        return -> the scalar value
+        """
+        query = ScalarSelectQueryable(
+            self.collection,
+            self.pipeline,
+            operator,
+            func,
+            self._arguments("aggregate"),
+        )
+
+        def compute():
+            self._advise(self.optimizer.optimize(query.pipeline))
+            return query.scalar
+
+        return self._cached("scalar", [query.pipeline], compute)
 
     def any(self, func=None):
         """
@@ -147,7 +888,8 @@ class Queryable(object):
         func -> lambda expression used to filter a sequence
         return -> True if sequence does contain elements else False
         """
-        return self.first_or_default(func) is not None
+        predicate = None if func is None else self._predicate(func)
+        return self._exists(self._probe(predicate))
 
     def all(self, func=None):
         """
@@ -157,9 +899,43 @@ class Queryable(object):
         """
         if func is None:
             return True
-        predicate_count = self.where(func).count()
-        count = self.count()
-        return predicate_count == count
+        predicate = {"$nor": [self._predicate(func)]}
+        return not self._exists(self._probe(predicate))
+
+    def _predicate(self, func):
+        """
+        Translates a predicate into a query document
+        func -> lambda expression used to filter a sequence
+        return -> dict object
+        """
+        t = LambdaExpression.parse(func)
+        return LambdaExpression.bind(t.body, func)
+
+    def _probe(self, predicate=None):
+        """
+        Builds the pipeline fetching the _id of the first document of the query
+        only
+        predicate -> query document the document must match, if any
+        return -> list of stages
+        """
+        pipeline = self.pipeline
+        if predicate is not None:
+            pipeline = [*pipeline, {"$match": predicate}]
+        return [*pipeline, {"$limit": 1}, {"$project": {"_id": 1}}]
+
+    def _exists(self, probe):
+        """
+        Determines whether a probe built by _probe returns a document
+        probe -> list of stages
+        return -> True if the probe returns a document else False
+        """
+        cursor = self._open(probe)
+        try:
+            for _ in cursor:
+                return True
+            return False
+        finally:
+            self._release(cursor)
 
     def first(self, func=None):
         
@@ -168,7 +944,7 @@ class Queryable(object):
             result = result.where(func).take(1)
         else:
             result = result.take(1)
-        result = list(result)
+        result = result.to_list()
         if not result:
             raise exceptions.NoElementsError()
         return result[0]
@@ -181,14 +957,20 @@ class Queryable(object):
 
     def order_by(self, func):
         t = LambdaExpression.parse(func)
-        return OrderedQueryable(
-            self.collection, self.model, self.pipeline, t.body, 1
+        return self._derive(
+            OrderedQueryable(
+                self.collection, self.model, self.pipeline, t.body, 1
+            ),
+            func,
         )
 
     def order_by_descending(self, func):
         t = LambdaExpression.parse(func)
-        return OrderedQueryable(
-            self.collection, self.model, self.pipeline, t.body, -1
+        return self._derive(
+            OrderedQueryable(
+                self.collection, self.model, self.pipeline, t.body, -1
+            ),
+            func,
         )
 
     def single(self, func=None):
@@ -217,7 +999,62 @@ class Queryable(object):
         return py_linq.Enumerable((item for item in self))
 
     def to_list(self):
-        return self.as_enumerable().to_list()
+        if self._cache is None:
+            return self.as_enumerable().to_list()
+        pipeline = self.optimizer.optimize(self._query())
+        documents = self._cached(
+            "to_list", [pipeline], lambda: self._documents(pipeline)
+        )
+        convert = self._converter()
+        return [convert(document) for document in documents]
+
+    def to_columns(self):
+        """
+        Reads the results into one list per field instead of one object per
+        document
+        return -> dictionary of lists keyed by column name
+        """
+        pipeline, columns, _ = self._columns()
+        cursor = self._open(pipeline)
+        try:
+            return read_columns(cursor, columns)
+        finally:
+            self._release(cursor)
+
+    def to_numpy(self, structured_array=False):
+        """
+        Reads the results into one NumPy array per field. Integer, float,
+        boolean and datetime attributes get numeric dtypes and other fields are
+        stored as objects. Integer and boolean columns with missing values are
+        converted to float columns holding NaN
+        structured_array -> if True, returns a single structured array with a
+            named field per column
+        return -> dictionary of arrays keyed by column name, or a structured
+            array
+        """
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("to_numpy requires numpy to be installed")
+        pipeline, columns, types = self._columns()
+        cursor = self._open(pipeline)
+        try:
+            arrays = read_arrays(numpy, cursor, columns, types)
+        finally:
+            self._release(cursor)
+        return structured(numpy, arrays) if structured_array else arrays
+
+    def _columns(self):
+        """
+        Finds the columns returned by to_columns and to_numpy
+        return -> tuple of the pipeline to execute, a dictionary of field names
+            keyed by column name and a dictionary of Python types keyed by
+            column name
+        """
+        attributes = model_attributes(self.model)
+        columns = dict(self.hydrator.fields)
+        types = {name: attributes[name].attribute_type for name in columns}
+        return self._query(), columns, types
 
     def aggregate(self, seed, func):
         """
@@ -290,8 +1127,11 @@ class Queryable(object):
         Groups the elements of a sequece by the given key
         """
         t = LambdaExpression.parse(func)
-        return GroupedQueryable(
-            self.collection, self.model, self.pipeline, t.body
+        return self._derive(
+            GroupedQueryable(
+                self.collection, self.model, self.pipeline, t.body
+            ),
+            func,
         )
 
     def group_join(self, inner_collection, outer_key, inner_key, result_func):
@@ -376,11 +1216,22 @@ class SelectQueryable(abc.ABC, Queryable):
     Abstract class for select queryable
     """
 
+    # model of the collection, set by Queryable.select
+    model = None
+
+    # the results are projected documents, not model instances
+    _carried = tuple(
+        name
+        for name in Queryable._carried
+        if name not in ("_hydrator", "auto_project")
+    )
+
     def __init__(self, collection, pipeline, node, include_id):
         self.include_id = include_id
         self.node = node
         self.pipeline = [*pipeline, self.projection]
         self.collection = collection
+        self._keys = [k for k in self.pipeline[-1]["$project"] if k != "_id"]
 
     @abc.abstractproperty
     def projection(self):
@@ -389,6 +1240,36 @@ class SelectQueryable(abc.ABC, Queryable):
     def reverse(self):
         return self.as_enumerable().reverse()
 
+    def _row(self, document):
+        """
+        Converts a projected document into a tuple whose values are in the
+        order of the selector, whatever the order of the document fields
+        """
+        keys = ["_id", *self._keys] if "_id" in document else self._keys
+        return tuple(document[k] for k in keys if k in document)
+
+    def _columns(self):
+        keys = ["_id", *self._keys] if self.include_id else self._keys
+        projection = self.projection["$project"]
+        fields = {}
+        if self.model is not None:
+            for attribute in model_attributes(self.model).values():
+                fields[attribute.name] = attribute.attribute_type
+        types = {}
+        for key in keys:
+            value = projection[key]
+            if key == "_id":
+                types[key] = fields.get(key)
+            elif isinstance(value, str) and value.startswith("$"):
+                types[key] = fields.get(value[1:])
+        return self._query(), {key: key for key in keys}, types
+
+    def _query(self):
+        return self.pipeline
+
+    def _converter(self):
+        return self._row
+
 
 class SimpleSelectQueryable(SelectQueryable):
     """
@@ -406,34 +1287,25 @@ class SimpleSelectQueryable(SelectQueryable):
         project["$project"][self.node.mongo] = "${0}".format(self.node.mongo)
         return project
 
-    def __iter__(self):
-        for e in self.collection.aggregate(self.pipeline):
-            yield tuple([v for k, v in e.items()])
-
-    def next(self):
-        e = next(self.collection.aggregate(self.pipeline))
-        return tuple([v for k, v in e.items()])
-
-    def __next__(self):
-        return self.next()
-
 
 class ScalarSelectQueryable(object):
     """
     Performs projection of a collection using scalar operator
     """
 
-    def __init__(self, collection, pipeline, operator, func):
+    def __init__(self, collection, pipeline, operator, func, options=None):
         """
         Constructor for a projection of collection to scalar
         collection -> the collection that is being queried
         pipeline -> the aggregate pipeline as a list
         operator -> the Mongo scalar operator $min, $max, etc
         func -> lambda function as a selector
+        options -> keyword arguments of collection.aggregate()
         """
         self.operator = operator
         self.func = func
         self.collection = collection
+        self.options = {} if options is None else options
         t = None if self.func is None else LambdaExpression.parse(func)
         if not isinstance(t.body.value, ast.Name):
             raise TypeError("lambda function must select a property")
@@ -452,8 +1324,16 @@ class ScalarSelectQueryable(object):
 
     @property
     def scalar(self):
-        o = list(self.collection.aggregate(self.pipeline))[0]
-        m = o["value"]
+        pipeline = Queryable.optimizer.optimize(self.pipeline)
+        return self._read(
+            list(self.collection.aggregate(pipeline, **self.options))
+        )
+
+    def _read(self, documents):
+        """
+        Reads the scalar from the documents returned by the pipeline
+        """
+        m = documents[0]["value"]
         if hasattr(m, "__iter__"):
             raise TypeError(
                 "Please use select_many before calling a scalar operator"
@@ -461,6 +1341,96 @@ class ScalarSelectQueryable(object):
         return m
 
 
+class AccumulatorSelectQueryable(object):
+    """
+    Computes several accumulators over a collection in a single $group stage
+    """
+
+    operators = {
+        "min": "$min",
+        "max": "$max",
+        "sum": "$sum",
+        "average": "$avg",
+        "avg": "$avg",
+        "std_dev": "$stdDevPop",
+        "std_dev_sample": "$stdDevSamp",
+        "count": "$sum",
+    }
+
+    def __init__(self, collection, pipeline, accumulators, options=None):
+        """
+        Constructor for a projection of collection to several scalars
+        collection -> the collection that is being queried
+        pipeline -> the aggregate pipeline as a list
+        accumulators -> dictionary of (operator, func) tuples keyed by the
+            name of the result. operator is one of the keys of operators and
+            func a lambda function selecting a field or an arithmetic
+            expression. count takes no func
+        options -> keyword arguments of collection.aggregate()
+        """
+        if not accumulators:
+            raise TypeError("at least one accumulator must be given")
+        self.collection = collection
+        self.options = {} if options is None else options
+        self.accumulators = {}
+        for name, spec in accumulators.items():
+            if name == "_id" or name.startswith("$") or "." in name:
+                raise ValueError("invalid accumulator name {0}".format(name))
+            if isinstance(spec, str):
+                spec = (spec,)
+            operator, *func = spec
+            if operator not in self.operators:
+                raise ValueError("unknown accumulator {0}".format(operator))
+            if operator == "count":
+                if func:
+                    raise TypeError("count does not take a selector")
+                self.accumulators[name] = {"$sum": 1}
+            elif len(func) != 1:
+                raise TypeError("{0} needs a selector".format(operator))
+            else:
+                self.accumulators[name] = {
+                    self.operators[operator]: self._selector(func[0])
+                }
+        self.defaults = {
+            name: 0 if "$sum" in accumulator else None
+            for name, accumulator in self.accumulators.items()
+        }
+        self.pipeline = [*pipeline, self.grouping]
+
+    @staticmethod
+    def _selector(func):
+        t = LambdaExpression.parse(func)
+        if not isinstance(t.body.value, (ast.Name, ast.BinOp)):
+            raise TypeError(
+                "lambda function must select a property or compute a value"
+            )
+        value = LambdaExpression.bind(t.body, func)
+        return "${0}".format(value) if isinstance(value, str) else value
+
+    @property
+    def grouping(self):
+        return {"$group": {"_id": None, **self.accumulators}}
+
+    @property
+    def values(self):
+        pipeline = Queryable.optimizer.optimize(self.pipeline)
+        return self._read(self.collection.aggregate(pipeline, **self.options))
+
+    def _read(self, documents):
+        """
+        Reads the values from the documents returned by the pipeline
+        """
+        result = dict(self.defaults)
+        for o in documents:
+            for name in self.accumulators:
+                if isinstance(o.get(name), (list, dict)):
+                    raise TypeError(
+                        "Please use select_many before calling a scalar operator"
+                    )
+                result[name] = o.get(name)
+        return result
+
+
 class DictSelectQueryable(SelectQueryable):
     """
     Performs a projection of a collection
@@ -473,18 +1443,15 @@ class DictSelectQueryable(SelectQueryable):
 
     @property
     def projection(self):
-        project = json.loads(self.node.mongo)
-        project["$project"]["_id"] = 1 if self.include_id else 0
-        return project
-
-    def __iter__(self):
-        return self.collection.aggregate(self.pipeline).__iter__()
-
-    def next(self):
-        return next(self.collection.aggregate(self.pipeline))
+        return {
+            "$project": {
+                **self.node.mongo["$project"],
+                "_id": 1 if self.include_id else 0,
+            }
+        }
 
-    def __next__(self):
-        return self.next()
+    def _converter(self):
+        return lambda document: document
 
 
 class CollectionSelectQueryable(DictSelectQueryable):
@@ -497,16 +1464,8 @@ class CollectionSelectQueryable(DictSelectQueryable):
             collection, pipeline, node, include_id
         )
 
-    def __iter__(self):
-        for e in self.collection.aggregate(self.pipeline):
-            yield tuple([v for k, v in e.items()])
-
-    def next(self):
-        e = next(self.collection.aggregate(self.pipeline))
-        return tuple([v for k, v in e.items()])
-
-    def __next__(self):
-        return self.next()
+    def _converter(self):
+        return self._row
 
 
 class OrderedQueryable(Queryable):
@@ -516,23 +1475,18 @@ class OrderedQueryable(Queryable):
 
     def __init__(self, collection, model, pipeline, node, direction=1):
         super(OrderedQueryable, self).__init__(collection, model)
-        self.pipeline = pipeline
         self.node = node
         self.direction = direction
         self.sort_dict = {"$sort": {}}
         self.sort_dict["$sort"][self.node.mongo] = self.direction
-
-    def __iter__(self):
-        self.pipeline.append(self.sort_dict)
-        for item in self.collection.aggregate(self.pipeline):
-            i = type(self.model.__class__.__name__, (object,), item)
-            yield i
+        self.pipeline = [*pipeline, self.sort_dict]
 
     def _addSortKey(self, func, direction):
         t = LambdaExpression.parse(func)
         if not isinstance(t.body.value, ast.Name):
             raise TypeError("Lambda function needs to select a field")
         self.sort_dict["$sort"][t.body.mongo] = direction
+        self._lambdas = (*self._lambdas, func)
 
     def then_by(self, func):
         self._addSortKey(func, 1)
@@ -551,28 +1505,23 @@ class WhereQueryable(Queryable):
     Filters a collection
     """
 
-    def __init__(self, collection, model, pipeline, node):
+    def __init__(self, collection, model, pipeline, node, func=None):
         super(WhereQueryable, self).__init__(collection, model)
         self.node = node
         self.filter_dict = {}
-        self.filter_dict["$match"] = json.loads(self.node.mongo)
+        self.filter_dict["$match"] = LambdaExpression.bind(self.node, func)
         self.pipeline = [*pipeline, self.filter_dict]
 
-    def __iter__(self):
-        for item in self.collection.aggregate(self.pipeline):
-            i = type(self.model.__class__.__name__, (object,), item)
-            yield i
-
     def where(self, func):
         self.pipeline.remove(self.filter_dict)
         t = LambdaExpression.parse(func)
-        j = json.loads(t.body.mongo)
-        if "$and" in self.filter_dict["$match"]:
-            self.filter_dict["$match"]["$and"].append(j)
-        else:
-            q = {"$and": [self.filter_dict["$match"], j]}
-            self.filter_dict["$match"] = q
+        match = self.filter_dict["$match"]
+        predicates = match["$and"] if "$and" in match else [match]
+        self.filter_dict["$match"] = {
+            "$and": [*predicates, LambdaExpression.bind(t.body, func)]
+        }
         self.pipeline.append(self.filter_dict)
+        self._lambdas = (*self._lambdas, func)
         return self
 
 
@@ -592,16 +1541,24 @@ class GroupedQueryable(Queryable):
         }
         self.pipeline = [*pipeline, self.group_dict]
 
-    def __iter__(self):
-        for g in self.collection.aggregate(self.pipeline):
+    def _query(self):
+        *pipeline, group = self.pipeline
+        return [*self._projected(pipeline, self.node.mongo), group]
+
+    def _converter(self):
+        hydrate = self.hydrator.hydrate
+
+        def convert(g):
             k = {}
             k[self.node.mongo] = g["_id"]
             key = core.Key(k)
-            data = []
-            for i in g["items"]:
-                element = type(self.model.__class__.__name__, (object,), i)
-                data.append(element)
-            yield py_linq.py_linq.Grouping(key, data)
+            data = [hydrate(i) for i in g["items"]]
+            return py_linq.py_linq.Grouping(key, data)
+
+        return convert
+
+    def _columns(self):
+        raise TypeError("Grouped results cannot be read into columns")
 
 
 
@@ -0,0 +1,231 @@
+import threading
+from ..model.indexes import Index
+from .explain import explain_command, summarize
+from .optimizer import _stage
+
+
+class QueryShape(object):
+    """
+    Fields of a query that an index can serve: the fields compared for
+    equality, the sort keys and the fields compared with ranges
+    """
+
+    __slots__ = ("equality", "sort", "range")
+
+    def __init__(self, equality=(), sort=(), range=()):
+        """
+        Default constructor
+        :param equality: tuple of field names
+        :param sort: tuple of (field, direction) tuples
+        :param range: tuple of field names
+        """
+        self.equality = tuple(equality)
+        self.sort = tuple(sort)
+        self.range = tuple(range)
+
+    def __eq__(self, other):
+        return isinstance(other, QueryShape) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return "QueryShape(equality={0!r}, sort={1!r}, range={2!r})".format(
+            self.equality, self.sort, self.range
+        )
+
+    def _key(self):
+        return (self.equality, self.sort, self.range)
+
+    def __bool__(self):
+        return bool(self.equality or self.sort or self.range)
+
+    @property
+    def index(self):
+        """
+        The compound index following the equality, sort, range rule: fields
+        compared for equality first, then the sort keys so that the results
+        are read in order, then the fields compared with ranges
+        :returns: Index object, or None if the query has no field to index
+        """
+        keys = [(field, 1) for field in self.equality]
+        keys += list(self.sort)
+        keys += [(field, 1) for field in self.range]
+        return Index(*keys) if keys else None
+
+    def served_by(self, keys):
+        """
+        Tells whether an index serves the query as well as the proposed one
+        :param keys: list of (field, direction) tuples of an index
+        """
+        equality = len(self.equality)
+        fields = [field for field, _ in keys]
+        if set(fields[:equality]) != set(self.equality):
+            return False
+        sort = list(self.sort)
+        prefix = list(keys[equality : equality + len(sort)])
+        reverse = [(field, -direction) for field, direction in sort]
+        if sort and prefix != sort and prefix != reverse:
+            return False
+        start = equality + len(sort)
+        return set(fields[start : start + len(self.range)]) == set(self.range)
+
+
+def _classify(query, equality, ranges, lists):
+    """
+    Sorts the fields of a query document by the kind of their comparison
+    """
+    for field, value in query.items():
+        if field == "$and":
+            for clause in value:
+                _classify(clause, equality, ranges, lists)
+        elif field.startswith("$"):
+            # $or, $nor and $expr cannot be served by a single compound index
+            continue
+        elif isinstance(value, dict) and any(k.startswith("$") for k in value):
+            if set(value) == {"$eq"}:
+                equality.append(field)
+            elif set(value) == {"$in"}:
+                lists.append(field)
+            else:
+                ranges.append(field)
+        elif hasattr(value, "pattern"):
+            ranges.append(field)
+        else:
+            equality.append(field)
+
+
+def query_shape(pipeline):
+    """
+    Finds the shape of the query run by a pipeline
+    :param pipeline: an optimized list of stages
+    :returns: QueryShape of the $match and $sort stages the pipeline starts
+        with, which are the ones an index can serve
+    """
+    query, sort = {}, []
+    for stage in pipeline[:2]:
+        op, argument = _stage(stage)
+        if op == "$match" and not query and not sort:
+            query = argument
+        elif op == "$sort" and not sort:
+            sort = list(argument.items())
+        else:
+            break
+    equality, ranges, lists = [], [], []
+    _classify(query, equality, ranges, lists)
+    # $in matches several values, whose documents are not read in the order of
+    # the sort keys
+    if sort:
+        ranges += lists
+    else:
+        equality += lists
+    equality = list(dict.fromkeys(equality))
+    sort = [(field, d) for field, d in sort if field not in equality]
+    sorted_fields = {field for field, _ in sort}
+    ranges = [
+        field
+        for field in dict.fromkeys(ranges)
+        if field not in equality and field not in sorted_fields
+    ]
+    return QueryShape(equality, sort, ranges)
+
+
+class IndexAdvisor(object):
+    """
+    Records the shapes of the queries run against each collection and
+    proposes the indexes serving them
+    """
+
+    def __init__(self):
+        """
+        Default constructor
+        """
+        self._lock = threading.Lock()
+        self._shapes = {}
+
+    def record(self, collection, pipeline):
+        """
+        Records a query
+        :param collection: the pymongo collection queried
+        :param pipeline: the optimized pipeline run
+        """
+        shape = query_shape(pipeline)
+        if not shape:
+            return
+        key = (collection.full_name, shape)
+        with self._lock:
+            entry = self._shapes.get(key)
+            if entry is None:
+                entry = self._shapes[key] = [collection, pipeline, 0]
+            entry[2] += 1
+
+    def __len__(self):
+        return len(self._shapes)
+
+    def clear(self):
+        """
+        Forgets the recorded queries
+        """
+        with self._lock:
+            self._shapes.clear()
+
+    def report(self, explain=False):
+        """
+        Proposes an index for each shape of query recorded
+        :param explain: if True, runs the explain command on the first query
+            recorded for each shape to measure the documents it examines
+        :returns: list of dictionaries holding the collection name, the shape,
+            the number of queries recorded, the proposed Index, the name of an
+            existing index serving the queries as well, if any, and the numbers
+            of documents examined and returned with their ratio when explain is
+            True. Shapes come by decreasing number of documents examined in
+            total, estimated as the number of queries times the ratio, then by
+            decreasing number of queries
+        """
+        with self._lock:
+            entries = list(self._shapes.items())
+        indexes = {}
+        report = []
+        for (name, shape), (collection, pipeline, count) in entries:
+            if name not in indexes:
+                indexes[name] = list(collection.list_indexes())
+            existing = next(
+                (
+                    document["name"]
+                    for document in indexes[name]
+                    if shape.served_by(list(document["key"].items()))
+                ),
+                None,
+            )
+            row = {
+                "collection": name,
+                "shape": shape,
+                "count": count,
+                "index": shape.index,
+                "existing": existing,
+                "docs_examined": None,
+                "returned": None,
+                "ratio": None,
+            }
+            if explain:
+                summary = summarize(
+                    collection.database.command(
+                        explain_command(
+                            collection.name, pipeline, "executionStats"
+                        )
+                    )
+                )
+                row["docs_examined"] = summary["docs_examined"]
+                row["returned"] = summary["returned"]
+                if summary["docs_examined"] is not None:
+                    row["ratio"] = summary["docs_examined"] / max(
+                        summary["returned"] or 0, 1
+                    )
+            report.append(row)
+        report.sort(
+            key=lambda row: (
+                -row["count"] * (1 if row["ratio"] is None else row["ratio"]),
+                -row["count"],
+            )
+        )
+        return report
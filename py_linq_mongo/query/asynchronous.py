@@ -0,0 +1,225 @@
+from py_linq import exceptions
+from . import AccumulatorSelectQueryable, Queryable, ScalarSelectQueryable
+
+
+def _building(name):
+    """
+    Creates an AsyncQueryable method that builds the query with the Queryable
+    method of the same name, without running it
+    """
+
+    def method(self, *args, **kwargs):
+        return AsyncQueryable.wrap(
+            getattr(self.queryable, name)(*args, **kwargs)
+        )
+
+    method.__name__ = name
+    method.__doc__ = getattr(Queryable, name, method).__doc__
+    return method
+
+
+class AsyncQueryable(object):
+    """
+    Queries a MongoDb collection through an asyncio driver such as motor. The
+    query is built by a Queryable and its results are read with async for or
+    by awaiting one of the terminal methods
+    """
+
+    def __init__(self, collection, model):
+        """
+        AsyncQueryable constructor
+        :param collection: a collection of an asyncio driver. find() and
+            aggregate() return cursors supporting async for, to_list() and
+            close() coroutines, and count_documents() and
+            estimated_document_count() are coroutines
+        :param model: the model class of the collection
+        """
+        self.queryable = Queryable(collection, model)
+
+    @classmethod
+    def wrap(cls, queryable):
+        """
+        Creates an AsyncQueryable running a query built by a Queryable
+        :param queryable: a Queryable over a collection of an asyncio driver
+        """
+        result = cls.__new__(cls)
+        result.queryable = queryable
+        return result
+
+    @property
+    def collection(self):
+        return self.queryable.collection
+
+    @property
+    def model(self):
+        return self.queryable.model
+
+    @property
+    def pipeline(self):
+        return self.queryable.pipeline
+
+    where = _building("where")
+    select = _building("select")
+    order_by = _building("order_by")
+    order_by_descending = _building("order_by_descending")
+    then_by = _building("then_by")
+    then_by_descending = _building("then_by_descending")
+    take = _building("take")
+    skip = _building("skip")
+    group_by = _building("group_by")
+    hydrate = _building("hydrate")
+    raw = _building("raw")
+    all_fields = _building("all_fields")
+    batch_size = _building("batch_size")
+    with_hint = _building("with_hint")
+    max_time = _building("max_time")
+    allow_disk_use = _building("allow_disk_use")
+    collation = _building("collation")
+    comment = _building("comment")
+
+    def __aiter__(self):
+        return self._iterate(self.queryable)
+
+    async def _iterate(self, queryable):
+        """
+        Runs the query of a Queryable and yields its converted results
+        """
+        convert = queryable._converter()
+        cursor = queryable._execute(queryable._query())
+        registry = queryable._cursors
+        if registry is not None:
+            registry.add(cursor)
+        try:
+            async for item in cursor:
+                yield convert(item)
+        finally:
+            try:
+                await cursor.close()
+            finally:
+                if registry is not None:
+                    registry.discard(cursor)
+
+    async def to_list(self):
+        return [item async for item in self]
+
+    async def _aggregate(self, pipeline):
+        """
+        Optimizes and runs a pipeline
+        :returns: list of the documents returned
+        """
+        pipeline = self.queryable.optimizer.optimize(pipeline)
+        self.queryable._advise(pipeline)
+        cursor = self.collection.aggregate(
+            pipeline, **self.queryable._arguments("aggregate")
+        )
+        return await cursor.to_list(None)
+
+    async def _perform(self, steps):
+        """
+        Awaits the collection calls of a generator such as
+        Queryable._counting. See Queryable._perform
+        """
+        result = None
+        while True:
+            try:
+                method, args, kwargs = steps.send(result)
+            except StopIteration as stop:
+                return stop.value
+            result = getattr(self.collection, method)(*args, **kwargs)
+            if method == "aggregate":
+                result = await result.to_list(None)
+            else:
+                result = await result
+
+    async def count(self, approximate=False, hint=None, sample_size=1000):
+        """
+        Returns the number of documents in the collection. See Queryable.count
+        """
+        pipeline = self.queryable.optimizer.optimize(self.pipeline)
+        return await self._perform(
+            self.queryable._counting(pipeline, approximate, hint, sample_size)
+        )
+
+    async def _first(self, queryable, limit):
+        """
+        Returns the first results of a Queryable
+        """
+        queryable = queryable._clone().take(limit)
+        return [item async for item in self._iterate(queryable)]
+
+    async def first(self, func=None):
+        queryable = self.queryable
+        if func is not None:
+            queryable = queryable.where(func)
+        result = await self._first(queryable, 1)
+        if not result:
+            raise exceptions.NoElementsError()
+        return result[0]
+
+    async def first_or_default(self, func=None):
+        try:
+            return await self.first(func)
+        except exceptions.NoElementsError:
+            return None
+
+    async def single(self, func=None):
+        queryable = self.queryable
+        if func is not None:
+            queryable = queryable.where(func)
+        result = await self._first(queryable, 2)
+        if len(result) == 0:
+            raise exceptions.NoMatchingElement(
+                "No matching elements could be found"
+            )
+        if len(result) > 1:
+            raise exceptions.MoreThanOneMatchingElement(
+                "More than one matching element found"
+            )
+        return result[0]
+
+    async def single_or_default(self, func=None):
+        try:
+            return await self.single(func)
+        except exceptions.NoMatchingElement:
+            return None
+
+    async def _exists(self, probe):
+        return len(await self._aggregate(probe)) > 0
+
+    async def any(self, func=None):
+        predicate = None if func is None else self.queryable._predicate(func)
+        return await self._exists(self.queryable._probe(predicate))
+
+    async def all(self, func=None):
+        if func is None:
+            return True
+        predicate = {"$nor": [self.queryable._predicate(func)]}
+        return not await self._exists(self.queryable._probe(predicate))
+
+    async def _scalar(self, operator, func):
+        query = ScalarSelectQueryable(
+            self.collection, self.pipeline, operator, func
+        )
+        return query._read(await self._aggregate(query.pipeline))
+
+    async def max(self, func=None):
+        return await self._scalar("$max", func)
+
+    async def min(self, func=None):
+        return await self._scalar("$min", func)
+
+    async def sum(self, func=None):
+        return await self._scalar("$sum", func)
+
+    async def average(self, func=None):
+        return await self._scalar("$avg", func)
+
+    async def aggregates(self, **accumulators):
+        """
+        Computes several statistics over a collection in a single round trip.
+        See Queryable.aggregates
+        """
+        query = AccumulatorSelectQueryable(
+            self.collection, self.pipeline, accumulators
+        )
+        return query._read(await self._aggregate(query.pipeline))
@@ -0,0 +1,136 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import bson
+
+
+class ResultCache(object):
+    """
+    Keeps the results of queries for a limited time. Results are stored as
+    BSON, so that each hit returns its own copy, and the least recently used
+    ones are evicted when their total size exceeds max_bytes
+    """
+
+    def __init__(
+        self, max_bytes=64 * 1024 * 1024, ttl=60, clock=time.monotonic
+    ):
+        """
+        Default constructor
+        :param max_bytes: maximum total size of the cached results in bytes
+        :param ttl: number of seconds a result is kept. Models can override it
+            with a __cache_ttl__ attribute. 0 disables caching
+        :param clock: function returning the current time in seconds
+        """
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ttl_for(self, model):
+        """
+        Returns the number of seconds the results of a model are kept
+        :param model: a model class
+        """
+        return getattr(model, "__cache_ttl__", self.ttl)
+
+    @staticmethod
+    def fingerprint(collection, kind, arguments):
+        """
+        Computes the key of a result
+        :param collection: full name of the collection
+        :param kind: name of the terminal method computing the result
+        :param arguments: the pipeline and any other argument of the terminal
+        :returns: a hex digest
+        :raises bson.errors.InvalidDocument: if an argument cannot be encoded
+        """
+        document = {"c": collection, "k": kind, "a": arguments}
+        return hashlib.sha1(bson.encode(document)).hexdigest()
+
+    def get(self, key):
+        """
+        Finds a result
+        :param key: the fingerprint of the result
+        :returns: a tuple of a boolean telling whether the result was found and
+            a copy of the result
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= self.clock():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return True, bson.decode(entry[0])["v"]
+
+    def put(self, key, value, ttl):
+        """
+        Stores a result. Results larger than max_bytes are not stored
+        :param key: the fingerprint of the result
+        :param value: a value that can be encoded in BSON
+        :param ttl: number of seconds the result is kept
+        """
+        data = bson.encode({"v": value})
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (data, self.clock() + ttl)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        data, _ = self._entries.pop(key)
+        self._bytes -= len(data)
+
+    def fetch(self, key, ttl, compute):
+        """
+        Returns a cached result, or computes and stores it
+        :param key: the fingerprint of the result
+        :param ttl: number of seconds the result is kept
+        :param compute: function computing the result
+        """
+        found, value = self.get(key)
+        if found:
+            return value
+        value = compute()
+        self.put(key, value, ttl)
+        return value
+
+    def clear(self):
+        """
+        Removes every result
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def statistics(self):
+        """
+        Dictionary of the number of hits, misses and evictions, the hit rate,
+        and the number and total size of the cached results
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
@@ -0,0 +1,126 @@
+from collections.abc import Mapping
+from datetime import datetime
+
+# numpy dtype of the columns of each attribute type. Other types are stored
+# as Python objects
+_DTYPES = {
+    int: "int64",
+    float: "float64",
+    bool: "bool",
+    datetime: "datetime64[ms]",
+}
+
+
+def _getter(key):
+    """
+    Returns a function reading a field from a document
+    :param key: field name, optionally a dotted path into sub-documents
+    """
+    if "." not in key:
+        return lambda document: document.get(key)
+    path = key.split(".")
+
+    def get(document):
+        for name in path:
+            if not isinstance(document, Mapping):
+                return None
+            document = document.get(name)
+        return document
+
+    return get
+
+
+def read_columns(documents, columns):
+    """
+    Reads documents into one list per column
+    :param documents: an iterable of documents
+    :param columns: dictionary of field names keyed by column name
+    :returns: dictionary of lists keyed by column name
+    """
+    result = {name: [] for name in columns}
+    readers = [
+        (result[name].append, _getter(key)) for name, key in columns.items()
+    ]
+    for document in documents:
+        for append, get in readers:
+            append(get(document))
+    return result
+
+
+class ColumnBuffer(object):
+    """
+    A growable numpy array of a single dtype. Its capacity doubles when it is
+    full so that appending is amortized constant time
+    """
+
+    __slots__ = ("np", "data", "size")
+
+    def __init__(self, np, dtype, capacity=1024):
+        """
+        Default constructor
+        :param np: the numpy module
+        :param dtype: dtype of the column
+        :param capacity: initial number of elements allocated
+        """
+        self.np = np
+        self.data = np.empty(capacity, dtype=dtype)
+        self.size = 0
+
+    def append(self, value):
+        if self.size == len(self.data):
+            self.data = self.np.resize(self.data, 2 * len(self.data))
+        if value is None:
+            kind = self.data.dtype.kind
+            if kind in "iub":
+                # integer and boolean arrays cannot hold missing values
+                self.data = self.data.astype("float64")
+                kind = "f"
+            if kind == "f":
+                value = self.np.nan
+        self.data[self.size] = value
+        self.size += 1
+
+    def array(self):
+        """
+        Returns the array of the appended values
+        """
+        return self.data[: self.size]
+
+
+def read_arrays(np, documents, columns, types, capacity=1024):
+    """
+    Reads documents into one numpy array per column
+    :param np: the numpy module
+    :param documents: an iterable of documents
+    :param columns: dictionary of field names keyed by column name
+    :param types: dictionary of Python types keyed by column name. Columns
+        without a known type are stored as objects
+    :param capacity: initial size of the column buffers
+    :returns: dictionary of arrays keyed by column name
+    """
+    buffers = {
+        name: ColumnBuffer(np, _DTYPES.get(types.get(name), "O"), capacity)
+        for name in columns
+    }
+    readers = [
+        (buffers[name].append, _getter(key)) for name, key in columns.items()
+    ]
+    for document in documents:
+        for append, get in readers:
+            append(get(document))
+    return {name: buffer.array() for name, buffer in buffers.items()}
+
+
+def structured(np, arrays):
+    """
+    Combines arrays of the same length into a numpy structured array
+    :param np: the numpy module
+    :param arrays: dictionary of arrays keyed by column name
+    """
+    size = len(next(iter(arrays.values()))) if arrays else 0
+    result = np.empty(
+        size, dtype=[(name, a.dtype) for name, a in arrays.items()]
+    )
+    for name, a in arrays.items():
+        result[name] = a
+    return result
@@ -0,0 +1,263 @@
+import datetime
+import heapq
+import numbers
+import queue
+import threading
+import weakref
+import bson
+from .columns import _getter
+
+# marks the end of the results in the queue of a PrefetchingCursor
+_DONE = object()
+
+
+class CursorRegistry(object):
+    """
+    Keeps track of the cursors opened by Queryables. A cursor is forgotten when
+    it is closed or garbage collected, so that the length of the registry is
+    the number of cursors still open
+    """
+
+    def __init__(self):
+        """
+        Default constructor
+        """
+        self._cursors = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def add(self, cursor):
+        """
+        Registers an open cursor
+        :param cursor: a pymongo cursor
+        """
+        with self._lock:
+            self._cursors.add(cursor)
+
+    def discard(self, cursor):
+        """
+        Forgets a cursor. Discarding a cursor that is not registered does
+        nothing
+        :param cursor: a pymongo cursor
+        """
+        with self._lock:
+            self._cursors.discard(cursor)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._cursors)
+
+
+class _Failure(object):
+    """
+    Carries an exception raised by the background thread of a
+    PrefetchingCursor to the thread reading the results
+    """
+
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+class PrefetchingCursor(object):
+    """
+    Reads cursors in background threads, one per cursor. Documents are read in
+    batches and put in a bounded queue, so that the next batches are fetched
+    from MongoDb while the current one is processed. The threads wait when the
+    queue is full. The batches of several cursors are returned in the order
+    they are read
+    """
+
+    def __init__(self, cursors, depth=2, batch_size=100):
+        """
+        Default constructor
+        :param cursors: list of pymongo cursors
+        :param depth: maximum number of batches read ahead
+        :param batch_size: number of documents of each batch
+        """
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.cursors = cursors
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=depth)
+        self._stopped = threading.Event()
+        self._batch = []
+        self._index = 0
+        self._running = len(cursors)
+        self._threads = [
+            threading.Thread(
+                target=self._run,
+                args=(cursor,),
+                name="py-linq-mongo-prefetch",
+                daemon=True,
+            )
+            for cursor in cursors
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self, cursor):
+        try:
+            batch = []
+            for document in cursor:
+                batch.append(document)
+                if len(batch) == self.batch_size:
+                    if not self._put(batch):
+                        return
+                    batch = []
+            if batch and not self._put(batch):
+                return
+            self._put(_DONE)
+        except BaseException as e:
+            self._put(_Failure(e))
+        finally:
+            cursor.close()
+
+    def _put(self, item):
+        """
+        Waits for room in the queue and puts an item in it
+        :returns: False if the cursor was closed while waiting
+        """
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while self._index == len(self._batch):
+            if self._running == 0 or self._stopped.is_set():
+                raise StopIteration()
+            item = self._queue.get()
+            if item is _DONE:
+                self._running -= 1
+                continue
+            if isinstance(item, _Failure):
+                self._running = 0
+                raise item.error
+            self._batch = item
+            self._index = 0
+        document = self._batch[self._index]
+        self._index += 1
+        return document
+
+    def next(self):
+        return self.__next__()
+
+    def close(self):
+        """
+        Stops the background threads and closes the cursors
+        """
+        self._stopped.set()
+        self._batch = []
+        self._index = 0
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+
+
+# order of the BSON types when MongoDb sorts values of different types
+_TYPE_ORDER = (
+    (type(None), 1),
+    (bool, 8),
+    (numbers.Number, 2),
+    (str, 3),
+    (dict, 4),
+    (list, 5),
+    (bytes, 6),
+    (bson.ObjectId, 7),
+    (datetime.datetime, 9),
+)
+
+
+def _type_order(value):
+    for cls, order in _TYPE_ORDER:
+        if isinstance(value, cls):
+            return order
+    return 10
+
+
+class _SortKey(object):
+    """
+    Compares documents on the fields of a $sort stage, in the order of
+    MongoDb. Missing fields sort as null
+    """
+
+    __slots__ = ("values", "directions")
+
+    def __init__(self, values, directions):
+        self.values = values
+        self.directions = directions
+
+    def __lt__(self, other):
+        for a, b, direction in zip(self.values, other.values, self.directions):
+            a = (_type_order(a), a)
+            b = (_type_order(b), b)
+            try:
+                if a == b:
+                    continue
+                less = a < b
+            except TypeError:
+                # values of the same BSON type that Python cannot order
+                continue
+            return less if direction > 0 else not less
+        return False
+
+
+def sort_key(sort):
+    """
+    Creates the key function of heapq.merge or sorted for the documents
+    returned by a pipeline ending with a $sort stage
+    :param sort: list of (field, direction) tuples
+    """
+    getters = [_getter(field) for field, _ in sort]
+    directions = [direction for _, direction in sort]
+
+    def key(document):
+        return _SortKey([get(document) for get in getters], directions)
+
+    return key
+
+
+class MergingCursor(object):
+    """
+    Merges sorted cursors into a single sorted sequence. Each cursor is read by
+    a PrefetchingCursor
+    """
+
+    def __init__(self, cursors, sort, depth=2, batch_size=100):
+        """
+        Default constructor
+        :param cursors: list of pymongo cursors returning documents sorted the
+            same way
+        :param sort: list of (field, direction) tuples of the sort
+        :param depth: maximum number of batches read ahead for each cursor
+        :param batch_size: number of documents of each batch
+        """
+        self.cursors = [
+            PrefetchingCursor([cursor], depth, batch_size) for cursor in cursors
+        ]
+        self._merged = heapq.merge(*self.cursors, key=sort_key(sort))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._merged)
+
+    def next(self):
+        return self.__next__()
+
+    def close(self):
+        """
+        Stops the background threads and closes the cursors
+        """
+        for cursor in self.cursors:
+            cursor.close()
@@ -0,0 +1,205 @@
+import inspect
+from . import planner
+
+# keys of an explained plan stage that hold the stages feeding it
+_CHILDREN = (
+    "queryPlan",
+    "winningPlan",
+    "executionStages",
+    "inputStage",
+    "inputStages",
+    "shards",
+    "thenStage",
+    "elseStage",
+    "outerStage",
+    "innerStage",
+)
+
+
+def _walk(node):
+    """
+    Yields the stages of an explained plan, from the root to the leaves
+    :param node: a plan stage, or a list of stages
+    """
+    if isinstance(node, list):
+        for item in node:
+            yield from _walk(item)
+    elif isinstance(node, dict):
+        if isinstance(node.get("stage"), str):
+            yield node
+        for key in _CHILDREN:
+            if key in node:
+                yield from _walk(node[key])
+
+
+def _cursor_stage(explanation):
+    """
+    Finds the part of an aggregate explanation describing the query of its
+    first stage. Explanations of find commands, and of pipelines run entirely
+    by the query engine, describe the query at the top level
+    """
+    for stage in explanation.get("stages", ()):
+        if "$cursor" in stage:
+            return stage["$cursor"]
+    return explanation
+
+
+def _total(statistics, key):
+    """
+    Reads a total of the execution statistics, summing the totals of the
+    shards of a sharded collection
+    """
+    if key in statistics:
+        return statistics[key]
+    shards = statistics.get("executionStages", {}).get("shards", ())
+    values = [s[key] for s in shards if key in s]
+    return sum(values) if values else None
+
+
+def summarize(explanation):
+    """
+    Summarizes the output of the explain command
+    :param explanation: the document returned by the explain command of a
+        find or an aggregate command
+    :returns: dictionary of the winning plan, the names of its stages, the
+        indexes it uses, whether it scans the whole collection, the numbers of
+        keys and documents examined and of documents returned, the execution
+        time in milliseconds and the time spent in each stage. Statistics are
+        None when the verbosity of the explain command does not include them
+    """
+    query = _cursor_stage(explanation)
+    winning_plan = query.get("queryPlanner", {}).get("winningPlan", {})
+    stages = [stage["stage"] for stage in _walk(winning_plan)]
+    statistics = query.get("executionStats", {})
+    stage_times = [
+        {
+            "stage": stage["stage"],
+            "time_ms": stage.get("executionTimeMillisEstimate"),
+            "returned": stage.get("nReturned"),
+        }
+        for stage in _walk(statistics.get("executionStages", {}))
+    ]
+    returned = _total(statistics, "nReturned")
+    for stage in explanation.get("stages", ()):
+        name = next(iter(stage))
+        if name == "$cursor":
+            continue
+        stage_times.append(
+            {
+                "stage": name,
+                "time_ms": stage.get("executionTimeMillisEstimate"),
+                "returned": stage.get("nReturned"),
+            }
+        )
+        if "nReturned" in stage:
+            returned = stage["nReturned"]
+    return {
+        "winning_plan": winning_plan,
+        "stages": stages,
+        "indexes": sorted(
+            {
+                stage["indexName"]
+                for stage in _walk(winning_plan)
+                if "indexName" in stage
+            }
+        ),
+        "collection_scan": "COLLSCAN" in stages,
+        "keys_examined": _total(statistics, "totalKeysExamined"),
+        "docs_examined": _total(statistics, "totalDocsExamined"),
+        "returned": returned,
+        "execution_time_ms": _total(statistics, "executionTimeMillis"),
+        "stage_times": stage_times,
+    }
+
+
+def explain_command(collection, pipeline, verbosity, options=None):
+    """
+    Builds the explain command of the find or aggregate command that runs a
+    pipeline
+    :param collection: name of the collection
+    :param pipeline: an optimized list of stages
+    :param verbosity: "queryPlanner", "executionStats" or "allPlansExecution"
+    :param options: execution options of the command, such as hint or
+        maxTimeMS. An index given as (field, direction) tuples is converted to
+        its document
+    :returns: the command document
+    """
+    find = planner.plan(pipeline)
+    if find is not None:
+        command = find.command(collection)
+    else:
+        command = {"aggregate": collection, "pipeline": pipeline, "cursor": {}}
+    for name, value in (options or {}).items():
+        if name == "hint" and not isinstance(value, str):
+            value = dict(value)
+        command[name] = value
+    return {"explain": command, "verbosity": verbosity}
+
+
+def _lambdas(text):
+    """
+    Yields the lambda expressions found in source code
+    :param text: source code
+    """
+    start = text.find("lambda")
+    while start >= 0:
+        depth = 0
+        end = start
+        while end < len(text):
+            char = text[end]
+            if char in "([{":
+                depth += 1
+            elif char in ")]}":
+                if depth == 0:
+                    break
+                depth -= 1
+            elif char in ",;\n" and depth == 0:
+                break
+            end += 1
+        yield text[start:end].strip()
+        start = text.find("lambda", start + 6)
+
+
+def _compiled_lambdas(func):
+    """
+    Yields the lambda expressions found in the source lines of a function,
+    each with the code object it compiles to
+    :param func: a lambda function
+    """
+    try:
+        lines, _ = inspect.getsourcelines(func)
+    except (OSError, TypeError):
+        return
+    for text in _lambdas("".join(lines)):
+        try:
+            compiled = compile(text, "<lambda>", "eval")
+        except SyntaxError:
+            continue
+        # the code of the lambda is a constant of the compiled expression
+        for constant in compiled.co_consts:
+            if inspect.iscode(constant):
+                yield text, constant
+
+
+def lambda_source(func):
+    """
+    Finds the source code of a lambda function
+    :param func: a lambda function
+    :returns: the text of the lambda expression, or its repr when the source is
+        not available
+    """
+    code = func.__code__
+    candidates = []
+    for text, constant in _compiled_lambdas(func):
+        if constant.co_varnames != code.co_varnames:
+            continue
+        if constant.co_consts != code.co_consts:
+            continue
+        if (constant.co_code, constant.co_names) == (
+            code.co_code,
+            code.co_names,
+        ):
+            return text
+        # free variables are compiled as globals outside of their scope
+        candidates.append(text)
+    return candidates[0] if candidates else repr(func)
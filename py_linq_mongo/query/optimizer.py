@@ -0,0 +1,298 @@
+import threading
+
+
+def _stage(stage):
+    """
+    Splits a pipeline stage into its operator and its argument
+    :param stage: a pipeline stage such as {"$match": {...}}
+    :returns: a tuple of operator and argument, or (None, None) when the stage
+        does not have exactly one operator
+    """
+    if isinstance(stage, dict) and len(stage) == 1:
+        return next(iter(stage.items()))
+    return None, None
+
+
+def _is_count(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _includes(value):
+    """
+    Determines whether a $project value is a plain inclusion flag
+    """
+    return value is True or (_is_count(value) and value == 1)
+
+
+def _excludes(value):
+    return value is False or (_is_count(value) and value == 0)
+
+
+def _match_fields(query):
+    """
+    Finds the fields a $match query reads
+    :param query: a Mongo query document
+    :returns: a set of field paths, or None if the query uses operators such as
+        $expr or $where whose fields cannot be determined
+    """
+    fields = set()
+    for key, value in query.items():
+        if key in ("$and", "$or", "$nor"):
+            for predicate in value:
+                sub = _match_fields(predicate)
+                if sub is None:
+                    return None
+                fields |= sub
+        elif key.startswith("$"):
+            return None
+        else:
+            fields.add(key)
+    return fields
+
+
+def _passes_through(projection, field):
+    """
+    Determines whether a $project stage leaves a field unchanged
+    :param projection: the argument of a $project stage
+    :param field: a field path read by a later stage
+    """
+    root = field.split(".")[0]
+    inclusion = any(
+        not _excludes(v) for k, v in projection.items() if k != "_id"
+    )
+    if root not in projection:
+        return root == "_id" or not inclusion
+    value = projection[root]
+    if not inclusion:
+        return not _excludes(value)
+    return _includes(value) or value == "${0}".format(root)
+
+
+def _is_inclusion(projection):
+    if any("." in k for k in projection):
+        return False
+    values = [v for k, v in projection.items() if k != "_id"]
+    return len(values) > 0 and all(
+        _includes(v) or isinstance(v, str) for v in values
+    )
+
+
+def pairwise(func):
+    """
+    Turns a function that rewrites two adjacent stages into a pipeline rule
+    :param func: function receiving two adjacent stages and returning None to
+        keep them, or the list of stages that replaces them
+    :returns: a rule function that receives a pipeline and returns the
+        rewritten pipeline, or the same list when nothing was rewritten
+    """
+
+    def rule(pipeline):
+        result = None
+        idx = 0
+        while idx < len(pipeline) - 1:
+            replacement = func(pipeline[idx], pipeline[idx + 1])
+            if replacement is None:
+                idx += 1
+                continue
+            if result is None:
+                result = list(pipeline)
+            pipeline = result
+            pipeline[idx : idx + 2] = replacement
+            # the replacement may combine with the stage before it
+            idx = max(idx - 1, 0)
+        return pipeline if result is None else result
+
+    rule.__name__ = func.__name__
+    rule.__doc__ = func.__doc__
+    return rule
+
+
+@pairwise
+def merge_matches(first, second):
+    """
+    Merges adjacent $match stages into one $and query
+    """
+    op1, query1 = _stage(first)
+    op2, query2 = _stage(second)
+    if op1 != "$match" or op2 != "$match":
+        return None
+    predicates = []
+    for query in (query1, query2):
+        if len(query) == 1 and "$and" in query:
+            predicates.extend(query["$and"])
+        elif query:
+            predicates.append(query)
+    if len(predicates) == 1:
+        return [{"$match": predicates[0]}]
+    return [{"$match": {"$and": predicates}}]
+
+
+@pairwise
+def match_before_sort(first, second):
+    """
+    Filters documents before sorting them so that fewer documents are sorted
+    """
+    if _stage(first)[0] == "$sort" and _stage(second)[0] == "$match":
+        return [second, first]
+    return None
+
+
+@pairwise
+def match_before_project(first, second):
+    """
+    Moves a $match ahead of a $project when every field it reads is left
+    unchanged by the projection, so that it can use indexes
+    """
+    op1, projection = _stage(first)
+    op2, query = _stage(second)
+    if op1 != "$project" or op2 != "$match":
+        return None
+    fields = _match_fields(query)
+    if fields is None:
+        return None
+    if all(_passes_through(projection, f) for f in fields):
+        return [second, first]
+    return None
+
+
+@pairwise
+def fold_skip_limit(first, second):
+    """
+    Folds chains of $skip and $limit stages into a single $skip followed by a
+    single $limit
+    """
+    op1, n1 = _stage(first)
+    op2, n2 = _stage(second)
+    if not (_is_count(n1) and _is_count(n2)):
+        return None
+    if op1 == "$skip" and op2 == "$skip":
+        return [{"$skip": n1 + n2}]
+    if op1 == "$limit" and op2 == "$limit":
+        return [{"$limit": min(n1, n2)}]
+    if op1 == "$limit" and op2 == "$skip" and n1 > n2:
+        return [{"$skip": n2}, {"$limit": n1 - n2}]
+    return None
+
+
+@pairwise
+def limit_before_project(first, second):
+    """
+    Moves $skip and $limit ahead of a $project so that a preceding $sort and
+    $limit are adjacent and run as a single top-k sort on the server
+    """
+    op2 = _stage(second)[0]
+    if _stage(first)[0] == "$project" and op2 in ("$skip", "$limit"):
+        return [second, first]
+    return None
+
+
+def _kept_fields(projection, argument):
+    """
+    Finds the fields of a $project stage that a following $project keeps
+    unchanged
+    :param projection: the argument of the first $project stage
+    :param argument: the argument of the following $project stage
+    :returns: the entries of projection kept, or None if the following stage
+        does more than passing top level fields through
+    """
+    fields = {}
+    for key, value in argument.items():
+        if key == "_id":
+            continue
+        if "." in key or not (_includes(value) or value == "${0}".format(key)):
+            return None
+        if key in projection:
+            fields[key] = projection[key]
+    return fields
+
+
+@pairwise
+def drop_redundant_project(first, second):
+    """
+    Drops a $project whose output is discarded by the next stage, and merges a
+    $project into a preceding one when it only keeps some of its fields
+    """
+    op1, projection = _stage(first)
+    op2, argument = _stage(second)
+    if op1 != "$project":
+        return None
+    if op2 == "$count":
+        return [second]
+    if op2 != "$project" or not _is_inclusion(projection):
+        return None
+    fields = _kept_fields(projection, argument)
+    if not fields:
+        return None
+    if "_id" in argument and _excludes(argument["_id"]):
+        fields["_id"] = argument["_id"]
+    elif "_id" in projection:
+        fields["_id"] = projection["_id"]
+    return [{"$project": fields}]
+
+
+DEFAULT_RULES = (
+    merge_matches,
+    match_before_sort,
+    match_before_project,
+    fold_skip_limit,
+    limit_before_project,
+    drop_redundant_project,
+)
+
+
+class PipelineOptimizer(object):
+    """
+    Rewrites an aggregation pipeline with a list of rules before it is sent to
+    MongoDb. Rules are applied in turn until none of them changes the pipeline
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, max_passes=10):
+        """
+        Default constructor
+        :param rules: iterable of rule functions. A rule receives a list of
+            stages and returns the rewritten list. It must return the same list
+            when nothing was rewritten and must not modify the stages it
+            receives
+        :param max_passes: maximum number of times the rules are applied
+        """
+        if max_passes < 1:
+            raise ValueError("max_passes must be at least 1")
+        self.rules = list(rules)
+        self.max_passes = max_passes
+        self._lock = threading.Lock()
+
+    def register(self, rule):
+        """
+        Adds a rule after the existing ones. Can be used as a decorator
+        :param rule: a rule function
+        :returns: the rule
+        """
+        with self._lock:
+            self.rules = [*self.rules, rule]
+        return rule
+
+    def unregister(self, rule):
+        """
+        Removes a rule
+        :param rule: a rule function
+        """
+        with self._lock:
+            self.rules = [r for r in self.rules if r is not rule]
+
+    def optimize(self, pipeline):
+        """
+        Rewrites a pipeline
+        :param pipeline: list of stages. It is not modified
+        :returns: the optimized list of stages
+        """
+        rules = self.rules
+        for _ in range(self.max_passes):
+            changed = False
+            for rule in rules:
+                result = rule(pipeline)
+                if result is not pipeline:
+                    pipeline = result
+                    changed = True
+            if not changed:
+                break
+        return pipeline
@@ -0,0 +1,131 @@
+from .optimizer import _excludes, _includes, _stage
+
+# position of each stage in the order find() applies them
+_FIND_ORDER = {"$match": 0, "$sort": 1, "$skip": 2, "$limit": 3, "$project": 4}
+
+
+class FindPlan(object):
+    """
+    Arguments of a collection.find() call equivalent to an aggregation
+    pipeline
+    """
+
+    __slots__ = ("filter", "projection", "sort", "skip", "limit")
+
+    def __init__(
+        self, filter=None, projection=None, sort=None, skip=0, limit=0
+    ):
+        """
+        Default constructor
+        :param filter: the query document
+        :param projection: the projection document or None for whole documents
+        :param sort: list of (field, direction) tuples or None
+        :param skip: number of documents to skip
+        :param limit: maximum number of documents to return. 0 means no limit
+        """
+        self.filter = {} if filter is None else filter
+        self.projection = projection
+        self.sort = sort
+        self.skip = skip
+        self.limit = limit
+
+    def __eq__(self, other):
+        return isinstance(other, FindPlan) and all(
+            getattr(self, k) == getattr(other, k) for k in self.__slots__
+        )
+
+    def __repr__(self):
+        return "FindPlan({0})".format(
+            ", ".join(
+                "{0}={1!r}".format(k, getattr(self, k)) for k in self.__slots__
+            )
+        )
+
+    def execute(self, collection, **kwargs):
+        """
+        Runs the find() call
+        :param collection: a pymongo collection
+        :param kwargs: other arguments of find() such as batch_size
+        :returns: a cursor over the results
+        """
+        return collection.find(
+            self.filter,
+            self.projection,
+            sort=self.sort,
+            skip=self.skip,
+            limit=self.limit,
+            **kwargs
+        )
+
+    def command(self, collection):
+        """
+        Builds the find command equivalent to the find() call, as given to the
+        explain command
+        :param collection: name of the collection
+        :returns: the command document
+        """
+        command = {"find": collection, "filter": self.filter}
+        if self.projection is not None:
+            command["projection"] = self.projection
+        if self.sort:
+            command["sort"] = dict(self.sort)
+        if self.skip:
+            command["skip"] = self.skip
+        if self.limit:
+            command["limit"] = self.limit
+        return command
+
+
+def _find_projection(projection):
+    """
+    Converts the argument of a $project stage into a find() projection
+    :returns: the projection, or None if find() cannot express it
+    """
+    result = {}
+    for key, value in projection.items():
+        if "." in key:
+            # nested fields are returned as sub-documents by find() but not
+            # by every aggregate() implementation
+            return None
+        if _includes(value) or _excludes(value):
+            result[key] = value
+        elif value == "${0}".format(key):
+            result[key] = 1
+        else:
+            return None
+    return result
+
+
+def plan(pipeline):
+    """
+    Finds the find() call that returns the same documents as a pipeline
+    :param pipeline: an optimized list of stages
+    :returns: a FindPlan, or None if the pipeline needs the aggregation
+        framework
+    """
+    result = FindPlan()
+    position = -1
+    for stage in pipeline:
+        op, argument = _stage(stage)
+        order = _FIND_ORDER.get(op, -1)
+        if order <= position:
+            return None
+        position = order
+        if op == "$match":
+            result.filter = argument
+        elif op == "$sort":
+            result.sort = list(argument.items())
+        elif op in ("$skip", "$limit"):
+            if not isinstance(argument, int) or argument < 0:
+                return None
+            if op == "$skip":
+                result.skip = argument
+            elif argument == 0:
+                return None
+            else:
+                result.limit = argument
+        else:
+            result.projection = _find_projection(argument)
+            if result.projection is None:
+                return None
+    return result
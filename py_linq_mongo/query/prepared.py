@@ -0,0 +1,54 @@
+import inspect
+from ..parameters import Parameter
+
+
+class PreparedQuery(object):
+    """
+    A query whose lambdas are translated once and whose parameters are bound
+    each time it is executed
+    """
+
+    def __init__(self, queryable, func):
+        """
+        Prepares a query
+        :param queryable: the Queryable the query starts from
+        :param func: function that receives the Queryable followed by the query
+            parameters and returns the Queryable to execute. Lambdas inside func
+            refer to the parameters as free variables
+        """
+        names = list(inspect.signature(func).parameters)
+        if len(names) == 0:
+            raise TypeError("func must accept the Queryable as first argument")
+        self.parameters = tuple(names[1:])
+        self.queryable = func(
+            queryable, *[Parameter(name) for name in self.parameters]
+        )
+        if not hasattr(self.queryable, "_bind"):
+            raise TypeError("func must return a Queryable")
+
+    def __call__(self, *args, **kwargs):
+        """
+        Binds the parameter values to the prepared query
+        :returns: a Queryable ready to be executed
+        """
+        if len(args) > len(self.parameters):
+            raise TypeError(
+                "expected at most {0} arguments, got {1}".format(
+                    len(self.parameters), len(args)
+                )
+            )
+        values = dict(zip(self.parameters, args))
+        for name, value in kwargs.items():
+            if name not in self.parameters:
+                raise TypeError("unexpected parameter '{0}'".format(name))
+            if name in values:
+                raise TypeError(
+                    "multiple values for parameter '{0}'".format(name)
+                )
+            values[name] = value
+        missing = [name for name in self.parameters if name not in values]
+        if missing:
+            raise TypeError(
+                "missing values for parameters: {0}".format(", ".join(missing))
+            )
+        return self.queryable._bind(values)
@@ -1,4 +1,5 @@
 from py_linq_mongo.model import attributes
+from py_linq_mongo.model.indexes import Index
 
 
 class LeagueModel(object):
@@ -7,6 +8,7 @@ class LeagueModel(object):
     id = attributes.ObjectId()
     name = attributes.String("name")
     short_name = attributes.String("short_name")
+    seasons = attributes.Array("seasons")
 
 
 class SaleModel(object):
@@ -19,6 +21,16 @@ class SaleModel(object):
     date = attributes.DateTime("date")
 
 
+class IndexedSaleModel(object):
+    __collection_name__ = "sales"
+    __indexes__ = [Index("item", ("date", -1)), "quantity"]
+
+    id = attributes.ObjectId()
+    item = attributes.String("item")
+    price = attributes.Integer("price", index=-1)
+    date = attributes.DateTime("date", expire_after_seconds=3600)
+
+
 class StudentModel(object):
     __collection_name__ = "students"
 
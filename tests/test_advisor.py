@@ -0,0 +1,151 @@
+import re
+from unittest import TestCase, mock
+import mongomock
+from py_linq_mongo.model.indexes import Index
+from py_linq_mongo.query.advisor import IndexAdvisor, QueryShape, query_shape
+from .data import MongoData
+
+
+class QueryShapeTests(TestCase):
+    """
+    Unit tests for finding the shape of queries
+    """
+
+    def test_empty(self):
+        self.assertFalse(query_shape([]))
+        self.assertFalse(query_shape([{"$group": {"_id": "$item"}}]))
+        self.assertIsNone(QueryShape().index)
+
+    def test_match(self):
+        shape = query_shape(
+            [
+                {
+                    "$match": {
+                        "$and": [
+                            {"item": "abc"},
+                            {"price": {"$gt": 5, "$lt": 20}},
+                            {"quantity": {"$eq": 2}},
+                            {"name": re.compile("^a")},
+                        ]
+                    }
+                }
+            ]
+        )
+        self.assertEqual(
+            QueryShape(("item", "quantity"), (), ("price", "name")), shape
+        )
+        self.assertEqual(
+            Index("item", "quantity", "price", "name"), shape.index
+        )
+
+    def test_sort(self):
+        shape = query_shape(
+            [
+                {"$match": {"item": "abc", "price": {"$gte": 5}}},
+                {"$sort": {"date": -1, "price": 1}},
+                {"$limit": 2},
+            ]
+        )
+        self.assertEqual(
+            QueryShape(("item",), (("date", -1), ("price", 1)), ()), shape
+        )
+        self.assertEqual(Index("item", ("date", -1), "price"), shape.index)
+        self.assertEqual(
+            QueryShape((), (("date", 1),), ()),
+            query_shape([{"$sort": {"date": 1}}, {"$match": {"a": 1}}]),
+        )
+
+    def test_in(self):
+        query = {"$match": {"item": {"$in": ["abc", "jkl"]}}}
+        self.assertEqual(("item",), query_shape([query]).equality)
+        shape = query_shape([query, {"$sort": {"date": 1}}])
+        self.assertEqual(("item",), shape.range)
+        self.assertEqual(Index("date", "item"), shape.index)
+
+    def test_or(self):
+        shape = query_shape(
+            [{"$match": {"item": "abc", "$or": [{"a": 1}, {"b": 2}]}}]
+        )
+        self.assertEqual(QueryShape(("item",)), shape)
+
+    def test_served_by(self):
+        shape = QueryShape(("item", "quantity"), (("date", -1),), ("price",))
+        self.assertTrue(
+            shape.served_by(
+                [("quantity", 1), ("item", -1), ("date", -1), ("price", 1)]
+            )
+        )
+        self.assertTrue(
+            shape.served_by(
+                [("item", 1), ("quantity", 1), ("date", 1), ("price", 1)]
+            )
+        )
+        self.assertFalse(
+            shape.served_by(
+                [("item", 1), ("date", -1), ("quantity", 1), ("price", 1)]
+            )
+        )
+        self.assertFalse(shape.served_by([("item", 1), ("quantity", 1)]))
+
+
+class IndexAdvisorTests(TestCase):
+    """
+    Unit tests for the IndexAdvisor class
+    """
+
+    def setUp(self):
+        database = mongomock.MongoClient()["whl-data"]
+        MongoData(database).seed_data()
+        self.collection = database["sales"]
+        self.advisor = IndexAdvisor()
+
+    def test_record(self):
+        for price in (5, 10, 20):
+            self.advisor.record(
+                self.collection,
+                [{"$match": {"price": {"$gt": price}}}, {"$sort": {"date": 1}}],
+            )
+        self.advisor.record(self.collection, [{"$match": {"item": "abc"}}])
+        self.advisor.record(self.collection, [{"$limit": 1}])
+        self.assertEqual(2, len(self.advisor))
+        self.collection.create_index([("item", 1), ("date", 1)])
+        report = self.advisor.report()
+        self.assertEqual([3, 1], [row["count"] for row in report])
+        self.assertEqual(Index("date", "price"), report[0]["index"])
+        self.assertIsNone(report[0]["existing"])
+        self.assertEqual("item_1_date_1", report[1]["existing"])
+        self.assertEqual("whl-data.sales", report[1]["collection"])
+        self.assertIsNone(report[0]["ratio"])
+        self.advisor.clear()
+        self.assertEqual([], self.advisor.report())
+
+    def test_report_explain(self):
+        pipelines = {
+            "price": [{"$match": {"price": {"$gt": 5}}}],
+            "item": [{"$match": {"item": "abc"}}],
+        }
+        self.advisor.record(self.collection, pipelines["price"])
+        for _ in range(2):
+            self.advisor.record(self.collection, pipelines["item"])
+
+        def explain(command):
+            field = next(iter(command["explain"]["filter"]))
+            examined = {"price": 100, "item": 4}[field]
+            return {
+                "queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}},
+                "executionStats": {
+                    "nReturned": 2,
+                    "totalDocsExamined": examined,
+                },
+            }
+
+        with mock.patch.object(
+            self.collection.database, "command", side_effect=explain
+        ):
+            report = self.advisor.report(explain=True)
+        # the single price query examines more documents than both item ones
+        self.assertEqual(
+            [Index("price"), Index("item")], [row["index"] for row in report]
+        )
+        self.assertEqual([50, 2], [row["ratio"] for row in report])
+        self.assertEqual([100, 4], [row["docs_examined"] for row in report])
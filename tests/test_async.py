@@ -0,0 +1,233 @@
+import asyncio
+import datetime
+from unittest import TestCase, mock
+import mongomock
+from py_linq import exceptions
+from py_linq_mongo.provider import AsyncMongoProvider
+from py_linq_mongo.query.asynchronous import AsyncQueryable
+from . import IndexedSaleModel, SaleModel, LeagueModel
+from .data import MongoData
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class AsyncCursor(object):
+    """
+    Wraps a mongomock cursor with the asyncio interface of motor cursors
+    """
+
+    def __init__(self, cursor):
+        self.cursor = iter(cursor)
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(0)
+        if self.closed:
+            raise StopAsyncIteration()
+        try:
+            return next(self.cursor)
+        except StopIteration:
+            raise StopAsyncIteration()
+
+    async def to_list(self, length):
+        return [document async for document in self]
+
+    async def close(self):
+        self.closed = True
+
+
+class AsyncCollection(object):
+    """
+    Wraps a mongomock collection with the asyncio interface of motor
+    collections
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.cursors = []
+
+    def find(self, *args, **kwargs):
+        return self._cursor(self.collection.find(*args, **kwargs))
+
+    def aggregate(self, pipeline, **kwargs):
+        return self._cursor(self.collection.aggregate(pipeline, **kwargs))
+
+    def _cursor(self, cursor):
+        self.cursors.append(AsyncCursor(cursor))
+        return self.cursors[-1]
+
+    async def count_documents(self, *args, **kwargs):
+        return self.collection.count_documents(*args, **kwargs)
+
+    async def estimated_document_count(self):
+        return self.collection.estimated_document_count()
+
+    def list_indexes(self):
+        return self._cursor(self.collection.list_indexes())
+
+    async def create_indexes(self, indexes):
+        return self.collection.create_indexes(indexes)
+
+    @property
+    def name(self):
+        return self.collection.name
+
+
+class AsyncDatabase(object):
+    def __init__(self, database):
+        self.database = database
+
+    def __getitem__(self, name):
+        return AsyncCollection(self.database[name])
+
+
+class AsyncClient(object):
+    def __init__(self, client):
+        self.client = client
+
+    def __getitem__(self, name):
+        return AsyncDatabase(self.client[name])
+
+
+class AsyncQueryableTests(TestCase):
+    """
+    Unit tests for the AsyncQueryable class
+    """
+
+    def setUp(self):
+        client = mongomock.MongoClient()
+        MongoData(client["whl-data"]).seed_data()
+        self.provider = AsyncMongoProvider(AsyncClient(client), "whl-data")
+        self.query = self.provider.query(SaleModel)
+
+    def test_query(self):
+        self.assertIsInstance(self.query, AsyncQueryable)
+        self.assertEqual(SaleModel, self.query.model)
+        query = AsyncQueryable(self.query.collection, SaleModel)
+        self.assertEqual(5, run(query.count()))
+
+    def test_async_for(self):
+        async def items():
+            query = self.query.where(lambda s: s.price > 5).order_by(
+                lambda s: s.date
+            )
+            return [sale.item async for sale in query]
+
+        self.assertEqual(["abc", "jkl", "abc"], run(items()))
+        self.assertTrue(all(c.closed for c in self.query.collection.cursors))
+        self.assertEqual(0, self.provider.open_cursors)
+
+    def test_early_exit(self):
+        async def first():
+            results = self.query.__aiter__()
+            sale = await results.__anext__()
+            self.assertEqual(1, self.provider.open_cursors)
+            await results.aclose()
+            return sale
+
+        self.assertEqual("abc", run(first()).item)
+        self.assertTrue(self.query.collection.cursors[0].closed)
+        self.assertEqual(0, self.provider.open_cursors)
+
+    def test_to_list(self):
+        query = self.query.order_by_descending(lambda s: s.price).then_by(
+            lambda s: s.quantity
+        )
+        result = run(query.select(lambda s: (s.price, s.quantity)).to_list())
+        self.assertEqual([(20, 1), (10, 2), (10, 10), (5, 5), (5, 10)], result)
+
+        groups = run(self.query.group_by(lambda s: s.item).to_list())
+        self.assertEqual(3, len(groups))
+
+    def test_count(self):
+        self.assertEqual(5, run(self.query.count()))
+        self.assertEqual(
+            2, run(self.query.where(lambda s: s.price == 10).count())
+        )
+        self.assertEqual(3, run(self.query.group_by(lambda s: s.item).count()))
+        self.assertEqual(
+            2,
+            run(self.query.where(lambda s: s.price == 10).count(True)),
+        )
+
+    def test_first(self):
+        query = self.query.order_by(lambda s: s.date)
+        self.assertEqual("abc", run(query.first()).item)
+        self.assertEqual("jkl", run(query.first(lambda s: s.price > 10)).item)
+        self.assertEqual(5, len(run(query.to_list())))
+        self.assertIsNone(run(query.first_or_default(lambda s: s.price > 50)))
+        with self.assertRaises(exceptions.NoElementsError):
+            run(query.first(lambda s: s.price > 50))
+
+    def test_single(self):
+        self.assertEqual(
+            "jkl", run(self.query.single(lambda s: s.price == 20)).item
+        )
+        with self.assertRaises(exceptions.MoreThanOneMatchingElement):
+            run(self.query.single(lambda s: s.price == 10))
+        self.assertIsNone(
+            run(self.query.single_or_default(lambda s: s.price == 50))
+        )
+
+    def test_any_all(self):
+        self.assertTrue(run(self.query.any()))
+        self.assertTrue(run(self.query.any(lambda s: s.price == 20)))
+        self.assertFalse(run(self.query.any(lambda s: s.price > 20)))
+        self.assertTrue(run(self.query.all(lambda s: s.price >= 5)))
+        self.assertFalse(run(self.query.all(lambda s: s.price > 5)))
+
+    def test_scalars(self):
+        cutoff = datetime.datetime(2014, 2, 1)
+        query = self.query.where(lambda s: s.date > cutoff)
+        self.assertEqual(20, run(query.max(lambda s: s.price)))
+        self.assertEqual(5, run(query.min(lambda s: s.price)))
+        self.assertEqual(40, run(query.sum(lambda s: s.price)))
+        self.assertEqual(10, run(query.average(lambda s: s.price)))
+        self.assertEqual(
+            {"total": 26, "count": 4},
+            run(
+                query.aggregates(
+                    total=("sum", lambda s: s.quantity), count="count"
+                )
+            ),
+        )
+
+    def test_league(self):
+        query = self.provider.query(LeagueModel)
+        self.assertEqual("WHL", run(query.first()).short_name)
+
+    def test_ensure_indexes(self):
+        created = run(self.provider.ensure_indexes([IndexedSaleModel]))
+        self.assertEqual(
+            {"sales": ["price_-1", "date_1", "item_1_date_-1", "quantity_1"]},
+            created,
+        )
+        self.assertEqual(
+            {"sales": []}, run(self.provider.ensure_indexes([IndexedSaleModel]))
+        )
+
+    def test_execution_options(self):
+        collection = self.query.collection.collection
+        query = self.query.max_time(100).allow_disk_use()
+        with mock.patch.object(
+            collection, "aggregate", wraps=collection.aggregate
+        ) as aggregate:
+            self.assertEqual(20, run(query.max(lambda s: s.price)))
+        self.assertEqual(
+            {"maxTimeMS": 100, "allowDiskUse": True}, aggregate.call_args[1]
+        )
+        with mock.patch.object(
+            collection, "count_documents", wraps=collection.count_documents
+        ) as count_documents:
+            self.assertEqual(3, run(query.where(lambda s: s.price > 5).count()))
+        self.assertEqual({"maxTimeMS": 100}, count_documents.call_args[1])
+        with mock.patch.object(
+            collection, "find", wraps=collection.find
+        ) as find:
+            run(query.where(lambda s: s.price > 5).to_list())
+        self.assertEqual(100, find.call_args[1]["max_time_ms"])
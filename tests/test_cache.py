@@ -0,0 +1,96 @@
+from unittest import TestCase
+import bson
+from py_linq_mongo.query.cache import ResultCache
+from . import SaleModel
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class ResultCacheTests(TestCase):
+    """
+    Unit tests for the ResultCache class
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = ResultCache(max_bytes=200, ttl=10, clock=self.clock)
+
+    def test_fingerprint(self):
+        pipeline = [{"$match": {"price": {"$gt": 5}}}, {"$limit": 2}]
+        key = self.cache.fingerprint("db.sales", "to_list", [pipeline])
+        self.assertEqual(
+            key,
+            self.cache.fingerprint(
+                "db.sales", "to_list", [[dict(s) for s in pipeline]]
+            ),
+        )
+        self.assertNotEqual(
+            key, self.cache.fingerprint("db.other", "to_list", [pipeline])
+        )
+        self.assertNotEqual(
+            key, self.cache.fingerprint("db.sales", "count", [pipeline])
+        )
+        self.assertNotEqual(
+            key,
+            self.cache.fingerprint("db.sales", "to_list", [pipeline[:1]]),
+        )
+        with self.assertRaises(bson.errors.InvalidDocument):
+            self.cache.fingerprint("db.sales", "to_list", [object()])
+
+    def test_get_put(self):
+        self.assertEqual((False, None), self.cache.get("a"))
+        value = [{"item": "abc", "price": 10}]
+        self.cache.put("a", value, 10)
+        found, cached = self.cache.get("a")
+        self.assertTrue(found)
+        self.assertEqual(value, cached)
+        cached[0]["price"] = 20
+        self.assertEqual(value, self.cache.get("a")[1])
+        self.assertEqual(
+            {
+                "hits": 2,
+                "misses": 1,
+                "evictions": 0,
+                "hit_rate": 2 / 3,
+                "entries": 1,
+                "bytes": len(bson.encode({"v": value})),
+            },
+            self.cache.statistics,
+        )
+
+    def test_ttl(self):
+        self.cache.put("a", 1, 10)
+        self.clock.now = 9
+        self.assertEqual((True, 1), self.cache.get("a"))
+        self.clock.now = 10
+        self.assertEqual((False, None), self.cache.get("a"))
+        self.assertEqual(0, self.cache.statistics["bytes"])
+
+    def test_lru(self):
+        for key in "abcd":
+            self.cache.put(key, "x" * 40, 10)
+        self.assertEqual(3, self.cache.statistics["entries"])
+        self.assertFalse(self.cache.get("a")[0])
+        self.assertTrue(self.cache.get("b")[0])
+        self.cache.put("e", "x" * 40, 10)
+        self.assertTrue(self.cache.get("b")[0])
+        self.assertFalse(self.cache.get("c")[0])
+        self.assertEqual(2, self.cache.statistics["evictions"])
+
+        self.cache.put("f", "x" * 300, 10)
+        self.assertFalse(self.cache.get("f")[0])
+        self.cache.clear()
+        self.assertEqual(0, self.cache.statistics["bytes"])
+
+    def test_ttl_for(self):
+        class ReferenceModel(SaleModel):
+            __cache_ttl__ = 3600
+
+        self.assertEqual(10, self.cache.ttl_for(SaleModel))
+        self.assertEqual(3600, self.cache.ttl_for(ReferenceModel))
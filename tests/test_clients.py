@@ -0,0 +1,62 @@
+import os
+from unittest import TestCase, mock
+from py_linq_mongo.clients import ClientRegistry, PoolStatistics
+
+
+class ClientRegistryTests(TestCase):
+    """
+    Unit tests for the ClientRegistry class
+    """
+
+    def setUp(self):
+        self.registry = ClientRegistry()
+        self.factory = mock.Mock(side_effect=lambda uri, **kwargs: mock.Mock())
+
+    def test_get(self):
+        client, statistics = self.registry.get(
+            self.factory, "mongodb://a", username="user", maxPoolSize=5
+        )
+        self.assertIsInstance(statistics, PoolStatistics)
+        self.assertEqual(
+            [statistics], self.factory.call_args[1]["event_listeners"]
+        )
+        self.assertIs(
+            client,
+            self.registry.get(
+                self.factory, "mongodb://a", maxPoolSize=5, username="user"
+            )[0],
+        )
+        self.assertIsNot(
+            client,
+            self.registry.get(
+                self.factory, "mongodb://a", username="other", maxPoolSize=5
+            )[0],
+        )
+        self.assertIsNot(
+            client, self.registry.get(self.factory, "mongodb://b")[0]
+        )
+        self.assertEqual(3, len(self.registry))
+
+    def test_event_listeners(self):
+        listener = object()
+        _, statistics = self.registry.get(
+            self.factory, "mongodb://a", event_listeners=[listener]
+        )
+        self.assertEqual(
+            [listener, statistics],
+            self.factory.call_args[1]["event_listeners"],
+        )
+
+    def test_clear(self):
+        client, _ = self.registry.get(self.factory, "mongodb://a")
+        self.registry.clear()
+        client.close.assert_called_once_with()
+        self.assertEqual(0, len(self.registry))
+
+    def test_forked(self):
+        client, _ = self.registry.get(self.factory, "mongodb://a")
+        with mock.patch.object(os, "getpid", return_value=os.getpid() + 1):
+            forked, _ = self.registry.get(self.factory, "mongodb://a")
+        self.assertIsNot(client, forked)
+        client.close.assert_not_called()
+        self.assertEqual(1, len(self.registry))
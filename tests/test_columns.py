@@ -0,0 +1,81 @@
+import datetime
+from unittest import TestCase, skipIf
+from py_linq_mongo.query.columns import (
+    ColumnBuffer,
+    read_arrays,
+    read_columns,
+    structured,
+)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+DOCUMENTS = [
+    {"item": "abc", "price": 10, "shipping": {"days": 2}},
+    {"item": "jkl", "price": None, "shipping": {"days": 3}},
+    {"item": "xyz", "shipping": None},
+]
+
+COLUMNS = {"item": "item", "price": "price", "days": "shipping.days"}
+
+
+class ColumnTests(TestCase):
+    """
+    Unit tests for reading documents into columns
+    """
+
+    def test_read_columns(self):
+        self.assertEqual(
+            {
+                "item": ["abc", "jkl", "xyz"],
+                "price": [10, None, None],
+                "days": [2, 3, None],
+            },
+            read_columns(DOCUMENTS, COLUMNS),
+        )
+
+    def test_read_columns_empty(self):
+        self.assertEqual({"item": []}, read_columns([], {"item": "item"}))
+
+    @skipIf(numpy is None, "numpy is not installed")
+    def test_column_buffer_grows(self):
+        buffer = ColumnBuffer(numpy, "int64", capacity=2)
+        for value in range(5):
+            buffer.append(value)
+        self.assertEqual("int64", buffer.array().dtype)
+        self.assertEqual([0, 1, 2, 3, 4], buffer.array().tolist())
+
+    @skipIf(numpy is None, "numpy is not installed")
+    def test_column_buffer_missing(self):
+        buffer = ColumnBuffer(numpy, "int64")
+        buffer.append(1)
+        buffer.append(None)
+        self.assertEqual("float64", buffer.array().dtype)
+        self.assertEqual(1.0, buffer.array()[0])
+        self.assertTrue(numpy.isnan(buffer.array()[1]))
+
+        buffer = ColumnBuffer(numpy, "datetime64[ms]")
+        buffer.append(datetime.datetime(2014, 1, 1))
+        buffer.append(None)
+        self.assertTrue(numpy.isnat(buffer.array()[1]))
+
+    @skipIf(numpy is None, "numpy is not installed")
+    def test_read_arrays(self):
+        arrays = read_arrays(
+            numpy, DOCUMENTS, COLUMNS, {"item": str, "days": int}
+        )
+        self.assertEqual("O", arrays["item"].dtype)
+        self.assertEqual("O", arrays["price"].dtype)
+        self.assertEqual("float64", arrays["days"].dtype)
+        self.assertEqual(["abc", "jkl", "xyz"], arrays["item"].tolist())
+
+    @skipIf(numpy is None, "numpy is not installed")
+    def test_structured(self):
+        arrays = read_arrays(numpy, DOCUMENTS[:2], COLUMNS, {"days": int})
+        result = structured(numpy, arrays)
+        self.assertEqual(("item", "price", "days"), result.dtype.names)
+        self.assertEqual([2, 3], result["days"].tolist())
+        self.assertEqual(0, len(structured(numpy, {})))
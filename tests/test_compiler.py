@@ -0,0 +1,178 @@
+import itertools
+import random
+import sys
+from types import SimpleNamespace
+from unittest import TestCase, skipUnless
+import mongomock
+from py_linq_mongo.decompile import BytecodeCompiler
+from py_linq_mongo.expressions import LambdaExpression
+from py_linq_mongo.parameters import Parameter
+
+
+def _predicate(rng, depth):
+    """
+    Builds the source of a random and/or predicate over the fields a, b and c
+    """
+    if depth == 0 or rng.random() < 0.3:
+        return "x.{0} == 1".format(rng.choice("abc"))
+    op = rng.choice([" and ", " or "])
+    source = op.join(
+        _predicate(rng, depth - 1) for _ in range(rng.randint(2, 3))
+    )
+    if rng.random() < 0.15:
+        source = "not ({0})".format(source)
+    return "({0})".format(source)
+
+
+class TestBytecodeCompiler(TestCase):
+    """
+    Test cases for the single-pass bytecode compiler
+    """
+
+    def setUp(self):
+        self.maxDiff = None
+        self.compiler = BytecodeCompiler()
+
+    def compile(self, func):
+        return self.compiler.compile(func.__code__)
+
+    @skipUnless(
+        sys.version_info[:2] == (3, 7),
+        "the two-pass translator only decompiles Python 3.7 bytecode",
+    )
+    def test_matches_translator(self):
+        """
+        Make sure the compiler produces the same documents as the two-pass
+        translator
+        """
+        low = 10
+        funcs = [
+            lambda x: x.first_name == "Bruce",
+            lambda x: x.gpa <= 10,
+            lambda x: x.last_name not in "Fenske",
+            lambda x: x.gpa + 10,
+            lambda x: x.gpa % 2,
+            lambda x: x.gpa >= 10 and x.gpa <= 50,
+            lambda x: x.gpa >= 10 or x.gpa <= 50 or x.last_name == "Fenske",
+            lambda x: (x.gpa >= 10 and x.gpa <= 50) or x.last_name == "Fenske",
+            lambda x: (x.gpa >= 10 or x.gpa <= 50) and x.last_name == "Fenske",
+            lambda x: not x.gpa == 10,
+            lambda x: not (x.gpa > 10 and x.gpa < 50),
+            lambda x: x.item in ["abc", "jkl"],
+            lambda x: x.gpa > low,
+            lambda x: x.first_name,
+            lambda x: [x.first_name, x.last_name],
+            lambda x: (x.first_name, x.last_name),
+            lambda x: {"name": x.first_name, "gpa": x.gpa},
+        ]
+        for func in funcs:
+            expected = LambdaExpression.translate(func.__code__).body.mongo
+            self.assertEqual(expected, self.compile(func))
+
+    def test_not_group(self):
+        self.assertEqual(
+            {
+                "$or": [
+                    {
+                        "$nor": [
+                            {"$and": [{"a": {"$eq": 1}}, {"b": {"$eq": 2}}]}
+                        ]
+                    },
+                    {"c": {"$eq": 3}},
+                ]
+            },
+            self.compile(lambda x: not (x.a == 1 and x.b == 2) or x.c == 3),
+        )
+
+    def test_nested_groups(self):
+        self.assertEqual(
+            {
+                "$and": [
+                    {"$or": [{"a": {"$eq": 1}}, {"b": {"$eq": 2}}]},
+                    {"$or": [{"c": {"$eq": 3}}, {"d": {"$eq": 4}}]},
+                ]
+            },
+            self.compile(
+                lambda x: (x.a == 1 or x.b == 2) and (x.c == 3 or x.d == 4)
+            ),
+        )
+
+    def test_reversed_comparison(self):
+        self.assertEqual(
+            {"gpa": {"$lt": 10}}, self.compile(lambda x: 10 > x.gpa)
+        )
+
+    def test_value_in_field(self):
+        self.assertEqual(
+            {"tags": {"$eq": "abc"}}, self.compile(lambda x: "abc" in x.tags)
+        )
+
+    def test_is_none(self):
+        self.assertEqual(
+            {"deleted": {"$eq": None}},
+            self.compile(lambda x: x.deleted is None),
+        )
+
+    def test_nested_field(self):
+        self.assertEqual(
+            {"address.city": {"$eq": "Paris"}},
+            self.compile(lambda x: x.address.city == "Paris"),
+        )
+
+    def test_field_comparison(self):
+        self.assertEqual(
+            {"$expr": {"$gt": ["$wins", "$losses"]}},
+            self.compile(lambda x: x.wins > x.losses),
+        )
+
+    def test_parameters(self):
+        low = 1
+        result = self.compile(lambda x: x.gpa > low)
+        self.assertEqual({"gpa": {"$gt": Parameter("low")}}, result)
+        self.assertEqual({"low"}, self.compiler.parameters)
+
+    def test_unsupported(self):
+        self.assertRaises(
+            NotImplementedError, self.compile, lambda x: x.name.upper()
+        )
+
+    def test_truth_table(self):
+        """
+        Make sure the documents compiled from nested and/or predicates match
+        the same documents as the lambda expressions, including predicates
+        long enough for their jumps to need EXTENDED_ARG
+        """
+        collection = mongomock.MongoClient().db.rows
+        collection.insert_many(
+            [
+                dict(zip("abc", values))
+                for values in itertools.product((0, 1), repeat=3)
+            ]
+        )
+        rng = random.Random(0)
+        sources = [
+            "(x.a == 1 and (x.c == 1 or x.b == 1 or x.b == 1)"
+            " and ((x.c == 1 or x.c == 1 or x.a == 1)"
+            " and (x.a == 1 and x.b == 1 and x.b == 1)))"
+            " or (((x.a == 1 and x.a == 1 and x.b == 1)"
+            " and (x.a == 1 or x.b == 1 or x.b == 1)"
+            " and (x.a == 1 or x.c == 1 or x.b == 1))"
+            " and (x.c == 1 and (x.b == 1 or x.c == 1 or x.a == 1)"
+            " and (x.c == 1 and x.c == 1 and x.b == 1)))"
+        ]
+        sources += [_predicate(rng, 4) for _ in range(300)]
+        for source in sources:
+            func = eval("lambda x: " + source)
+            try:
+                query = self.compile(func)
+            except NotImplementedError:
+                # unsupported bytecode is reported, not compiled wrongly
+                continue
+            with self.subTest(source=source):
+                expected = [
+                    document["_id"]
+                    for document in collection.find()
+                    if func(SimpleNamespace(**document))
+                ]
+                found = [document["_id"] for document in collection.find(query)]
+                self.assertEqual(expected, found)
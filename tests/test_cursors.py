@@ -0,0 +1,153 @@
+import gc
+import threading
+from unittest import TestCase
+from py_linq_mongo.query.cursors import (
+    CursorRegistry,
+    MergingCursor,
+    PrefetchingCursor,
+    sort_key,
+)
+
+
+class FakeCursor(object):
+    """
+    Cursor over a list of documents that can fail after a number of documents
+    """
+
+    def __init__(self, documents, fail_after=None):
+        self.documents = documents
+        self.fail_after = fail_after
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        for document in self.documents:
+            if self.read == self.fail_after:
+                raise RuntimeError("connection lost")
+            self.read += 1
+            yield document
+
+    def close(self):
+        self.closed = True
+
+
+class CursorRegistryTests(TestCase):
+    """
+    Unit tests for the CursorRegistry class
+    """
+
+    def test_add_discard(self):
+        registry = CursorRegistry()
+        first, second = FakeCursor([]), FakeCursor([])
+        registry.add(first)
+        registry.add(second)
+        self.assertEqual(2, len(registry))
+        registry.discard(first)
+        registry.discard(first)
+        self.assertEqual(1, len(registry))
+
+    def test_garbage_collected(self):
+        registry = CursorRegistry()
+        registry.add(FakeCursor([]))
+        gc.collect()
+        self.assertEqual(0, len(registry))
+
+
+class PrefetchingCursorTests(TestCase):
+    """
+    Unit tests for the PrefetchingCursor class
+    """
+
+    def test_iterate(self):
+        cursor = FakeCursor(list(range(10)))
+        prefetching = PrefetchingCursor([cursor], depth=2, batch_size=3)
+        self.assertEqual(list(range(10)), list(prefetching))
+        self.assertRaises(StopIteration, prefetching.next)
+        prefetching.close()
+        self.assertTrue(cursor.closed)
+
+    def test_backpressure(self):
+        cursor = FakeCursor(list(range(100)))
+        prefetching = PrefetchingCursor([cursor], depth=2, batch_size=5)
+        self.assertEqual(0, next(prefetching))
+        prefetching._threads[0].join(0.2)
+        # one batch is being read and at most two are waiting in the queue
+        self.assertTrue(prefetching._threads[0].is_alive())
+        self.assertLessEqual(cursor.read, 20)
+        prefetching.close()
+        self.assertFalse(prefetching._threads[0].is_alive())
+        self.assertTrue(cursor.closed)
+        self.assertRaises(StopIteration, prefetching.next)
+
+    def test_failure(self):
+        cursor = FakeCursor(list(range(10)), fail_after=4)
+        prefetching = PrefetchingCursor([cursor], depth=1, batch_size=2)
+        self.assertEqual([0, 1, 2, 3], [next(prefetching) for _ in range(4)])
+        with self.assertRaises(RuntimeError):
+            next(prefetching)
+        prefetching.close()
+        self.assertTrue(cursor.closed)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, PrefetchingCursor, [FakeCursor([])], 0)
+        self.assertRaises(
+            ValueError, PrefetchingCursor, [FakeCursor([])], 1, batch_size=0
+        )
+        self.assertEqual(1, threading.active_count())
+
+    def test_partitions(self):
+        cursors = [FakeCursor(list(range(i, 30, 3))) for i in range(3)]
+        prefetching = PrefetchingCursor(cursors, depth=2, batch_size=4)
+        self.assertEqual(list(range(30)), sorted(prefetching))
+        prefetching.close()
+        self.assertTrue(all(cursor.closed for cursor in cursors))
+
+
+class MergingCursorTests(TestCase):
+    """
+    Unit tests for the MergingCursor class
+    """
+
+    def test_sort_key(self):
+        documents = [
+            {"a": "x"},
+            {"a": 2, "b": {"c": 1}},
+            {"a": 2, "b": {"c": 3}},
+            {"a": None},
+            {},
+            {"a": 1.5},
+            {"a": True},
+        ]
+        key = sort_key([("a", 1), ("b.c", -1)])
+        self.assertEqual(
+            [
+                {"a": None},
+                {},
+                {"a": 1.5},
+                {"a": 2, "b": {"c": 3}},
+                {"a": 2, "b": {"c": 1}},
+                {"a": "x"},
+                {"a": True},
+            ],
+            sorted(documents, key=key),
+        )
+
+    def test_merge(self):
+        cursors = [
+            FakeCursor([{"n": n} for n in range(i, 30, 3)]) for i in range(3)
+        ]
+        merging = MergingCursor(cursors, [("n", 1)], depth=1, batch_size=2)
+        self.assertEqual(0, next(merging)["n"])
+        self.assertEqual(list(range(1, 30)), [d["n"] for d in merging])
+        merging.close()
+        self.assertTrue(all(cursor.closed for cursor in cursors))
+
+    def test_merge_early_close(self):
+        cursors = [
+            FakeCursor([{"n": -n} for n in range(100)]) for _ in range(2)
+        ]
+        merging = MergingCursor(cursors, [("n", -1)], depth=1, batch_size=2)
+        self.assertEqual([0, 0, -1], [next(merging)["n"] for _ in range(3)])
+        merging.close()
+        self.assertTrue(all(cursor.closed for cursor in cursors))
+        self.assertEqual(1, threading.active_count())
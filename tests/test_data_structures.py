@@ -0,0 +1,48 @@
+from unittest import TestCase
+from py_linq_mongo.data_structures import Cursor, Queue, Stack
+
+
+class TestDataStructures(TestCase):
+    """
+    Test cases for the stack, queue and cursor types
+    """
+
+    def test_stack(self):
+        stack = Stack()
+        for i in range(3):
+            stack.push(i)
+        self.assertEqual(2, stack.top())
+        self.assertEqual(3, len(stack))
+        self.assertEqual([2, 1, 0], [stack.pop() for _ in range(3)])
+        self.assertIsNone(stack.pop())
+        self.assertIsNone(stack.top())
+
+    def test_stack_items(self):
+        self.assertRaises(AttributeError, Stack, (1, 2))
+        stack = Stack([1, 2])
+        copy = stack.copy()
+        copy.push(3)
+        self.assertEqual([1, 2], stack.items)
+        self.assertEqual(3, copy.top())
+
+    def test_queue(self):
+        queue = Queue()
+        for i in range(3):
+            queue.push(i)
+        self.assertEqual(0, queue.top())
+        self.assertEqual([0, 1, 2], [queue.pop() for _ in range(3)])
+        self.assertIsNone(queue.pop())
+
+    def test_cursor(self):
+        items = ["a", "b"]
+        cursor = Cursor(items)
+        self.assertEqual("a", cursor.top())
+        self.assertEqual("a", cursor.pop())
+        self.assertEqual(1, len(cursor))
+        self.assertEqual("b", cursor.pop())
+        self.assertIsNone(cursor.pop())
+        self.assertEqual(["a", "b"], items)
+
+    def test_slots(self):
+        for obj in (Stack(), Queue(), Cursor([])):
+            self.assertRaises(AttributeError, setattr, obj, "other", 1)
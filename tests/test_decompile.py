@@ -198,3 +198,23 @@ class TestDecompilers(TestCase):
             "Lambda(args=arguments(args=[Name(id='x', ctx=Param())], vararg=None, kwarg=None, defaults=[]), body=Return(value=BoolOp(op=And(), values=[BoolOp(op=Or(), values=[Compare(left=Attribute(value=Name(id='x', ctx=Load()), attr='gpa', ctx=Load()), ops=[GtE()], comparators=[Num(n=10)]), Compare(left=Attribute(value=Name(id='x', ctx=Load()), attr='gpa', ctx=Load()), ops=[LtE()], comparators=[Num(n=50)])]), Compare(left=Attribute(value=Name(id='x', ctx=Load()), attr='last_name', ctx=Load()), ops=[Eq()], comparators=[Str(s='Fenske')])])))",
             ast.dump(tree),
         )
+
+    def test_many_clauses(self):
+        """
+        Make sure long predicates with extended jump arguments decompile
+        """
+        source = " and ".join("x.a{0} == {0}".format(k) for k in range(60))
+        tree = LambdaDecompiler().decompile(
+            eval("lambda x: " + source).__code__
+        )
+        values = []
+        node = tree.body.value
+        while isinstance(node, ast.BoolOp):
+            values.append(node.values[1])
+            node = node.values[0]
+        values.append(node)
+        self.assertEqual(60, len(values))
+        self.assertEqual(
+            ["a{0}".format(k) for k in range(60)],
+            [v.left.attr for v in reversed(values)],
+        )
@@ -0,0 +1,177 @@
+from unittest import TestCase
+from py_linq_mongo.query.explain import lambda_source, summarize
+
+
+class SummarizeTests(TestCase):
+    """
+    Unit tests for summarizing the output of the explain command
+    """
+
+    def test_collection_scan(self):
+        explanation = {
+            "queryPlanner": {
+                "winningPlan": {
+                    "stage": "COLLSCAN",
+                    "filter": {"price": {"$gt": 5}},
+                }
+            },
+            "executionStats": {
+                "nReturned": 3,
+                "executionTimeMillis": 4,
+                "totalKeysExamined": 0,
+                "totalDocsExamined": 5,
+                "executionStages": {
+                    "stage": "COLLSCAN",
+                    "nReturned": 3,
+                    "executionTimeMillisEstimate": 2,
+                },
+            },
+        }
+        summary = summarize(explanation)
+        self.assertEqual(["COLLSCAN"], summary["stages"])
+        self.assertEqual([], summary["indexes"])
+        self.assertTrue(summary["collection_scan"])
+        self.assertEqual(0, summary["keys_examined"])
+        self.assertEqual(5, summary["docs_examined"])
+        self.assertEqual(3, summary["returned"])
+        self.assertEqual(4, summary["execution_time_ms"])
+        self.assertEqual(
+            [{"stage": "COLLSCAN", "time_ms": 2, "returned": 3}],
+            summary["stage_times"],
+        )
+
+    def test_index_scan(self):
+        explanation = {
+            "queryPlanner": {
+                "winningPlan": {
+                    "stage": "FETCH",
+                    "inputStage": {"stage": "IXSCAN", "indexName": "price_1"},
+                }
+            }
+        }
+        summary = summarize(explanation)
+        self.assertEqual(["FETCH", "IXSCAN"], summary["stages"])
+        self.assertEqual(["price_1"], summary["indexes"])
+        self.assertFalse(summary["collection_scan"])
+        # queryPlanner verbosity does not run the query
+        self.assertIsNone(summary["docs_examined"])
+        self.assertEqual([], summary["stage_times"])
+
+    def test_slot_based_engine(self):
+        explanation = {
+            "queryPlanner": {
+                "winningPlan": {
+                    "queryPlan": {
+                        "stage": "OR",
+                        "inputStages": [
+                            {"stage": "IXSCAN", "indexName": "item_1"},
+                            {"stage": "IXSCAN", "indexName": "date_-1"},
+                        ],
+                    },
+                    "slotBasedPlan": {"stages": "..."},
+                }
+            }
+        }
+        summary = summarize(explanation)
+        self.assertEqual(["OR", "IXSCAN", "IXSCAN"], summary["stages"])
+        self.assertEqual(["date_-1", "item_1"], summary["indexes"])
+
+    def test_aggregate(self):
+        explanation = {
+            "stages": [
+                {
+                    "$cursor": {
+                        "queryPlanner": {
+                            "winningPlan": {
+                                "stage": "PROJECTION_SIMPLE",
+                                "inputStage": {"stage": "COLLSCAN"},
+                            }
+                        },
+                        "executionStats": {
+                            "nReturned": 5,
+                            "executionTimeMillis": 3,
+                            "totalKeysExamined": 0,
+                            "totalDocsExamined": 5,
+                            "executionStages": {
+                                "stage": "PROJECTION_SIMPLE",
+                                "executionTimeMillisEstimate": 1,
+                                "nReturned": 5,
+                                "inputStage": {
+                                    "stage": "COLLSCAN",
+                                    "executionTimeMillisEstimate": 1,
+                                    "nReturned": 5,
+                                },
+                            },
+                        },
+                    },
+                    "nReturned": 5,
+                    "executionTimeMillisEstimate": 1,
+                },
+                {
+                    "$group": {"_id": "$item"},
+                    "nReturned": 3,
+                    "executionTimeMillisEstimate": 2,
+                },
+            ]
+        }
+        summary = summarize(explanation)
+        self.assertEqual(["PROJECTION_SIMPLE", "COLLSCAN"], summary["stages"])
+        self.assertTrue(summary["collection_scan"])
+        self.assertEqual(5, summary["docs_examined"])
+        self.assertEqual(3, summary["returned"])
+        self.assertEqual(
+            ["PROJECTION_SIMPLE", "COLLSCAN", "$group"],
+            [stage["stage"] for stage in summary["stage_times"]],
+        )
+        self.assertEqual(2, summary["stage_times"][-1]["time_ms"])
+
+    def test_sharded(self):
+        explanation = {
+            "queryPlanner": {
+                "winningPlan": {
+                    "stage": "SHARD_MERGE",
+                    "shards": [
+                        {"winningPlan": {"stage": "COLLSCAN"}},
+                        {
+                            "winningPlan": {
+                                "stage": "IXSCAN",
+                                "indexName": "price_1",
+                            }
+                        },
+                    ],
+                }
+            },
+            "executionStats": {
+                "executionStages": {
+                    "stage": "SHARD_MERGE",
+                    "shards": [
+                        {"totalDocsExamined": 4, "nReturned": 2},
+                        {"totalDocsExamined": 1, "nReturned": 1},
+                    ],
+                }
+            },
+        }
+        summary = summarize(explanation)
+        self.assertEqual(
+            ["SHARD_MERGE", "COLLSCAN", "IXSCAN"], summary["stages"]
+        )
+        self.assertEqual(5, summary["docs_examined"])
+        self.assertEqual(3, summary["returned"])
+
+
+class LambdaSourceTests(TestCase):
+    """
+    Unit tests for finding the source of lambda functions
+    """
+
+    def test_lambda_source(self):
+        limit = 10
+        low, high = (lambda s: s.price > 5), (lambda s: s.price > limit)
+        self.assertEqual("lambda s: s.price > 5", lambda_source(low))
+        self.assertEqual("lambda s: s.price > limit", lambda_source(high))
+        select = [lambda s: (s.item, s.price)][0]
+        self.assertEqual("lambda s: (s.item, s.price)", lambda_source(select))
+
+    def test_no_source(self):
+        func = eval("lambda s: s.price")
+        self.assertEqual(repr(func), lambda_source(func))
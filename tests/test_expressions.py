@@ -1,4 +1,5 @@
-from py_linq_mongo.expressions import LambdaExpression
+from py_linq_mongo.expressions import LambdaExpression, TranslationCache
+from py_linq_mongo.parameters import Parameter
 from unittest import TestCase
 import ast
 
@@ -80,7 +81,17 @@ class TestCollectionLambdaTranslator(TestCase):
             or x.first_name == u"Dustin"
         )
         self.assertEqual(
-            '{"$or": ["{\\"$and\\": [\\"{\\\\\\"gpa\\\\\\": {\\\\\\"$gt\\\\\\": 10}}\\", \\"{\\\\\\"first_name\\\\\\": {\\\\\\"$eq\\\\\\": \\\\\\"Bruce\\\\\\"}}\\"]}", "{\\"first_name\\": {\\"$eq\\": \\"Dustin\\"}}"]}',
+            {
+                "$or": [
+                    {
+                        "$and": [
+                            {"gpa": {"$gt": 10}},
+                            {"first_name": {"$eq": "Bruce"}},
+                        ]
+                    },
+                    {"first_name": {"$eq": "Dustin"}},
+                ]
+            },
             t.body.mongo,
         )
 
@@ -118,13 +129,13 @@ class TestCollectionLambdaTranslator(TestCase):
     def test_compare_simple(self):
         t = LambdaExpression.parse(lambda x: x.gpa <= 10)
         self.assertIsInstance(t.body.value, ast.Compare)
-        self.assertEqual('{"gpa": {"$lte": 10}}', t.body.value.mongo)
+        self.assertEqual({"gpa": {"$lte": 10}}, t.body.value.mongo)
 
     def test_boolop(self):
         t = LambdaExpression.parse(lambda x: x.gpa >= 10 and x.gpa <= 50)
         self.assertIsInstance(t.body.value, ast.BoolOp)
         self.assertEqual(
-            '{"$and": ["{\\"gpa\\": {\\"$gte\\": 10}}", "{\\"gpa\\": {\\"$lte\\": 50}}"]}',
+            {"$and": [{"gpa": {"$gte": 10}}, {"gpa": {"$lte": 50}}]},
             t.body.value.mongo,
         )
 
@@ -134,7 +145,13 @@ class TestCollectionLambdaTranslator(TestCase):
         )
         self.assertIsInstance(t.body.value, ast.BoolOp)
         self.assertEqual(
-            '{"$and": ["{\\"gpa\\": {\\"$gte\\": 10}}", "{\\"gpa\\": {\\"$lte\\": 50}}", "{\\"last_name\\": {\\"$eq\\": \\"Fenske\\"}}"]}',
+            {
+                "$and": [
+                    {"gpa": {"$gte": 10}},
+                    {"gpa": {"$lte": 50}},
+                    {"last_name": {"$eq": "Fenske"}},
+                ]
+            },
             t.body.mongo,
         )
 
@@ -144,7 +161,13 @@ class TestCollectionLambdaTranslator(TestCase):
         )
         self.assertIsInstance(t.body.value, ast.BoolOp)
         self.assertEqual(
-            '{"$or": ["{\\"gpa\\": {\\"$gte\\": 10}}", "{\\"gpa\\": {\\"$lte\\": 50}}", "{\\"last_name\\": {\\"$eq\\": \\"Fenske\\"}}"]}',
+            {
+                "$or": [
+                    {"gpa": {"$gte": 10}},
+                    {"gpa": {"$lte": 50}},
+                    {"last_name": {"$eq": "Fenske"}},
+                ]
+            },
             t.body.value.mongo,
         )
 
@@ -154,7 +177,12 @@ class TestCollectionLambdaTranslator(TestCase):
         )
         self.assertIsInstance(t.body.value, ast.BoolOp)
         self.assertEqual(
-            '{"$or": ["{\\"$and\\": [\\"{\\\\\\"gpa\\\\\\": {\\\\\\"$gte\\\\\\": 10}}\\", \\"{\\\\\\"gpa\\\\\\": {\\\\\\"$lte\\\\\\": 50}}\\"]}", "{\\"last_name\\": {\\"$eq\\": \\"Fenske\\"}}"]}',
+            {
+                "$or": [
+                    {"$and": [{"gpa": {"$gte": 10}}, {"gpa": {"$lte": 50}}]},
+                    {"last_name": {"$eq": "Fenske"}},
+                ]
+            },
             t.body.value.mongo,
         )
 
@@ -164,36 +192,72 @@ class TestCollectionLambdaTranslator(TestCase):
         )
         self.assertIsInstance(t.body.value, ast.BoolOp)
         self.assertEqual(
-            '{"$and": ["{\\"$or\\": [\\"{\\\\\\"gpa\\\\\\": {\\\\\\"$gte\\\\\\": 10}}\\", \\"{\\\\\\"gpa\\\\\\": {\\\\\\"$lte\\\\\\": 50}}\\"]}", "{\\"last_name\\": {\\"$eq\\": \\"Fenske\\"}}"]}',
+            {
+                "$and": [
+                    {"$or": [{"gpa": {"$gte": 10}}, {"gpa": {"$lte": 50}}]},
+                    {"last_name": {"$eq": "Fenske"}},
+                ]
+            },
             t.body.value.mongo,
         )
 
     def test_binop(self):
         t = LambdaExpression.parse(lambda x: x.gpa + 10)
         self.assertIsInstance(t.body.value, ast.BinOp)
-        self.assertEqual('{"$add": ["$gpa", 10]}', t.body.mongo)
+        self.assertEqual({"$add": ["$gpa", 10]}, t.body.mongo)
 
     def test_not(self):
         t = LambdaExpression.parse(lambda x: not x.gpa == 10)
         self.assertIsInstance(t.body.op, ast.Not)
-        self.assertEqual('{"gpa": {"$not": {"$eq": 10}}}', t.body.mongo)
+        self.assertEqual({"gpa": {"$not": {"$eq": 10}}}, t.body.mongo)
 
     def test_not_equals(self):
         t = LambdaExpression.parse(lambda x: x.gpa != 10)
         self.assertIsInstance(t.body.ops[0], ast.NotEq)
-        self.assertEqual('{"gpa": {"$ne": 10}}', t.body.mongo)
+        self.assertEqual({"gpa": {"$ne": 10}}, t.body.mongo)
 
     def test_unary(self):
         t = LambdaExpression.parse(lambda x: not x.gpa == 10)
-        self.assertEqual('{"gpa": {"$not": {"$eq": 10}}}', t.body.mongo)
+        self.assertEqual({"gpa": {"$not": {"$eq": 10}}}, t.body.mongo)
 
     def test_lambda(self):
         t = LambdaExpression.parse(lambda x: x.gpa >= 10 and x.gpa <= 50)
         self.assertEqual(
-            '{"$and": ["{\\"gpa\\": {\\"$gte\\": 10}}", "{\\"gpa\\": {\\"$lte\\": 50}}"]}',
+            {"$and": [{"gpa": {"$gte": 10}}, {"gpa": {"$lte": 50}}]},
             t.body.mongo,
         )
 
+    def test_in_list(self):
+        t = LambdaExpression.parse(lambda x: x.item in ["abc", "jkl"])
+        self.assertEqual({"item": {"$in": ["abc", "jkl"]}}, t.body.mongo)
+
+    def test_not_boolop(self):
+        t = LambdaExpression.parse(lambda x: not (x.gpa > 10 and x.gpa < 50))
+        self.assertEqual(
+            {"$nor": [{"$and": [{"gpa": {"$gt": 10}}, {"gpa": {"$lt": 50}}]}]},
+            t.body.mongo,
+        )
+
+    def test_free_variable(self):
+        threshold = 10
+        t = LambdaExpression.parse(lambda x: x.gpa > threshold)
+        self.assertEqual({"gpa": {"$gt": Parameter("threshold")}}, t.body.mongo)
+        self.assertEqual(("threshold",), t.body.parameters)
+
+        def f(x):
+            return x.gpa > threshold
+
+        self.assertEqual(
+            {"gpa": {"$gt": 10}},
+            LambdaExpression.bind(LambdaExpression.parse(f).body, f),
+        )
+
+    def test_global_attribute(self):
+        t = LambdaExpression.parse(lambda x: x.gpa > ast.PyCF_ONLY_AST)
+        self.assertEqual(
+            {"gpa": {"$gt": Parameter("ast.PyCF_ONLY_AST")}}, t.body.mongo
+        )
+
     def test_simple_select(self):
         t = LambdaExpression.parse(lambda x: x.first_name)
         self.assertEqual("first_name", t.body.mongo)
@@ -201,14 +265,26 @@ class TestCollectionLambdaTranslator(TestCase):
     def test_list_select(self):
         t = LambdaExpression.parse(lambda x: [x.first_name, x.last_name, x.gpa])
         self.assertEqual(
-            '{"$project": {"first_name": "$first_name", "last_name": "$last_name", "gpa": "$gpa"}}',
+            {
+                "$project": {
+                    "first_name": "$first_name",
+                    "last_name": "$last_name",
+                    "gpa": "$gpa",
+                }
+            },
             t.body.mongo,
         )
 
     def test_tuple_select(self):
         t = LambdaExpression.parse(lambda x: (x.first_name, x.last_name, x.gpa))
         self.assertEqual(
-            '{"$project": {"first_name": "$first_name", "last_name": "$last_name", "gpa": "$gpa"}}',
+            {
+                "$project": {
+                    "first_name": "$first_name",
+                    "last_name": "$last_name",
+                    "gpa": "$gpa",
+                }
+            },
             t.body.mongo,
         )
 
@@ -221,6 +297,81 @@ class TestCollectionLambdaTranslator(TestCase):
             }
         )
         self.assertEqual(
-            '{"$project": {"FirstName": "$first_name", "LastName": "$last_name", "GPA": "$gpa"}}',
+            {
+                "$project": {
+                    "FirstName": "$first_name",
+                    "LastName": "$last_name",
+                    "GPA": "$gpa",
+                }
+            },
             t.body.mongo,
         )
+
+
+class TestTranslationCache(TestCase):
+    """
+    Test the LRU cache of translated lambda expressions
+    """
+
+    def setUp(self):
+        self.cache = TranslationCache(maxsize=2)
+
+    def test_hit(self):
+        funcs = [lambda x: x.gpa > 10 for _ in range(3)]
+        trees = [
+            self.cache.get(f.__code__, LambdaExpression.translate)
+            for f in funcs
+        ]
+        self.assertIs(trees[0], trees[1])
+        self.assertIs(trees[0], trees[2])
+        info = self.cache.info()
+        self.assertEqual(2, info.hits)
+        self.assertEqual(1, info.misses)
+        self.assertEqual(1, info.currsize)
+
+    def test_distinct_constants(self):
+        t1 = self.cache.get(
+            (lambda x: x.gpa == 1).__code__, LambdaExpression.translate
+        )
+        t2 = self.cache.get(
+            (lambda x: x.gpa == 1.0).__code__, LambdaExpression.translate
+        )
+        self.assertIsNot(t1, t2)
+        self.assertEqual(2, self.cache.info().misses)
+
+    def test_eviction(self):
+        for f in [lambda x: x.a, lambda x: x.b, lambda x: x.c]:
+            self.cache.get(f.__code__, LambdaExpression.translate)
+        info = self.cache.info()
+        self.assertEqual(1, info.evictions)
+        self.assertEqual(2, info.currsize)
+
+    def test_resize(self):
+        for f in [lambda x: x.a, lambda x: x.b]:
+            self.cache.get(f.__code__, LambdaExpression.translate)
+        self.cache.resize(1)
+        self.assertEqual(1, len(self.cache))
+        self.assertEqual(1, self.cache.info().evictions)
+        self.assertRaises(ValueError, self.cache.resize, -1)
+
+    def test_disabled(self):
+        self.cache.resize(0)
+
+        def f(x):
+            return x.a
+
+        self.cache.get(f.__code__, LambdaExpression.translate)
+        self.cache.get(f.__code__, LambdaExpression.translate)
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual(2, self.cache.info().misses)
+
+    def test_clear(self):
+        self.cache.get((lambda x: x.a).__code__, LambdaExpression.translate)
+        self.cache.clear()
+        self.assertEqual((0, 0, 0, 2, 0), tuple(self.cache.info()))
+
+    def test_parse_uses_cache(self):
+        def f(x):
+            return x.first_name == "Bruce"
+
+        self.assertIs(LambdaExpression.parse(f), LambdaExpression.parse(f))
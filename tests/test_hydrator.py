@@ -0,0 +1,115 @@
+import datetime
+from unittest import TestCase
+import bson
+from bson.raw_bson import RawBSONDocument
+from py_linq_mongo.model import attributes
+from py_linq_mongo.model.hydrator import (
+    Hydrator,
+    decode_field,
+    model_attributes,
+)
+from . import SaleModel
+
+
+class DiscountedSaleModel(SaleModel):
+    discount = attributes.Integer("discount_pct")
+
+
+DOCUMENT = {
+    "_id": 1,
+    "item": "abc",
+    "price": 10,
+    "quantity": 2,
+    "date": datetime.datetime(2014, 1, 1),
+    "comment": "undeclared",
+}
+
+
+class TestHydrator(TestCase):
+    """
+    Test cases for the conversion of documents into model results
+    """
+
+    def test_model_attributes(self):
+        self.assertEqual(
+            ["id", "item", "price", "quantity", "date", "discount"],
+            list(model_attributes(DiscountedSaleModel)),
+        )
+
+    def test_object(self):
+        sale = Hydrator(SaleModel).hydrate(DOCUMENT)
+        self.assertEqual(1, sale.id)
+        self.assertEqual("abc", sale.item)
+        self.assertEqual(10, sale.price)
+        self.assertEqual("undeclared", sale.comment)
+        self.assertEqual(1, sale._id)
+        self.assertEqual("SaleModel", type(sale).__name__)
+        self.assertFalse(hasattr(sale, "__dict__"))
+        self.assertRaises(AttributeError, getattr, sale, "missing")
+
+    def test_object_missing_field(self):
+        sale = Hydrator(DiscountedSaleModel).hydrate({"item": "abc"})
+        self.assertEqual("abc", sale.item)
+        self.assertIsNone(sale.discount)
+
+    def test_tuple(self):
+        sale = Hydrator(SaleModel, "tuple").hydrate(DOCUMENT)
+        self.assertEqual(
+            (1, "abc", 10, 2, datetime.datetime(2014, 1, 1)), tuple(sale)
+        )
+        self.assertEqual(10, sale.price)
+
+    def test_dict(self):
+        self.assertIs(DOCUMENT, Hydrator(SaleModel, "dict")(DOCUMENT))
+
+    def test_invalid_mode(self):
+        self.assertRaises(ValueError, Hydrator, SaleModel, "xml")
+
+    def test_for_model(self):
+        self.assertIs(
+            Hydrator.for_model(SaleModel), Hydrator.for_model(SaleModel)
+        )
+        self.assertIsNot(
+            Hydrator.for_model(SaleModel),
+            Hydrator.for_model(SaleModel, "tuple"),
+        )
+
+    def test_lazy(self):
+        raw = RawBSONDocument(bson.encode(DOCUMENT))
+        sale = Hydrator(DiscountedSaleModel, "lazy").hydrate(raw)
+        self.assertEqual({}, sale._values)
+        self.assertEqual(10, sale.price)
+        self.assertEqual({"price": 10}, sale._values)
+        self.assertEqual(1, sale.id)
+        self.assertEqual("undeclared", sale.comment)
+        self.assertIsNone(sale.discount)
+        self.assertRaises(AttributeError, getattr, sale, "missing")
+        self.assertEqual(
+            {"price": 10, "_id": 1, "comment": "undeclared"}, sale._values
+        )
+
+    def test_lazy_decoded_document(self):
+        sale = Hydrator(SaleModel, "lazy").hydrate(DOCUMENT)
+        self.assertEqual("abc", sale.item)
+        self.assertEqual(1, sale.id)
+
+    def test_decode_field(self):
+        document = {
+            "f": 1.5,
+            "s": "héllo",
+            "d": {"x": [1, 2]},
+            "b": bson.Binary(b"xy", 5),
+            "o": bson.ObjectId(),
+            "t": True,
+            "n": None,
+            "r": bson.Regex("a.*", "i"),
+            "c": bson.Code("x", {"a": 1}),
+            "ts": bson.Timestamp(1, 2),
+            "l": bson.Int64(5),
+            "m": bson.MaxKey(),
+            "last": "end",
+        }
+        raw = bson.encode(document)
+        for key, value in document.items():
+            self.assertEqual(value, decode_field(raw, key))
+        self.assertRaises(KeyError, decode_field, raw, "missing")
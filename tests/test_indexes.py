@@ -0,0 +1,122 @@
+from unittest import TestCase
+import pymongo
+from py_linq_mongo.model import attributes
+from py_linq_mongo.model.indexes import Index, missing_indexes, model_indexes
+from . import IndexedSaleModel, SaleModel
+
+
+class IndexTests(TestCase):
+    """
+    Unit tests for the Index class
+    """
+
+    def test_name(self):
+        self.assertEqual("item_1_date_-1", Index("item", ("date", -1)).name)
+        self.assertEqual("by_item", Index("item", name="by_item").name)
+        self.assertEqual("geo_2dsphere", Index(("geo", "2dsphere")).name)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, Index)
+        self.assertRaises(
+            ValueError, Index, "item", "date", expire_after_seconds=60
+        )
+
+    def test_options(self):
+        self.assertEqual({}, Index("item").options)
+        self.assertEqual(
+            {"unique": True, "sparse": True, "expireAfterSeconds": 0},
+            Index(
+                "date", unique=True, sparse=True, expire_after_seconds=0
+            ).options,
+        )
+        minimum = 5
+        index = Index("item", partial_filter=lambda s: s.quantity > minimum)
+        self.assertEqual(
+            {"partialFilterExpression": {"quantity": {"$gt": 5}}},
+            index.options,
+        )
+
+    def test_model(self):
+        model = Index("item", name="by_item", unique=True).model()
+        self.assertIsInstance(model, pymongo.IndexModel)
+        self.assertEqual(
+            {
+                "key": {"item": 1},
+                "name": "by_item",
+                "unique": True,
+                "background": True,
+            },
+            dict(model.document),
+        )
+
+    def test_matches(self):
+        index = Index("item", partial_filter={"price": {"$gt": 5}})
+        document = {"key": {"item": 1}, "name": "item_1", "v": 2}
+        self.assertFalse(index.matches(document))
+        document["partialFilterExpression"] = {"price": {"$gt": 5}}
+        self.assertTrue(index.matches(document))
+        document["unique"] = False
+        self.assertTrue(index.matches(document))
+        self.assertFalse(Index(("item", -1)).matches(document))
+
+
+class ModelIndexesTests(TestCase):
+    """
+    Unit tests for finding the indexes declared on models
+    """
+
+    def test_attributes(self):
+        attribute = attributes.String("email", unique=True)
+        self.assertEqual(1, attribute.index)
+        self.assertIsNone(attributes.String("email").index)
+        # documents expire at the date they hold
+        expires = attributes.DateTime("expires", expire_after_seconds=0)
+        self.assertEqual(1, expires.index)
+
+        class Model(object):
+            expires_at = expires
+
+        self.assertEqual(
+            [Index("expires", expire_after_seconds=0)], model_indexes(Model)
+        )
+
+    def test_model_indexes(self):
+        self.assertEqual([], model_indexes(SaleModel))
+        self.assertEqual(
+            [
+                Index(("price", -1)),
+                Index("date", expire_after_seconds=3600),
+                Index("item", ("date", -1)),
+                Index("quantity"),
+            ],
+            model_indexes(IndexedSaleModel),
+        )
+
+    def test_attribute_names(self):
+        class Model(object):
+            __indexes__ = [Index("id", "code")]
+
+            id = attributes.ObjectId()
+            code = attributes.String("c")
+
+        self.assertEqual([("_id", 1), ("c", 1)], model_indexes(Model)[0].keys)
+
+    def test_missing_indexes(self):
+        existing = [
+            {"key": {"_id": 1}, "name": "_id_", "v": 2},
+            {"key": {"price": -1}, "name": "by_price", "v": 2},
+            {"key": {"quantity": 1}, "name": "quantity_1", "v": 2},
+        ]
+        self.assertEqual(
+            ["date_1", "item_1_date_-1"],
+            [i.name for i in missing_indexes(IndexedSaleModel, existing)],
+        )
+
+    def test_conflicts(self):
+        existing = [
+            {"key": {"date": 1}, "name": "date_1", "v": 2},
+            {"key": {"quantity": -1}, "name": "quantity_1", "v": 2},
+        ]
+        with self.assertRaises(ValueError) as context:
+            missing_indexes(IndexedSaleModel, existing)
+        self.assertIn("date_1, quantity_1", str(context.exception))
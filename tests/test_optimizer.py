@@ -0,0 +1,185 @@
+from unittest import TestCase
+from py_linq_mongo.query.optimizer import (
+    PipelineOptimizer,
+    drop_redundant_project,
+    fold_skip_limit,
+    limit_before_project,
+    match_before_project,
+    match_before_sort,
+    merge_matches,
+    pairwise,
+)
+
+
+class TestOptimizerRules(TestCase):
+    """
+    Test cases for the pipeline rewrite rules
+    """
+
+    def test_merge_matches(self):
+        pipeline = [
+            {"$match": {"a": {"$eq": 1}}},
+            {"$match": {"$and": [{"b": {"$eq": 2}}, {"c": {"$eq": 3}}]}},
+        ]
+        self.assertEqual(
+            [
+                {
+                    "$match": {
+                        "$and": [
+                            {"a": {"$eq": 1}},
+                            {"b": {"$eq": 2}},
+                            {"c": {"$eq": 3}},
+                        ]
+                    }
+                }
+            ],
+            merge_matches(pipeline),
+        )
+        self.assertEqual(2, len(pipeline))
+
+    def test_merge_empty_match(self):
+        self.assertEqual(
+            [{"$match": {"a": 1}}],
+            merge_matches([{"$match": {}}, {"$match": {"a": 1}}]),
+        )
+
+    def test_unchanged_pipeline_is_returned(self):
+        pipeline = [{"$match": {"a": 1}}, {"$limit": 1}]
+        self.assertIs(pipeline, merge_matches(pipeline))
+
+    def test_match_before_sort(self):
+        self.assertEqual(
+            [{"$match": {"a": 1}}, {"$sort": {"b": 1}}],
+            match_before_sort([{"$sort": {"b": 1}}, {"$match": {"a": 1}}]),
+        )
+
+    def test_match_before_project(self):
+        pipeline = [
+            {"$project": {"_id": 0, "name": "$name", "gpa": 1}},
+            {"$match": {"$or": [{"name": "Bruce"}, {"gpa": {"$gt": 3}}]}},
+        ]
+        self.assertEqual(
+            [pipeline[1], pipeline[0]], match_before_project(pipeline)
+        )
+
+    def test_match_stays_after_computed_field(self):
+        pipeline = [
+            {"$project": {"name": "$first_name"}},
+            {"$match": {"name": "Bruce"}},
+        ]
+        self.assertIs(pipeline, match_before_project(pipeline))
+        pipeline = [
+            {"$project": {"_id": 0, "name": 1}},
+            {"$match": {"_id": 1}},
+        ]
+        self.assertIs(pipeline, match_before_project(pipeline))
+        pipeline = [
+            {"$project": {"name": 1}},
+            {"$match": {"$expr": {"$eq": ["$name", "$other"]}}},
+        ]
+        self.assertIs(pipeline, match_before_project(pipeline))
+
+    def test_match_before_exclusion_project(self):
+        pipeline = [{"$project": {"secret": 0}}, {"$match": {"name": 1}}]
+        self.assertEqual(
+            [pipeline[1], pipeline[0]], match_before_project(pipeline)
+        )
+        pipeline = [{"$project": {"secret": 0}}, {"$match": {"secret": 1}}]
+        self.assertIs(pipeline, match_before_project(pipeline))
+
+    def test_fold_skip_limit(self):
+        self.assertEqual(
+            [{"$skip": 3}, {"$limit": 2}],
+            fold_skip_limit(
+                [{"$skip": 1}, {"$skip": 2}, {"$limit": 5}, {"$limit": 2}]
+            ),
+        )
+        self.assertEqual(
+            [{"$skip": 2}, {"$limit": 3}],
+            fold_skip_limit([{"$limit": 5}, {"$skip": 2}]),
+        )
+        pipeline = [{"$limit": 2}, {"$skip": 2}]
+        self.assertIs(pipeline, fold_skip_limit(pipeline))
+
+    def test_limit_before_project(self):
+        self.assertEqual(
+            [{"$sort": {"a": 1}}, {"$limit": 5}, {"$project": {"a": 1}}],
+            limit_before_project(
+                [{"$sort": {"a": 1}}, {"$project": {"a": 1}}, {"$limit": 5}]
+            ),
+        )
+
+    def test_drop_project_before_count(self):
+        self.assertEqual(
+            [{"$count": "total"}],
+            drop_redundant_project(
+                [{"$project": {"a": 1}}, {"$count": "total"}]
+            ),
+        )
+
+    def test_merge_projects(self):
+        self.assertEqual(
+            [{"$project": {"a": "$first", "_id": 0}}],
+            drop_redundant_project(
+                [
+                    {"$project": {"a": "$first", "b": 1}},
+                    {"$project": {"a": 1, "_id": 0}},
+                ]
+            ),
+        )
+        pipeline = [
+            {"$project": {"a": 1}},
+            {"$project": {"c": {"$add": ["$a", 1]}}},
+        ]
+        self.assertIs(pipeline, drop_redundant_project(pipeline))
+
+
+class TestPipelineOptimizer(TestCase):
+    """
+    Test cases for the PipelineOptimizer class
+    """
+
+    def test_optimize(self):
+        pipeline = [
+            {"$match": {"a": 1}},
+            {"$sort": {"b": 1}},
+            {"$match": {"c": 1}},
+            {"$project": {"b": 1}},
+            {"$skip": 1},
+            {"$limit": 10},
+            {"$limit": 3},
+        ]
+        self.assertEqual(
+            [
+                {"$match": {"$and": [{"a": 1}, {"c": 1}]}},
+                {"$sort": {"b": 1}},
+                {"$skip": 1},
+                {"$limit": 3},
+                {"$project": {"b": 1}},
+            ],
+            PipelineOptimizer().optimize(pipeline),
+        )
+
+    def test_no_rules(self):
+        pipeline = [{"$match": {"a": 1}}, {"$match": {"b": 1}}]
+        self.assertIs(pipeline, PipelineOptimizer(rules=()).optimize(pipeline))
+
+    def test_register(self):
+        optimizer = PipelineOptimizer(rules=())
+
+        @optimizer.register
+        @pairwise
+        def drop_double_sort(first, second):
+            if "$sort" in first and "$sort" in second:
+                return [second]
+            return None
+
+        self.assertEqual(
+            [{"$sort": {"b": 1}}],
+            optimizer.optimize([{"$sort": {"a": 1}}, {"$sort": {"b": 1}}]),
+        )
+        optimizer.unregister(drop_double_sort)
+        self.assertEqual([], optimizer.rules)
+
+    def test_max_passes(self):
+        self.assertRaises(ValueError, PipelineOptimizer, max_passes=0)
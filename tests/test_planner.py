@@ -0,0 +1,66 @@
+from unittest import TestCase
+from py_linq_mongo.query.planner import FindPlan, plan
+
+
+class TestPlanner(TestCase):
+    """
+    Test cases for routing pipelines to find()
+    """
+
+    def test_empty(self):
+        self.assertEqual(FindPlan(), plan([]))
+
+    def test_find(self):
+        self.assertEqual(
+            FindPlan(
+                filter={"a": {"$gt": 1}},
+                projection={"_id": 0, "a": 1, "b": 1},
+                sort=[("a", -1), ("b", 1)],
+                skip=5,
+                limit=10,
+            ),
+            plan(
+                [
+                    {"$match": {"a": {"$gt": 1}}},
+                    {"$sort": {"a": -1, "b": 1}},
+                    {"$skip": 5},
+                    {"$limit": 10},
+                    {"$project": {"_id": 0, "a": "$a", "b": 1}},
+                ]
+            ),
+        )
+
+    def test_stage_order(self):
+        self.assertIsNone(plan([{"$limit": 1}, {"$skip": 1}]))
+        self.assertIsNone(plan([{"$project": {"a": 1}}, {"$sort": {"a": 1}}]))
+        self.assertIsNone(plan([{"$match": {}}, {"$match": {}}]))
+
+    def test_aggregation_stages(self):
+        self.assertIsNone(plan([{"$group": {"_id": "$a"}}]))
+        self.assertIsNone(plan([{"$count": "total"}]))
+        self.assertIsNone(plan([{"$project": {"b": "$a"}}]))
+        self.assertIsNone(plan([{"$project": {"a.b": 1}}]))
+        self.assertIsNone(plan([{"$limit": 0}]))
+
+    def test_command(self):
+        self.assertEqual(
+            {"find": "sales", "filter": {}}, plan([]).command("sales")
+        )
+        find = plan(
+            [
+                {"$match": {"a": 1}},
+                {"$sort": {"a": -1, "b": 1}},
+                {"$limit": 10},
+                {"$project": {"_id": 0, "a": 1}},
+            ]
+        )
+        self.assertEqual(
+            {
+                "find": "sales",
+                "filter": {"a": 1},
+                "projection": {"_id": 0, "a": 1},
+                "sort": {"a": -1, "b": 1},
+                "limit": 10,
+            },
+            find.command("sales"),
+        )
@@ -1,8 +1,19 @@
-from unittest import TestCase
+import gc
+from unittest import TestCase, mock
 import mongomock
+import pymongo
 from py_linq_mongo.query import Queryable
+from py_linq_mongo.clients import clients
+from py_linq_mongo.model.indexes import Index
 from py_linq_mongo.provider import MongoProvider
-from . import LeagueModel, EmptyCollectionNameModel, InvalidAttributeModel
+from . import (
+    LeagueModel,
+    EmptyCollectionNameModel,
+    IndexedSaleModel,
+    InvalidAttributeModel,
+    SaleModel,
+)
+from .data import MongoData
 
 
 class MongoProviderTests(TestCase):
@@ -14,6 +25,7 @@ class MongoProviderTests(TestCase):
         self.provider = MongoProvider(
             mongomock.MongoClient(), db_name="whl-data"
         )
+        MongoData(self.provider.database).seed_data()
 
     def test_invalid_models(self):
         self.assertRaises(
@@ -40,3 +52,226 @@ class MongoProviderTests(TestCase):
         query = self.provider.query(LeagueModel)
         self.assertIsInstance(query, Queryable)
         self.assertEqual(LeagueModel, query.model)
+
+    def test_open_cursors(self):
+        query = self.provider.query(SaleModel).where(lambda s: s.price > 5)
+        self.assertEqual(0, self.provider.open_cursors)
+
+        results = iter(query)
+        next(results)
+        self.assertEqual(1, self.provider.open_cursors)
+        results.close()
+        self.assertEqual(0, self.provider.open_cursors)
+
+        for _ in query.select(lambda s: (s.item, s.price)):
+            self.assertEqual(1, self.provider.open_cursors)
+            break
+        gc.collect()
+        self.assertEqual(0, self.provider.open_cursors)
+
+        with self.assertRaises(ValueError):
+            for _ in query:
+                raise ValueError()
+        gc.collect()
+        self.assertEqual(0, self.provider.open_cursors)
+
+        self.assertEqual(3, len(query.to_list()))
+        self.assertEqual(0, self.provider.open_cursors)
+
+    def test_open_cursors_next(self):
+        query = self.provider.query(SaleModel).order_by(lambda s: s.price)
+        with query:
+            self.assertEqual(5, query.next().price)
+            self.assertEqual(1, self.provider.open_cursors)
+        self.assertEqual(0, self.provider.open_cursors)
+
+        for _ in range(5):
+            query.next()
+        self.assertRaises(StopIteration, query.next)
+        self.assertEqual(0, self.provider.open_cursors)
+        query.close()
+
+        query.next()
+        del query
+        gc.collect()
+        self.assertEqual(0, self.provider.open_cursors)
+
+    def test_open_cursors_any(self):
+        query = self.provider.query(SaleModel)
+        registry = self.provider._cursors
+        with mock.patch.object(
+            registry, "add", wraps=registry.add
+        ) as add, mock.patch.object(
+            registry, "discard", wraps=registry.discard
+        ) as discard:
+            self.assertTrue(query.any(lambda s: s.price > 5))
+            self.assertFalse(query.all(lambda s: s.price > 5))
+        self.assertEqual(2, add.call_count)
+        self.assertEqual(add.call_args_list, discard.call_args_list)
+        self.assertEqual(0, self.provider.open_cursors)
+
+    def test_connect(self):
+        self.addCleanup(clients.clear)
+        first = MongoProvider.connect(
+            "mongodb://localhost:27017",
+            "whl-data",
+            max_pool_size=5,
+            wait_queue_timeout_ms=100,
+            compressors="zlib",
+            connect=False,
+        )
+        self.assertIsInstance(first, MongoProvider)
+        options = first.connection.options.pool_options
+        self.assertEqual(5, options.max_pool_size)
+        self.assertEqual(0.1, options.wait_queue_timeout)
+
+        second = MongoProvider.connect(
+            "mongodb://localhost:27017",
+            "other",
+            max_pool_size=5,
+            wait_queue_timeout_ms=100,
+            compressors="zlib",
+            connect=False,
+        )
+        self.assertIs(first.connection, second.connection)
+        self.assertEqual("other", second.database.name)
+        other = MongoProvider.connect(
+            "mongodb://localhost:27017", "whl-data", connect=False
+        )
+        self.assertIsNot(first.connection, other.connection)
+        with mock.patch.object(
+            pymongo, "MongoClient", wraps=pymongo.MongoClient
+        ) as client:
+            unshared = MongoProvider.connect(
+                "mongodb://localhost:27017",
+                "whl-data",
+                compressors="zlib",
+                shared=False,
+                connect=False,
+            )
+        self.addCleanup(unshared.connection.close)
+        self.assertEqual("zlib", client.call_args[1]["compressors"])
+        self.assertEqual(100, client.call_args[1]["maxPoolSize"])
+        self.assertIsNot(other.connection, unshared.connection)
+        self.assertEqual(2, len(clients))
+
+    def test_connect_returns_provider(self):
+        self.addCleanup(clients.clear)
+        provider = MongoProvider.connect(
+            "mongodb://localhost:27017", "whl-data", connect=False
+        )
+        self.assertIsInstance(provider, MongoProvider)
+        self.assertEqual("whl-data", provider.database.name)
+        self.assertEqual(1, len(clients))
+
+    def test_pool_statistics(self):
+        self.addCleanup(clients.clear)
+        self.assertIsNone(self.provider.pool_statistics)
+        provider = MongoProvider.connect(
+            "mongodb://localhost:27017", "whl-data", connect=False
+        )
+        self.assertEqual(0, provider.pool_statistics["open"])
+        listener = provider._pool_statistics
+        listener.connection_created(None)
+        listener.connection_created(None)
+        listener.connection_checked_out(None)
+        listener.connection_closed(None)
+        statistics = provider.pool_statistics
+        self.assertEqual(2, statistics["created"])
+        self.assertEqual(1, statistics["open"])
+        self.assertEqual(1, statistics["in_use"])
+
+    def test_cache(self):
+        self.assertIsNone(self.provider.cache)
+        cache = self.provider.enable_cache()
+        query = self.provider.query(SaleModel).where(lambda s: s.price > 5)
+        collection = query.collection
+        find = mock.patch.object(collection, "find", wraps=collection.find)
+        aggregate = mock.patch.object(
+            collection, "aggregate", wraps=collection.aggregate
+        )
+        count = mock.patch.object(
+            collection, "count_documents", wraps=collection.count_documents
+        )
+        with find as find, aggregate as aggregate, count as count:
+            for _ in range(3):
+                self.assertEqual(
+                    ["abc", "jkl", "abc"], [s.item for s in query.to_list()]
+                )
+                self.assertEqual(3, query.count())
+                self.assertEqual(20, query.max(lambda s: s.price))
+                self.assertEqual(
+                    {"total": 13},
+                    query.aggregates(total=("sum", lambda s: s.quantity)),
+                )
+                self.assertEqual(
+                    "jkl",
+                    self.provider.query(SaleModel)
+                    .first(lambda s: s.price > 10)
+                    .item,
+                )
+        # mongomock also calls find() without arguments to run aggregate()
+        self.assertEqual(2, len([c for c in find.call_args_list if c[0]]))
+        self.assertEqual(2, aggregate.call_count)
+        self.assertEqual(1, count.call_count)
+        self.assertEqual(10, cache.statistics["hits"])
+        self.assertEqual(5, cache.statistics["misses"])
+
+    def test_cache_ttl(self):
+        class UncachedModel(SaleModel):
+            __cache_ttl__ = 0
+
+        cache = self.provider.enable_cache()
+        self.assertEqual(5, len(self.provider.query(UncachedModel).to_list()))
+        self.assertEqual(0, cache.statistics["entries"])
+        self.assertEqual(5, len(self.provider.query(SaleModel).to_list()))
+        self.assertEqual(1, cache.statistics["entries"])
+
+    def test_ensure_indexes(self):
+        collection = self.provider.database["sales"]
+        collection.create_index("quantity")
+        created = self.provider.ensure_indexes([IndexedSaleModel, LeagueModel])
+        self.assertEqual(
+            {"sales": ["price_-1", "date_1", "item_1_date_-1"], "team": []},
+            created,
+        )
+        indexes = {i["name"]: i for i in collection.list_indexes()}
+        self.assertEqual({"date": 1}, dict(indexes["date_1"]["key"]))
+        self.assertEqual(3600, indexes["date_1"]["expireAfterSeconds"])
+        self.assertEqual(
+            {"sales": []}, self.provider.ensure_indexes([IndexedSaleModel])
+        )
+
+    def test_ensure_indexes_conflict(self):
+        self.provider.database["sales"].create_index("date")
+        with mock.patch.object(
+            mongomock.Collection, "create_indexes"
+        ) as create_indexes:
+            self.assertRaises(
+                ValueError,
+                self.provider.ensure_indexes,
+                [LeagueModel, IndexedSaleModel],
+            )
+        create_indexes.assert_not_called()
+        self.assertRaises(
+            AttributeError,
+            self.provider.ensure_indexes,
+            [InvalidAttributeModel],
+        )
+
+    def test_advisor(self):
+        self.assertIsNone(self.provider.advisor)
+        advisor = self.provider.enable_advisor()
+        query = self.provider.query(SaleModel)
+        list(query.where(lambda s: s.item == "abc").order_by(lambda s: s.date))
+        query = self.provider.query(SaleModel).where(lambda s: s.price > 5)
+        self.assertEqual(3, query.count())
+        self.assertEqual(20, query.max(lambda s: s.price))
+        self.assertTrue(query.any())
+        list(self.provider.query(SaleModel).parallel(2))
+        report = advisor.report()
+        self.assertEqual(
+            [Index("price"), Index("item", "date")],
+            [row["index"] for row in report],
+        )
+        self.assertEqual([3, 1], [row["count"] for row in report])
@@ -1,7 +1,15 @@
-from unittest import TestCase
+from unittest import TestCase, mock, skipIf
 import mongomock
 from py_linq_mongo.query import Queryable
+from py_linq_mongo.expressions import LambdaExpression
 import datetime
+import threading
+import bson
+from bson.raw_bson import RawBSONDocument
+from pymongo.collation import Collation
+from py_linq_mongo.model.indexes import Index
+from py_linq_mongo.query.cache import ResultCache
+from py_linq_mongo.query.cursors import CursorRegistry, PrefetchingCursor
 from . import (
     SaleModel,
     LeagueModel,
@@ -14,9 +22,82 @@ from py_linq import (
 from py_linq.py_linq import Grouping
 from .data import MongoData
 from py_linq_mongo.query import (
+    AccumulatorSelectQueryable,
     GroupedQueryable,
 )
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+CUTOFF = datetime.datetime(2014, 2, 1)
+
+
+class OptionsCollection(object):
+    """
+    Wraps a mongomock collection, which rejects some execution options, to
+    record the options given to each of its methods
+    """
+
+    options = (
+        "hint",
+        "max_time_ms",
+        "maxTimeMS",
+        "allow_disk_use",
+        "allowDiskUse",
+        "collation",
+        "comment",
+    )
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+        if not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            options = {k: v for k, v in kwargs.items() if k in self.options}
+            self.calls.append((name, options))
+            for key in options:
+                del kwargs[key]
+            return method(*args, **kwargs)
+
+        return call
+
+
+class RawCollection(object):
+    """
+    Wraps a mongomock collection, which does not support RawBSONDocument codec
+    options, to return raw BSON documents as pymongo does
+    """
+
+    def __init__(self, collection, raw=False):
+        self.collection = collection
+        self.raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def with_options(self, codec_options=None, **kwargs):
+        raw = codec_options.document_class is RawBSONDocument
+        return RawCollection(self.collection, raw)
+
+    def find(self, *args, **kwargs):
+        return self._cursor(self.collection.find(*args, **kwargs))
+
+    def aggregate(self, *args, **kwargs):
+        return self._cursor(self.collection.aggregate(*args, **kwargs))
+
+    def _cursor(self, cursor):
+        if not self.raw:
+            return cursor
+        return (RawBSONDocument(bson.encode(d)) for d in cursor)
+
 
 class QueryableTests(TestCase):
     """
@@ -39,6 +120,127 @@ class QueryableTests(TestCase):
         query = Queryable(self.collection, LeagueModel)
         self.assertEqual(1, query.count())
 
+    def test_count_unfiltered(self):
+        query = Queryable(self.sales_collection, SaleModel)
+        with mock.patch.object(
+            self.sales_collection,
+            "estimated_document_count",
+            wraps=self.sales_collection.estimated_document_count,
+        ) as estimated:
+            self.assertEqual(5, query.count())
+        estimated.assert_called_once_with()
+
+    def test_count_filtered(self):
+        self.sales_collection.create_index("price")
+        query = (
+            Queryable(self.sales_collection, SaleModel)
+            .where(lambda s: s.price > 5)
+            .skip(1)
+        )
+        with mock.patch.object(
+            self.sales_collection,
+            "count_documents",
+            wraps=self.sales_collection.count_documents,
+        ) as count_documents:
+            self.assertEqual(2, query.count(hint="price_1"))
+        count_documents.assert_called_once_with(
+            {"price": {"$gt": 5}}, skip=1, hint="price_1"
+        )
+
+    def test_explain_find(self):
+        explanation = {
+            "queryPlanner": {
+                "winningPlan": {
+                    "stage": "FETCH",
+                    "inputStage": {"stage": "IXSCAN", "indexName": "price_1"},
+                }
+            },
+            "executionStats": {"nReturned": 3, "totalDocsExamined": 3},
+        }
+        query = (
+            Queryable(self.sales_collection, SaleModel)
+            .where(lambda s: s.price > 5)
+            .order_by(lambda s: s.date)
+            .then_by_descending(lambda s: s.item)
+        )
+        with mock.patch.object(
+            self.db, "command", return_value=explanation
+        ) as command:
+            result = query.explain()
+        command.assert_called_once_with(
+            {
+                "explain": {
+                    "find": "sales",
+                    "filter": {"price": {"$gt": 5}},
+                    "projection": mock.ANY,
+                    "sort": {"date": 1, "item": -1},
+                },
+                "verbosity": "executionStats",
+            }
+        )
+        self.assertEqual("find", result["command"])
+        self.assertEqual(["FETCH", "IXSCAN"], result["stages"])
+        self.assertEqual(["price_1"], result["indexes"])
+        self.assertFalse(result["collection_scan"])
+        self.assertEqual(3, result["docs_examined"])
+        self.assertEqual(
+            [
+                "lambda s: s.price > 5",
+                "lambda s: s.date",
+                "lambda s: s.item",
+            ],
+            result["lambdas"],
+        )
+        self.assertIs(explanation, result["explain"])
+
+    def test_explain_aggregate(self):
+        query = (
+            Queryable(self.sales_collection, SaleModel)
+            .where(lambda s: s.price > 5)
+            .group_by(lambda s: s.item)
+        )
+        with mock.patch.object(self.db, "command", return_value={}) as command:
+            result = query.explain("queryPlanner")
+        arguments = command.call_args[0][0]
+        self.assertEqual("queryPlanner", arguments["verbosity"])
+        self.assertEqual("sales", arguments["explain"]["aggregate"])
+        self.assertEqual(result["pipeline"], arguments["explain"]["pipeline"])
+        self.assertIn("$group", result["pipeline"][-1])
+        self.assertEqual("aggregate", result["command"])
+        self.assertEqual(2, len(result["lambdas"]))
+        self.assertIsNone(result["returned"])
+
+    def test_count_does_not_mutate(self):
+        query = Queryable(self.sales_collection, SaleModel).where(
+            lambda s: s.item == "abc"
+        )
+        self.assertEqual(2, query.count())
+        self.assertEqual(2, query.count())
+        self.assertEqual(2, len(query.to_list()))
+
+    def test_count_empty(self):
+        query = Queryable(self.sales_collection, SaleModel).where(
+            lambda s: s.price > 100
+        )
+        self.assertEqual(0, query.count())
+        self.assertEqual(0, query.group_by(lambda s: s.item).count())
+
+    def test_count_groups(self):
+        query = Queryable(self.sales_collection, SaleModel).group_by(
+            lambda s: s.item
+        )
+        self.assertEqual(3, query.count())
+
+    def test_count_approximate(self):
+        query = Queryable(self.sales_collection, SaleModel).where(
+            lambda s: s.item == "xyz"
+        )
+        self.assertEqual(2, query.count(approximate=True))
+        estimate = query.count(approximate=True, sample_size=2)
+        self.assertTrue(0 <= estimate <= 5)
+        self.assertEqual(1, query.take(1).count(approximate=True))
+        self.assertRaises(ValueError, query.count, True, None, 0)
+
     def test_iterable(self):
         query = Queryable(
             self.client["whl-data"][LeagueModel.__collection_name__],
@@ -72,6 +274,303 @@ class QueryableTests(TestCase):
         self.assertEqual("Western Hockey League", result[0][0])
         self.assertEqual("WHL", result[0][1])
 
+    def test_select_tuple_order(self):
+        query = Queryable(self.collection, LeagueModel).select(
+            lambda x: (x.short_name, x.name), include_id=True
+        )
+        result = query.next()
+        self.assertEqual(3, len(result))
+        self.assertEqual(("WHL", "Western Hockey League"), result[1:])
+
+    def test_next(self):
+        query = Queryable(self.sales_collection, SaleModel).order_by(
+            lambda s: s.date
+        )
+        with mock.patch.object(
+            self.sales_collection, "find", wraps=self.sales_collection.find
+        ) as find:
+            items = [query.next().item for _ in range(5)]
+            self.assertRaises(StopIteration, query.next)
+        self.assertEqual(["abc", "jkl", "xyz", "abc", "xyz"], items)
+        self.assertEqual(1, find.call_count)
+
+        query.close()
+        self.assertEqual("abc", next(query).item)
+
+    def test_next_select(self):
+        query = Queryable(self.sales_collection, SaleModel).order_by(
+            lambda s: s.date
+        )
+        with query.select(lambda s: (s.item, s.price)) as select:
+            self.assertEqual(("abc", 10), select.next())
+            self.assertEqual(("jkl", 20), select.next())
+            close = mock.patch.object(select._cursor, "close").start()
+            self.addCleanup(mock.patch.stopall)
+        close.assert_called_once_with()
+        self.assertIsNone(select._cursor)
+
+        select = query.select(lambda s: {"name": s.item, "qty": s.quantity})
+        self.assertEqual({"name": "abc", "qty": 2}, next(select))
+        self.assertEqual({"name": "jkl", "qty": 1}, next(select))
+
+    def test_batch_size(self):
+        query = Queryable(self.sales_collection, SaleModel).batch_size(2)
+        with mock.patch.object(
+            self.sales_collection, "find", wraps=self.sales_collection.find
+        ) as find:
+            self.assertEqual(5, len(list(query.where(lambda s: s.price > 0))))
+        self.assertEqual(2, find.call_args[1]["batch_size"])
+        with mock.patch.object(
+            self.sales_collection,
+            "aggregate",
+            wraps=self.sales_collection.aggregate,
+        ) as aggregate:
+            list(query.group_by(lambda s: s.item))
+        self.assertEqual(2, aggregate.call_args[1]["batchSize"])
+        with mock.patch.object(
+            self.sales_collection, "find", wraps=self.sales_collection.find
+        ) as find:
+            list(query.select(lambda s: (s.item, s.price)))
+        self.assertEqual(2, find.call_args[1]["batch_size"])
+        self.assertRaises(ValueError, query.batch_size, 0)
+
+    def test_option_clones(self):
+        query = Queryable(self.sales_collection, SaleModel)
+        where = query.where(lambda s: s.price > 1)
+        ordered = query.order_by(lambda s: s.price)
+        options = [
+            lambda q: q.batch_size(10),
+            lambda q: q.raw(),
+            lambda q: q.all_fields(),
+            lambda q: q.prefetch(2),
+            lambda q: q.parallel(2),
+            lambda q: q.with_hint([("price", 1)]),
+            lambda q: q.comment("clone"),
+        ]
+        for option in options:
+            option(where).where(lambda s: s.quantity > 5)
+            self.assertEqual(
+                [{"$match": {"price": {"$gt": 1}}}], where.pipeline
+            )
+            option(ordered).then_by(lambda s: s.item)
+            self.assertEqual([{"$sort": {"price": 1}}], ordered.pipeline)
+
+    def test_execution_options(self):
+        collection = OptionsCollection(self.sales_collection)
+        query = (
+            Queryable(collection, SaleModel)
+            .with_hint("price_1")
+            .max_time(100)
+            .allow_disk_use()
+            .collation(Collation("en", strength=2))
+            .comment("report")
+        )
+        options = {
+            "hint": "price_1",
+            "maxTimeMS": 100,
+            "allowDiskUse": True,
+            "collation": {"locale": "en", "strength": 2},
+            "comment": "report",
+        }
+        selected = (
+            query.where(lambda s: s.price > 5)
+            .order_by(lambda s: s.date)
+            .select(lambda s: (s.item, s.price))
+        )
+        self.assertEqual(3, len(list(selected)))
+        self.assertEqual(
+            (
+                "find",
+                {
+                    "hint": "price_1",
+                    "max_time_ms": 100,
+                    "allow_disk_use": True,
+                    "collation": {"locale": "en", "strength": 2},
+                    "comment": "report",
+                },
+            ),
+            collection.calls[-1],
+        )
+        self.assertEqual(3, len(list(query.group_by(lambda s: s.item))))
+        self.assertEqual(("aggregate", options), collection.calls[-1])
+        self.assertEqual(20, query.max(lambda s: s.price))
+        self.assertEqual(("aggregate", options), collection.calls[-1])
+        self.assertEqual({"count": 5}, query.aggregates(count="count"))
+        self.assertEqual(("aggregate", options), collection.calls[-1])
+        del options["allowDiskUse"]
+        self.assertEqual(2, query.where(lambda s: s.price == 10).count())
+        self.assertEqual(("count_documents", options), collection.calls[-1])
+        self.assertEqual(5, query.count())
+        self.assertEqual(
+            (
+                "estimated_document_count",
+                {"maxTimeMS": 100, "comment": "report"},
+            ),
+            collection.calls[-1],
+        )
+        self.assertTrue(query.any(lambda s: s.price == 20))
+        self.assertEqual("find", collection.calls[-1][0])
+        self.assertEqual("report", collection.calls[-1][1]["comment"])
+
+    def test_execution_options_hint(self):
+        collection = OptionsCollection(self.sales_collection)
+        query = Queryable(collection, SaleModel).where(lambda s: s.price > 5)
+        hinted = query.with_hint(Index("price", ("date", -1)))
+        list(hinted)
+        self.assertEqual(
+            {"hint": [("price", 1), ("date", -1)]}, collection.calls[-1][1]
+        )
+        hinted.count(hint="price_1")
+        self.assertEqual({"hint": "price_1"}, collection.calls[-1][1])
+        list(query)
+        self.assertEqual({}, collection.calls[-1][1])
+        with mock.patch.object(self.db, "command", return_value={}) as command:
+            hinted.max_time(50).explain()
+        explained = command.call_args[0][0]["explain"]
+        self.assertEqual({"price": 1, "date": -1}, explained["hint"])
+        self.assertEqual(50, explained["maxTimeMS"])
+
+    def test_execution_options_invalid(self):
+        query = Queryable(self.sales_collection, SaleModel)
+        for value in (0, -1, 1.5, True):
+            self.assertRaises(ValueError, query.max_time, value)
+
+    def test_execution_options_cache(self):
+        query = Queryable(self.sales_collection, SaleModel)
+        query._cache = ResultCache()
+        query.where(lambda s: s.item == "abc").to_list()
+        query.collation({"locale": "en"}).where(
+            lambda s: s.item == "abc"
+        ).to_list()
+        query.max_time(100).where(lambda s: s.item == "abc").to_list()
+        self.assertEqual(1, query._cache.statistics["hits"])
+        self.assertEqual(2, query._cache.statistics["entries"])
+
+    def test_prefetch(self):
+        query = (
+            Queryable(self.sales_collection, SaleModel)
+            .order_by(lambda s: s.date)
+            .prefetch(depth=1)
+            .batch_size(2)
+        )
+        self.assertEqual(
+            ["abc", "jkl", "xyz", "abc", "xyz"], [s.item for s in query]
+        )
+        select = query.select(lambda s: (s.item, s.price))
+        self.assertEqual(("abc", 10), select.next())
+        self.assertIsInstance(select._cursor, PrefetchingCursor)
+        select.close()
+        for _ in query.where(lambda s: s.price > 5):
+            break
+        self.assertEqual(1, threading.active_count())
+        self.assertRaises(ValueError, query.prefetch, 0)
+
+    def test_parallel_unordered_ids(self):
+        collection = self.db["compound"]
+        collection.insert_many(
+            [
+                {"_id": {"item": str(i), "n": i}, "item": "a", "quantity": i}
+                for i in range(50)
+            ]
+        )
+        query = Queryable(collection, SaleModel).parallel(4)
+        self.assertEqual([], query._partition_ranges(4))
+        self.assertEqual(
+            list(range(50)), sorted(s.quantity for s in query.to_list())
+        )
+
+    def test_parallel_collation(self):
+        collection = self.db["bulk"]
+        collection.insert_many(
+            [{"item": str(i), "quantity": i} for i in range(100)]
+        )
+        query = (
+            Queryable(collection, SaleModel)
+            .collation({"locale": "en", "strength": 2})
+            .order_by(lambda s: s.item)
+            .parallel(4)
+        )
+        with mock.patch.object(
+            collection, "find", wraps=collection.find
+        ) as find:
+            self.assertEqual(100, len(query.to_list()))
+        self.assertEqual(1, len([c for c in find.call_args_list if c[0]]))
+        with mock.patch.object(
+            collection, "find", wraps=collection.find
+        ) as find:
+            unsorted = query.where(lambda s: s.quantity >= 0)
+            self.assertEqual(100, len(unsorted.parallel(4, False).to_list()))
+        self.assertGreater(len([c for c in find.call_args_list if c[0]]), 1)
+
+    def test_parallel(self):
+        collection = self.db["bulk"]
+        collection.insert_many(
+            [
+                {"item": str(i), "price": i % 13, "quantity": i}
+                for i in range(500)
+            ]
+        )
+        # _id values of another type are read by the first partition
+        collection.insert_many(
+            [
+                {"_id": i, "item": "x", "price": 3, "quantity": i}
+                for i in range(5)
+            ]
+        )
+        query = Queryable(collection, SaleModel).where(lambda s: s.price > 2)
+        expected = sorted(s.quantity for s in query)
+
+        with mock.patch.object(
+            collection, "find", wraps=collection.find
+        ) as find:
+            result = [s.quantity for s in query.parallel(4, ordered=False)]
+        self.assertGreater(find.call_count, 1)
+        self.assertEqual(expected, sorted(result))
+
+        ordered = (
+            query.order_by_descending(lambda s: s.price)
+            .then_by(lambda s: s.quantity)
+            .parallel(4)
+        )
+        self.assertEqual(
+            [(s.price, s.quantity) for s in ordered.all_fields()],
+            [(s.price, s.quantity) for s in ordered.parallel(1)],
+        )
+        with mock.patch.object(
+            collection, "find", wraps=collection.find
+        ) as find:
+            self.assertEqual(
+                sorted(((-s.price, s.quantity) for s in query)),
+                [(-s.price, s.quantity) for s in ordered],
+            )
+        self.assertGreater(find.call_count, 1)
+
+        select = ordered.select(lambda s: (s.item, s.quantity))
+        with mock.patch.object(
+            collection, "find", wraps=collection.find
+        ) as find:
+            self.assertEqual(len(expected), len(list(select)))
+        self.assertEqual(1, find.call_count)
+        self.assertEqual(
+            13 - 3, len(list(query.parallel(4).group_by(lambda s: s.price)))
+        )
+        self.assertRaises(ValueError, query.parallel, 0)
+
+    def test_find_route(self):
+        query = (
+            Queryable(self.sales_collection, SaleModel)
+            .where(lambda s: s.price > 5)
+            .order_by(lambda s: s.price)
+            .select(lambda s: [s.item, s.price])
+        )
+        with mock.patch.object(
+            self.sales_collection, "aggregate", side_effect=AssertionError
+        ):
+            result = list(query)
+        self.assertEqual(
+            [("abc", 10), ("abc", 10), ("jkl", 20)], sorted(result)
+        )
+
     def test_select_dict(self):
         query = Queryable(self.collection, LeagueModel).select(
             lambda x: {"name": x.name, "short_name": x.short_name}
@@ -94,6 +593,133 @@ class QueryableTests(TestCase):
         self.assertEqual("Western Hockey League", query[0].name)
         self.assertEqual(1, len(query[0].seasons))
 
+    def test_to_columns(self):
+        query = Queryable(self.sales_collection, SaleModel).order_by(
+            lambda s: s.date
+        )
+        columns = query.to_columns()
+        self.assertEqual(
+            ["id", "item", "price", "quantity", "date"], list(columns)
+        )
+        self.assertEqual(["abc", "jkl", "xyz", "abc", "xyz"], columns["item"])
+        self.assertEqual([2, 1, 5, 10, 10], columns["quantity"])
+
+        columns = query.select(lambda s: (s.item, s.price)).to_columns()
+        self.assertEqual(
+            {
+                "item": ["abc", "jkl", "xyz", "abc", "xyz"],
+                "price": [10, 20, 5, 10, 5],
+            },
+            columns,
+        )
+
+    def test_to_columns_cursor(self):
+        query = Queryable(self.sales_collection, SaleModel).prefetch(1)
+        query._cursors = CursorRegistry()
+        self.assertEqual(5, len(query.to_columns()["item"]))
+        self.assertEqual(0, len(query._cursors))
+        self.assertEqual(1, threading.active_count())
+        with mock.patch(
+            "py_linq_mongo.query.read_columns", side_effect=ValueError
+        ), mock.patch.object(
+            Queryable, "_release", wraps=query._release
+        ) as release:
+            self.assertRaises(ValueError, query.to_columns)
+        release.assert_called_once_with(mock.ANY)
+        self.assertIsInstance(release.call_args[0][0], PrefetchingCursor)
+        self.assertEqual(0, len(query._cursors))
+
+    def test_to_columns_grouped(self):
+        query = Queryable(self.sales_collection, SaleModel)
+        with self.assertRaises(TypeError):
+            query.group_by(lambda s: s.item).to_columns()
+
+    @skipIf(numpy is None, "numpy is not installed")
+    def test_to_numpy(self):
+        self.sales_collection.insert_one({"item": "mno", "quantity": 1})
+        query = Queryable(self.sales_collection, SaleModel).order_by(
+            lambda s: s.item
+        )
+        arrays = query.to_numpy()
+        self.assertEqual("O", arrays["item"].dtype)
+        self.assertEqual("int64", arrays["quantity"].dtype)
+        self.assertEqual("datetime64[ms]", arrays["date"].dtype)
+        self.assertEqual("float64", arrays["price"].dtype)
+        self.assertTrue(numpy.isnan(arrays["price"][3]))
+        self.assertEqual(29, arrays["quantity"].sum())
+
+        result = query.select(
+            lambda s: {"name": s.item, "qty": s.quantity}
+        ).to_numpy(structured_array=True)
+        self.assertEqual(("name", "qty"), result.dtype.names)
+        self.assertEqual("O", result.dtype["name"])
+        self.assertEqual("int64", result.dtype["qty"])
+        self.assertEqual(29, result["qty"].sum())
+
+    def test_hydrate(self):
+        query = Queryable(self.sales_collection, SaleModel)
+        sale = query.order_by(lambda s: s.price).first()
+        self.assertEqual(5, sale.price)
+        self.assertEqual("SaleModel", type(sale).__name__)
+
+        query = query.hydrate("tuple").where(lambda s: s.item == "jkl")
+        self.assertEqual([("jkl", 20)], [(s.item, s.price) for s in query])
+
+        query = Queryable(self.sales_collection, SaleModel).hydrate("dict")
+        groups = query.group_by(lambda s: s.item).to_list()
+        self.assertTrue(all(isinstance(i, dict) for g in groups for i in g))
+
+    def test_raw(self):
+        collection = RawCollection(self.sales_collection)
+        query = Queryable(collection, SaleModel).raw()
+        sales = query.where(lambda s: s.item == "abc").to_list()
+        self.assertEqual([10, 10], [s.price for s in sales])
+        self.assertEqual({"price": 10}, sales[0]._values)
+        groups = query.group_by(lambda s: s.item).to_list()
+        self.assertEqual(
+            28, sum(s.quantity for group in groups for s in group)
+        )
+        self.assertEqual(5, Queryable(collection, SaleModel).raw().count())
+
+    def test_auto_project(self):
+        self.sales_collection.update_many({}, {"$set": {"legacy": "x" * 100}})
+        query = Queryable(self.sales_collection, SaleModel).where(
+            lambda s: s.item == "jkl"
+        )
+        with mock.patch.object(
+            self.sales_collection, "find", wraps=self.sales_collection.find
+        ) as find:
+            sale = query.first()
+        self.assertEqual(
+            {
+                "_id": 1,
+                "date": 1,
+                "item": 1,
+                "price": 1,
+                "quantity": 1,
+            },
+            find.call_args[0][1],
+        )
+        self.assertEqual(20, sale.price)
+        self.assertRaises(AttributeError, getattr, sale, "legacy")
+
+    def test_all_fields(self):
+        self.sales_collection.update_many({}, {"$set": {"legacy": "x"}})
+        query = Queryable(self.sales_collection, SaleModel).all_fields()
+        sale = query.where(lambda s: s.item == "jkl").first()
+        self.assertEqual("x", sale.legacy)
+        groups = query.group_by(lambda s: s.item).to_list()
+        self.assertTrue(all(s.legacy == "x" for g in groups for s in g))
+
+    def test_auto_project_group(self):
+        self.sales_collection.update_many({}, {"$set": {"region": "west"}})
+        query = Queryable(self.sales_collection, SaleModel).group_by(
+            lambda s: s.region
+        )
+        groups = query.to_list()
+        self.assertEqual(1, len(groups))
+        self.assertEqual(5, len(groups[0]))
+
     def test_take(self):
         query = Queryable(self.collection, LeagueModel).take(1)
         self.assertEqual(1, len(query.to_list()))
@@ -171,6 +797,43 @@ class QueryableTests(TestCase):
         self.assertEqual(20, query.price)
         self.assertEqual(1, query.quantity)
 
+    def test_order_by_take(self):
+        query = (
+            Queryable(self.sales_collection, SaleModel)
+            .order_by_descending(lambda s: s.price)
+            .take(2)
+        )
+        self.assertEqual(
+            [{"$sort": {"price": -1}}, {"$limit": 2}], query.pipeline
+        )
+        self.assertEqual([20, 10], [s.price for s in query])
+
+    def test_order_by_where(self):
+        query = (
+            Queryable(self.sales_collection, SaleModel)
+            .order_by(lambda s: s.quantity)
+            .where(lambda s: s.item == "xyz")
+        )
+        self.assertEqual(
+            [{"$match": {"item": {"$eq": "xyz"}}}, {"$sort": {"quantity": 1}}],
+            Queryable.optimizer.optimize(query.pipeline),
+        )
+        self.assertEqual([5, 10], [s.quantity for s in query])
+
+    def test_optimizer_rule(self):
+        stages = []
+
+        @Queryable.optimizer.register
+        def record(pipeline):
+            stages.append(pipeline)
+            return pipeline
+
+        try:
+            Queryable(self.sales_collection, SaleModel).take(1).to_list()
+        finally:
+            Queryable.optimizer.unregister(record)
+        self.assertEqual({"$limit": 1}, stages[0][0])
+
     def test_where(self):
         query = (
             Queryable(self.sales_collection, SaleModel)
@@ -186,6 +849,68 @@ class QueryableTests(TestCase):
         )
         self.assertEqual(1, len(query))
 
+    def test_where_in(self):
+        query = (
+            Queryable(self.sales_collection, SaleModel)
+            .where(lambda s: s.item in ["abc", "jkl"])
+            .to_list()
+        )
+        self.assertEqual(3, len(query))
+
+    def test_where_closure(self):
+        for price, expected in [(5, 3), (10, 1)]:
+            query = (
+                Queryable(self.sales_collection, SaleModel)
+                .where(lambda s: s.price > price)
+                .to_list()
+            )
+            self.assertEqual(expected, len(query))
+
+    def test_where_global(self):
+        query = (
+            Queryable(self.sales_collection, SaleModel)
+            .where(lambda s: s.date < CUTOFF)
+            .to_list()
+        )
+        self.assertEqual(1, len(query))
+
+    def test_where_unbound_name(self):
+        query = Queryable(self.sales_collection, SaleModel)
+        self.assertRaises(
+            NameError,
+            query.where,
+            lambda s: s.price > undefined,  # noqa: F821
+        )
+
+    def test_prepare(self):
+        prepared = Queryable(self.sales_collection, SaleModel).prepare(
+            lambda q, item, price: q.where(lambda s: s.item == item).where(
+                lambda s: s.price >= price
+            )
+        )
+        self.assertEqual(("item", "price"), prepared.parameters)
+        info = LambdaExpression.cache.info()
+        self.assertEqual(2, len(prepared("abc", 10).to_list()))
+        self.assertEqual(0, len(prepared(item="abc", price=11).to_list()))
+        self.assertEqual(2, prepared(price=5, item="xyz").count())
+        self.assertEqual(info, LambdaExpression.cache.info())
+
+    def test_prepare_missing_parameter(self):
+        prepared = Queryable(self.sales_collection, SaleModel).prepare(
+            lambda q, item: q.where(lambda s: s.item == item)
+        )
+        self.assertRaises(TypeError, prepared)
+        self.assertRaises(TypeError, prepared, "abc", "jkl")
+        self.assertRaises(TypeError, prepared, "abc", price=1)
+
+    def test_prepare_does_not_share_stages(self):
+        prepared = Queryable(self.sales_collection, SaleModel).prepare(
+            lambda q, item: q.where(lambda s: s.item == item)
+        )
+        narrowed = prepared("abc").where(lambda s: s.quantity > 5).to_list()
+        self.assertEqual(1, len(narrowed))
+        self.assertEqual(2, len(prepared("abc").to_list()))
+
     def test_combining_wheres(self):
         query = (
             Queryable(self.sales_collection, SaleModel)
@@ -195,6 +920,21 @@ class QueryableTests(TestCase):
         )
         self.assertEqual(2, len(query))
 
+    def test_combining_wheres_does_not_mutate_cache(self):
+        query = (
+            Queryable(self.sales_collection, SaleModel)
+            .where(lambda s: s.price > 5 and s.quantity > 1)
+            .where(lambda s: s.item == "xyz")
+            .to_list()
+        )
+        self.assertEqual(0, len(query))
+        query = (
+            Queryable(self.sales_collection, SaleModel)
+            .where(lambda s: s.price > 5 and s.quantity > 1)
+            .to_list()
+        )
+        self.assertEqual(2, len(query))
+
     def test_first(self):
         query = (
             Queryable(self.sales_collection, SaleModel)
@@ -341,6 +1081,44 @@ class QueryableTests(TestCase):
         )
         self.assertFalse(query)
 
+    def test_any_probe(self):
+        query = Queryable(self.sales_collection, SaleModel)
+        with mock.patch.object(
+            self.sales_collection, "find", wraps=self.sales_collection.find
+        ) as find:
+            self.assertTrue(query.any(lambda s: s.item == "xyz"))
+        find.assert_called_once_with(
+            {"item": {"$eq": "xyz"}}, {"_id": 1}, sort=None, skip=0, limit=1
+        )
+
+    def test_all_probe(self):
+        query = Queryable(self.sales_collection, SaleModel).where(
+            lambda s: s.item == "abc"
+        )
+        with mock.patch.object(
+            self.sales_collection, "find", wraps=self.sales_collection.find
+        ) as find:
+            self.assertTrue(query.all(lambda s: s.price == 10))
+            self.assertFalse(query.all(lambda s: s.quantity > 2))
+        self.assertEqual(2, find.call_count)
+        self.assertEqual(
+            {
+                "$and": [
+                    {"item": {"$eq": "abc"}},
+                    {"$nor": [{"price": {"$eq": 10}}]},
+                ]
+            },
+            find.call_args_list[0][0][0],
+        )
+        self.assertEqual(2, len(query.to_list()))
+
+    def test_all_empty(self):
+        query = Queryable(self.sales_collection, SaleModel).where(
+            lambda s: s.price > 100
+        )
+        self.assertTrue(query.all(lambda s: s.price < 0))
+        self.assertFalse(query.any())
+
     def test_max_selector(self):
         query = Queryable(self.sales_collection, SaleModel).max(
             lambda s: s.price
@@ -384,6 +1162,86 @@ class QueryableTests(TestCase):
         avg = 28 / 5
         self.assertEqual(avg, query)
 
+    def test_aggregates(self):
+        query = Queryable(self.sales_collection, SaleModel)
+        with mock.patch.object(
+            self.sales_collection,
+            "aggregate",
+            wraps=self.sales_collection.aggregate,
+        ) as aggregate:
+            result = query.aggregates(
+                low=("min", lambda s: s.price),
+                high=("max", lambda s: s.price),
+                quantity=("sum", lambda s: s.quantity),
+                mean=("average", lambda s: s.quantity),
+                revenue=("sum", lambda s: s.price * s.quantity),
+                n="count",
+            )
+        aggregate.assert_called_once()
+        self.assertEqual(5, result["low"])
+        self.assertEqual(20, result["high"])
+        self.assertEqual(28, result["quantity"])
+        self.assertEqual(28 / 5, result["mean"])
+        self.assertEqual(20 + 20 + 25 + 100 + 50, result["revenue"])
+        self.assertEqual(5, result["n"])
+
+    def test_aggregates_grouping(self):
+        query = AccumulatorSelectQueryable(
+            self.sales_collection,
+            [],
+            {
+                "spread": ("std_dev", lambda s: s.price),
+                "sample": ("std_dev_sample", lambda s: s.price),
+            },
+        )
+        self.assertEqual(
+            {
+                "$group": {
+                    "_id": None,
+                    "spread": {"$stdDevPop": "$price"},
+                    "sample": {"$stdDevSamp": "$price"},
+                }
+            },
+            query.grouping,
+        )
+
+    def test_aggregates_filtered(self):
+        result = (
+            Queryable(self.sales_collection, SaleModel)
+            .where(lambda s: s.item == "xyz")
+            .aggregates(n=("count",), total=("sum", lambda s: s.quantity))
+        )
+        self.assertEqual({"n": 2, "total": 15}, result)
+
+    def test_aggregates_empty(self):
+        result = (
+            Queryable(self.sales_collection, SaleModel)
+            .where(lambda s: s.price > 100)
+            .aggregates(
+                n="count",
+                total=("sum", lambda s: s.price),
+                high=("max", lambda s: s.price),
+            )
+        )
+        self.assertEqual({"n": 0, "total": 0, "high": None}, result)
+
+    def test_aggregates_errors(self):
+        query = Queryable(self.sales_collection, SaleModel)
+        self.assertRaises(TypeError, query.aggregates)
+        self.assertRaises(ValueError, query.aggregates, n="median")
+        self.assertRaises(ValueError, query.aggregates, _id="count")
+        self.assertRaises(TypeError, query.aggregates, n=("max",))
+        self.assertRaises(
+            TypeError, query.aggregates, n=("count", lambda s: s.price)
+        )
+        self.assertRaises(
+            TypeError, query.aggregates, n=("max", lambda s: s.price > 1)
+        )
+        query = Queryable(self.students_collection, StudentModel)
+        self.assertRaises(
+            TypeError, query.aggregates, labs=("max", lambda s: s.labs)
+        )
+
     def test_default_if_empty(self):
         query = (
             Queryable(self.sales_collection, SaleModel)